@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""bench.py: Benchmark openCEM model build, solve and export stages"""
+__version__ = "0.9.2"
+__author__ = "José Zapata"
+__copyright__ = "Copyright 2018, ITP Renewables, Australia"
+__credits__ = ["José Zapata", "Dylan McConnell", "Navid Hagdadi"]
+__license__ = "GPLv3"
+__maintainer__ = "José Zapata"
+__email__ = "jose.zapata@itpau.com.au"
+__status__ = "Development"
+
+import argparse
+import json
+import sys
+import tempfile
+
+import cemo.benchmark
+
+# create parser object
+PARSER = argparse.ArgumentParser(description="openCEM benchmark harness")
+
+PARSER.add_argument("--case",
+                    help="Benchmark an existing data command file (e.g. tests/CTV_trans.dat)"
+                    + " instead of a synthetic data set",
+                    type=str,
+                    metavar='DAT')
+# Synthetic data set size
+PARSER.add_argument("--regions",
+                    help="Regions in synthetic data set",
+                    type=int,
+                    nargs='+',
+                    default=[4, 5])
+PARSER.add_argument("--zones",
+                    help="Maximum zones per region in synthetic data set",
+                    type=int,
+                    default=2)
+PARSER.add_argument("--techs",
+                    help="Technologies in each zone of synthetic data set",
+                    type=int,
+                    nargs='+',
+                    default=[2, 4, 8, 11, 12, 13, 14, 15])
+PARSER.add_argument("--hours",
+                    help="Hourly dispatch intervals in synthetic data set",
+                    type=int,
+                    default=168)
+# Benchmark options
+PARSER.add_argument("--solver",
+                    help="Specify solver used by model."
+                    + " For Pyomo supported solvers installed in your system ",
+                    type=str,
+                    metavar='SOLVER',
+                    default="cbc")
+PARSER.add_argument("--cluster",
+                    help="Include clustering stage with this number of clusters",
+                    type=int,
+                    default=0)
+PARSER.add_argument("--years",
+                    help="Number of years merged in the mergejsonyears stage",
+                    type=int,
+                    default=7)
+PARSER.add_argument("--memory",
+                    help="Trace Python memory allocations in each stage (slower)",
+                    action="store_true")
+PARSER.add_argument("--no-ssolve",
+                    help="Skip timing ssolve.py on the same data command file",
+                    action="store_true")
+PARSER.add_argument("-o", "--output",
+                    help="Save benchmark results to JSON file",
+                    type=str,
+                    metavar='JSON',
+                    default='bench.json')
+PARSER.add_argument("--imports",
+                    help="Time imports of openCEM modules in fresh interpreters and exit",
+                    action="store_true")
+PARSER.add_argument("--compare",
+                    help="Compare stage wall times of two benchmark result files and exit",
+                    type=str,
+                    nargs=2,
+                    metavar=('BASE', 'NEW'))
+
+ARGS = PARSER.parse_args()
+
+if ARGS.compare:
+    with open(ARGS.compare[0]) as fb, open(ARGS.compare[1]) as fn:
+        COMPARISON = cemo.benchmark.compare(json.load(fb), json.load(fn))
+    print("%20s %10s %10s %8s" % ('stage', 'base [s]', 'new [s]', 'ratio'))
+    for row in COMPARISON:
+        print("%20s %10.3f %10.3f %8.2f" % row)
+    sys.exit(0)
+
+if ARGS.imports:
+    RESULT = cemo.benchmark.import_benchmark(outfile=ARGS.output)
+    for rec in RESULT['stages']:
+        print("openCEM bench.py: %20s %10.3f s wall  loads: %s"
+              % (rec['stage'], rec['wall'], ' '.join(rec['loaded']) or '-'))
+    print("openCEM bench.py: Results saved to %s" % ARGS.output)
+    sys.exit(0)
+
+DATFILE = ARGS.case
+if DATFILE is None:
+    DATFILE = cemo.benchmark.synthetic_data(tempfile.mkdtemp(prefix='cemo_synth'),
+                                            regions=ARGS.regions,
+                                            zones_per_region=ARGS.zones,
+                                            techs=ARGS.techs,
+                                            hours=ARGS.hours)
+
+RESULT = cemo.benchmark.benchmark(DATFILE,
+                                  outfile=ARGS.output,
+                                  solver=ARGS.solver,
+                                  cluster=ARGS.cluster,
+                                  years=ARGS.years,
+                                  memory=ARGS.memory,
+                                  ssolve=not ARGS.no_ssolve)
+for rec in RESULT['stages']:
+    print("openCEM bench.py: %20s %10.3f s wall %10.3f s cpu"
+          % (rec['stage'], rec['wall'], rec['cpu']))
+print("openCEM bench.py: Results saved to %s" % ARGS.output)
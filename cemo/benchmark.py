@@ -0,0 +1,292 @@
+"""Benchmark harness for openCEM model build, solve and export stages"""
+__author__ = "José Zapata"
+__copyright__ = "Copyright 2018, ITP Renewables, Australia"
+__credits__ = ["José Zapata", "Dylan McConnell", "Navid Hagdadi"]
+__license__ = "GPLv3"
+__version__ = "0.9.2"
+__maintainer__ = "José Zapata"
+__email__ = "jose.zapata@itpau.com.au"
+__status__ = "Development"
+import contextlib
+import datetime
+import io
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+
+import numpy as np
+
+import cemo.const
+from cemo.profiler import Profiler, lp_size
+
+# Modules imported at start up of msolve.py, ssolve.py and runef ReferenceModel.py workers
+IMPORT_MODULES = ('cemo.model', 'cemo.multi', 'cemo.utils', 'cemo.cluster')
+
+# Indicative build costs in $/MW used for synthetic data sets
+SYNTH_BUILD_COST = {
+    1: 5.0e6, 2: 1.5e6, 3: 3.5e6, 4: 3.0e6, 5: 6.0e6, 6: 3.5e6, 7: 7.0e6, 8: 0.9e6,
+    9: 1.6e6, 10: 1.4e6, 11: 1.7e6, 12: 2.0e6, 13: 4.4e6, 14: 1.4e6, 15: 1.0e6,
+    16: 1.3e6, 17: 2.4e6, 18: 4.0e6, 19: 2.0e6,
+}
+
+
+def _zones(regions, zones_per_region):
+    zones = []
+    for r in regions:
+        zones += [z for (i, z) in cemo.const.ZONES_IN_REGIONS if i == r][:zones_per_region]
+    return zones
+
+
+def _complex(data):
+    return [{'index': list(k) if isinstance(k, tuple) else k, 'value': v}
+            for k, v in data.items()]
+
+
+def synthetic_data(path, regions=(4, 5), zones_per_region=2,
+                   techs=(2, 4, 8, 11, 12, 13, 14, 15), hours=168, year=2020, seed=0):
+    '''
+    Write a self contained data command file (plus JSON data) with random traces
+    and costs for the given regions, zones per region, technologies and hours.
+    No database connection is required. Returns the name of the .dat file.
+    '''
+    rng = np.random.RandomState(seed)
+    os.makedirs(path, exist_ok=True)
+    name = 'Synth_r%d_z%d_n%d_h%d' % (len(regions), zones_per_region, len(techs), hours)
+    zones = _zones(regions, zones_per_region)
+    techs = [n for n in techs if n in cemo.const.ALL_TECH]
+    gentech = [n for n in techs if n in cemo.const.GEN_TECH]
+    stortech = [n for n in techs if n in cemo.const.STOR_TECH]
+    hybtech = [n for n in techs if n in cemo.const.HYB_TECH]
+    start = datetime.datetime(year - 1, 7, 1, 1)
+    t = [str(start + datetime.timedelta(hours=h)) for h in range(hours)]
+    hour = np.arange(hours) % 24
+    solar = np.clip(np.sin((hour - 6) / 12 * np.pi), 0, None)
+    daily = 1 + 0.25 * np.sin((hour - 12) / 24 * 2 * np.pi)
+
+    def zonetech(techset):
+        return [(z, n) for z in zones for n in techset]
+
+    def subset(techset):
+        return [[z, n] for (z, n) in zonetech(gentech) if n in techset]
+
+    demand = {}
+    peak = {}
+    for r in regions:
+        base = rng.uniform(1000, 8000)
+        trace = base * daily * (1 + 0.05 * rng.randn(hours))
+        peak[r] = trace.max()
+        demand.update({(r, s): round(float(d), 4) for s, d in zip(t, trace)})
+
+    capf = {}
+    for (z, n) in zonetech(gentech) + zonetech(hybtech):
+        if n in cemo.const.GEN_TRACE or n in cemo.const.HYB_TECH:
+            if n in (12, 17):  # wind
+                trace = np.clip(0.35 + 0.1 * np.cumsum(rng.randn(hours)) / np.sqrt(hours), 0, 1)
+            else:
+                trace = solar * rng.uniform(0.7, 1.0)
+        else:
+            trace = np.full(hours, cemo.const.GEN_CAP_FACTOR.get(n, 0))
+        capf.update({(z, n, s): round(float(c), 4) for s, c in zip(t, trace)})
+
+    # Existing thermal fleet large enough to supply the peak in each region
+    fuel = [n for n in gentech if n in cemo.const.FUEL_TECH]
+    initial = {}
+    for r in regions:
+        rzones = [z for z in zones if (r, z) in cemo.const.ZONES_IN_REGIONS]
+        for (z, n) in zonetech(fuel):
+            if z in rzones:
+                initial[(z, n)] = round(1.2 * peak[r] / len(rzones) / len(fuel), 1)
+
+    data = {
+        'regions': list(regions),
+        'zones': zones,
+        'all_tech': cemo.const.ALL_TECH,
+        't': t,
+        'gen_tech_in_zones': [list(i) for i in zonetech(gentech)],
+        'retire_gen_tech_in_zones': subset(cemo.const.RETIRE_TECH),
+        'fuel_gen_tech_in_zones': subset(cemo.const.FUEL_TECH),
+        'commit_gen_tech_in_zones': subset(cemo.const.COMMIT_TECH),
+        're_gen_tech_in_zones': subset(cemo.const.RE_GEN_TECH),
+        'disp_gen_tech_in_zones': subset(cemo.const.DISP_GEN_TECH),
+        're_disp_gen_tech_in_zones': subset(cemo.const.RE_DISP_GEN_TECH),
+        'stor_tech_in_zones': [list(i) for i in zonetech(stortech)],
+        'hyb_tech_in_zones': [list(i) for i in zonetech(hybtech)],
+        'cost_gen_build': _complex({i: SYNTH_BUILD_COST[i[1]] for i in zonetech(gentech)}),
+        'cost_stor_build': _complex({i: SYNTH_BUILD_COST[i[1]] for i in zonetech(stortech)}),
+        'cost_hyb_build': _complex({i: SYNTH_BUILD_COST[i[1]] for i in zonetech(hybtech)}),
+        'gen_cap_initial': _complex({i: initial.get(i, 0) for i in zonetech(gentech)}),
+        'cost_gen_fom': _complex({n: 25000.0 for n in gentech}),
+        'cost_gen_vom': _complex({n: round(rng.uniform(0, 8), 2) for n in gentech}),
+        'cost_stor_fom': _complex({n: 5000.0 for n in stortech}),
+        'cost_stor_vom': _complex({n: 5.0 for n in stortech}),
+        'cost_hyb_fom': _complex({n: 75600.0 for n in hybtech}),
+        'cost_hyb_vom': _complex({n: 5.99 for n in hybtech}),
+        'gen_cap_factor': _complex({k: v for k, v in capf.items() if k[1] in gentech}),
+        'hyb_cap_factor': _complex({k: v for k, v in capf.items() if k[1] in hybtech}),
+        'region_net_demand': _complex(demand),
+    }
+    jsonfile = os.path.join(path, name + '.json')
+    with open(jsonfile, 'w') as f:
+        json.dump(data, f)
+    sets = ' '.join(k for k in data if not k.startswith('cost') and k not in (
+        'gen_cap_initial', 'gen_cap_factor', 'hyb_cap_factor', 'region_net_demand'))
+    datfile = os.path.join(path, name + '.dat')
+    with open(datfile, 'w') as f:
+        f.write("# Synthetic openCEM benchmark case\n")
+        f.write("load '%s': %s;\n" % (jsonfile, sets))
+        f.write("load '%s': [zones,all_tech] cost_gen_build cost_stor_build cost_hyb_build "
+                "gen_cap_initial;\n" % jsonfile)
+        f.write("load '%s': [all_tech] cost_gen_fom cost_gen_vom cost_stor_fom cost_stor_vom "
+                "cost_hyb_fom cost_hyb_vom;\n" % jsonfile)
+        f.write("load '%s': [zones,all_tech,t] gen_cap_factor hyb_cap_factor;\n" % jsonfile)
+        f.write("load '%s': [regions,t] region_net_demand;\n" % jsonfile)
+    return datfile
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'],
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _write_cfg(tmpdir, datfile, year, years):
+    '''Minimal configuration file so that SolveTemplate can merge benchmark years'''
+    cfgfile = tmpdir + 'bench.cfg'
+    with open(cfgfile, 'w') as f:
+        f.write("[Scenario]\nName = Benchmark\nYears = %s\ndiscountrate = 0.05\n"
+                % json.dumps(list(range(year, year + years))))
+        f.write("[Advanced]\nTemplate = %s\ncluster = no\ncluster_sets = 0\n"
+                "all_tech_per_zone = []\n" % datfile)
+    return cfgfile
+
+
+def run(datfile, solver='cbc', cluster=0, years=1, memory=False, ssolve=True):
+    '''
+    Run the stages of SolveTemplate.solve and ssolve.py on a data command file.
+    Return a list of per stage spans with wall and CPU time and peak memory.
+    '''
+    from pyomo.opt import SolverFactory
+
+    from cemo.cluster import InstanceCluster
+    from cemo.jsonify import json_carry_forward_cap, jsonify
+    from cemo.model import create_model
+    from cemo.multi import SolveTemplate
+    from cemo.utils import printstats
+
+    name = os.path.splitext(datfile)[0]
+    tmpdir = tempfile.mkdtemp(prefix='cemo_bench') + '/'
+    prof = Profiler(memory=memory, keep=True)
+    with prof.span('create_model'):
+        model = create_model(os.path.basename(name))
+    with prof.span('create_instance'):
+        inst = model.create_instance(datfile)
+        year = int(inst.t.last()[:4])
+    if cluster:
+        with prof.span('clusterset'):
+            InstanceCluster(inst, cluster)
+    with prof.span('solve'):
+        SolverFactory(solver).solve(inst)
+    with prof.span('carry_forward'):
+        with open(tmpdir + 'gen_cap_op' + str(year) + '.json', 'w') as op:
+            json.dump(json_carry_forward_cap(inst), op)
+    with prof.span('jsonify'):
+        out = jsonify(inst)
+    with prof.span('json_dump'):
+        with open(tmpdir + str(year) + '.json', 'w') as jo:
+            json.dump(out, jo)
+    with prof.span('printstats'):
+        with contextlib.redirect_stdout(io.StringIO()):
+            printstats(inst)
+    for y in range(year + 1, year + years):
+        shutil.copyfile(tmpdir + str(year) + '.json', tmpdir + str(y) + '.json')
+    X = SolveTemplate(_write_cfg(tmpdir, datfile, year, years), solver=solver, tmpdir=tmpdir)
+    with prof.span('mergejsonyears'):
+        X.mergejsonyears()
+    size = lp_size(inst)
+    del inst
+    shutil.rmtree(tmpdir)
+    if ssolve:
+        script = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                              'ssolve.py')
+        with prof.span('ssolve'):
+            subprocess.run([sys.executable, script, name, '--solver', solver],
+                           stdout=subprocess.DEVNULL, check=True)
+    return prof.spans, size
+
+
+def import_time(module, repeat=5):
+    '''
+    Best of repeat wall times in seconds to import module in a fresh interpreter,
+    and the heavy optional libraries loaded with it
+    '''
+    code = ("import sys, time; t = time.perf_counter(); import %s; "
+            "print(time.perf_counter() - t); "
+            "print(' '.join(m for m in ('matplotlib', 'pandas', 'scipy') if m in sys.modules))"
+            % module)
+    times = []
+    for _ in range(repeat):
+        out = subprocess.check_output([sys.executable, '-c', code], universal_newlines=True)
+        wall, loaded = (out.splitlines() + [''])[:2]
+        times.append(float(wall))
+    return min(times), loaded.split()
+
+
+def import_benchmark(modules=IMPORT_MODULES, repeat=5, outfile=None):
+    '''Import times of modules as benchmark stages, saved with run metadata as JSON'''
+    stages = []
+    for module in modules:
+        wall, loaded = import_time(module, repeat)
+        stages.append({'stage': 'import ' + module, 'wall': wall, 'loaded': loaded})
+    out = {
+        'meta': {
+            'commit': _git_commit(),
+            'date': datetime.datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'options': {'repeat': repeat},
+        },
+        'stages': stages,
+    }
+    if outfile is not None:
+        with open(outfile, 'w') as fo:
+            json.dump(out, fo, indent=2)
+    return out
+
+
+def benchmark(datfile, outfile=None, **kwargs):
+    '''Run benchmark stages on datfile and save results with run metadata as JSON'''
+    import pyomo.version
+
+    results, size = run(datfile, **kwargs)
+    out = {
+        'meta': {
+            'case': os.path.basename(datfile),
+            'commit': _git_commit(),
+            'date': datetime.datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'pyomo': pyomo.version.version,
+            'size': size,
+            'options': kwargs,
+        },
+        'stages': results,
+    }
+    if outfile is not None:
+        with open(outfile, 'w') as fo:
+            json.dump(out, fo, indent=2)
+    return out
+
+
+def compare(base, new):
+    '''Return (stage, base wall, new wall, new/base ratio) for stages in both results'''
+    basewall = {s['stage']: s['wall'] for s in base['stages']}
+    out = []
+    for s in new['stages']:
+        if s['stage'] in basewall:
+            b = basewall[s['stage']]
+            out.append((s['stage'], b, s['wall'], s['wall'] / b if b else float('nan')))
+    return out
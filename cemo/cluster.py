@@ -1,4 +1,4 @@
-"""Hierachical clustering of demand weeks for openCEM"""
+"""Hierachical clustering of demand weeks or days for openCEM"""
 __author__ = "José Zapata"
 __copyright__ = "Copyright 2018, ITP Renewables, Australia"
 __credits__ = ["José Zapata", "Dylan McConnell", "Navid Hagdadi"]
@@ -8,8 +8,9 @@ __maintainer__ = "José Zapata"
 __email__ = "jose.zapata@itpau.com.au"
 __status__ = "Development"
 import datetime
+import hashlib
 import json
-import shutil
+import os
 import subprocess
 import sys
 import tempfile
@@ -18,9 +19,13 @@ from collections import deque
 import numpy as np
 import pandas as pd
 from scipy.cluster.hierarchy import fcluster, linkage
-from scipy.spatial.distance import pdist
+from scipy.spatial.distance import cdist
 
 import cemo.jsonify
+from cemo.direct import DIRECT_SOLVERS, solver_factory
+from cemo.solverlog import parse_log
+from cemo.solveropts import BUDGET, runef_options
+from cemo.template import TIMERANGE_LINE, CompiledTemplate, absolute_loads
 
 
 def next_weekday(d, weekday):
@@ -37,26 +42,151 @@ def prev_weekday(d, weekday):
     return d - datetime.timedelta(days_behind)
 
 
+def _nearest(X, centres, metric, batch):
+    '''Index of nearest centre to each row of X and its distance, computed in batches of rows'''
+    labels = np.empty(X.shape[0], dtype=np.intp)
+    dist = np.empty(X.shape[0])
+    for start in range(0, X.shape[0], batch):
+        d = cdist(X[start:start + batch], centres, metric=metric)
+        labels[start:start + batch] = d.argmin(axis=1)
+        dist[start:start + batch] = d.min(axis=1)
+    return labels, dist
+
+
+def kmedoids(X, k, metric='cityblock', batch=1024, max_iter=100, seed=0):
+    '''
+    Mini batch k-medoids clustering of the rows of X, returning the cluster
+    number (1 to k) of each row as fcluster does. Only distances to the k
+    medoids and within batches of at most batch rows are computed, so memory
+    grows linearly with the number of rows instead of with its square.
+    '''
+    rng = np.random.RandomState(seed)
+    n = X.shape[0]
+    k = min(k, n)
+    # k-means++ seeding, spreading initial medoids apart
+    medoids = [rng.randint(n)]
+    dmin = _nearest(X, X[medoids], metric, batch)[1]
+    for _ in range(1, k):
+        dmin[medoids] = 0
+        if dmin.sum() > 0:
+            i = rng.choice(n, p=dmin / dmin.sum())
+        else:
+            i = rng.choice(np.setdiff1d(np.arange(n), medoids))
+        medoids.append(i)
+        dmin = np.minimum(dmin, _nearest(X, X[[i]], metric, batch)[1])
+    for _ in range(max_iter):
+        labels = _nearest(X, X[medoids], metric, batch)[0]
+        update = []
+        for c in range(k):
+            members = np.flatnonzero(labels == c)
+            if members.size == 0:
+                update.append(medoids[c])
+                continue
+            # medoid of a random batch of members, keeping the current one as a candidate
+            if members.size > batch:
+                members = np.union1d(rng.choice(members, batch - 1, replace=False), medoids[c])
+            cost = cdist(X[members], X[members], metric=metric).sum(axis=1)
+            update.append(members[cost.argmin()])
+        if update == medoids:
+            break
+        medoids = update
+    labels = _nearest(X, X[medoids], metric, batch)[0]
+    # number non empty clusters from 1, like fcluster
+    return np.unique(labels, return_inverse=True)[1] + 1
+
+
+class ClusterCache:
+    """
+    Persistent store of clustering results (Xcluster weeks, dates and weights)
+    keyed by a hash of the clustered data and the clustering parameters, so that
+    runs on the same demand traces (e.g. cost or policy sweeps) skip clustering.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+
+    def __repr__(self):  # pragma: no cover
+        return 'Cluster cache at %r' % self.path
+
+    def key(self, X, dates, **params):
+        '''Hash of data array, period dates and clustering parameters'''
+        h = hashlib.sha256()
+        h.update(json.dumps(params, sort_keys=True).encode())
+        X = np.ascontiguousarray(X, dtype=float)
+        h.update(str(X.shape).encode())
+        h.update(X.tobytes())
+        h.update(np.asarray(dates, dtype='M8[s]').tobytes())
+        return h.hexdigest()
+
+    def _file(self, key):
+        return os.path.join(self.path, key + '.json')
+
+    def get(self, key):
+        '''Cached Xcluster DataFrame and cluster sequence of periods, or None'''
+        try:
+            with open(self._file(key)) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        Xcluster = pd.DataFrame({
+            'week': data['week'],
+            'date': pd.to_datetime(data['date']),
+            'weight': data['weight'],
+        }, index=data['index'])
+        return Xcluster, np.array(data['sequence'])
+
+    def put(self, key, Xcluster, sequence):
+        data = {
+            'sequence': np.asarray(sequence).tolist(),
+            'index': Xcluster.index.tolist(),
+            'week': Xcluster['week'].tolist(),
+            'date': [str(d) for d in Xcluster['date']],
+            'weight': Xcluster['weight'].tolist(),
+        }
+        # write to a temporary file and rename so readers never see partial results
+        fd, tmp = tempfile.mkstemp(dir=self.path, suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(data, f)
+        os.replace(tmp, self._file(key))
+
+
 class ClusterData:
     def __init__(self,
                  firstdow=4,
                  lastdow=3,
                  max_d=12,
                  regions=[1, 2, 3, 4, 5],
-                 maxsynth=False):
+                 maxsynth=False,
+                 cache=None,
+                 method='average',
+                 metric='cityblock',
+                 dtype=np.float64,
+                 period='week'):
+        self.period = period  # week (firstdow to lastdow) or day
+        self.cache = cache  # ClusterCache of results, if any
+        self.method = method  # linkage method or kmedoids
+        self.metric = metric  # distance between period observations
+        self.dtype = dtype  # e.g. float32 to halve memory of long traces
+        self.cached = False  # Xcluster came from the cache
         self.firstdow = firstdow  # Day of week starting period
         self.lastdow = lastdow  # Day of week ending period`
         self.max_d = max_d  # Maximum number of clusters
         self.regions = regions  # NEM region tuple
         self.maxsynth = maxsynth
 
-        # make week pattern into a list
-        self.pdays = (self.lastdow - self.firstdow + 8) % 7
-        if self.pdays == 0:
-            self.pdays = 7
-        dq = deque(range(7), maxlen=7)
-        dq.rotate(-self.lastdow)  # rotate to first day in yrange
-        self.days = list(dq)[:self.pdays]  # trim week to pdays
+        if self.period == 'day':
+            # every day of the year is a period
+            self.pdays = 1
+            self.days = list(range(7))
+        else:
+            # make week pattern into a list
+            self.pdays = (self.lastdow - self.firstdow + 8) % 7
+            if self.pdays == 0:
+                self.pdays = 7
+            dq = deque(range(7), maxlen=7)
+            dq.rotate(-self.lastdow)  # rotate to first day in yrange
+            self.days = list(dq)[:self.pdays]  # trim week to pdays
 
         # these are initialised after the first call to _init_timeseries_data
         self.plen = None
@@ -74,11 +204,7 @@ class ClusterData:
         return 'Cluster Data generator\n %r' % self.Xcluster
 
     def _init_timeseries_data(self):
-        X = np.array([])
-        for r in self.regions:
-            Xd = self._get_region_data(r)
-            X = np.column_stack([X, Xd]) if X.size else Xd
-        return X
+        return np.hstack([self._get_region_data(r) for r in self.regions])
 
     def _get_region_data(self, region):
         df = self._data_query(region)
@@ -86,8 +212,11 @@ class ClusterData:
         df.set_index([df.index.date, df.index.time], inplace=True)
         df = df.unstack()
         # top and tail year to start and finish within week interval
-        first_doy = next_weekday(datetime.date(self.year-1, 7, 1), self.firstdow)
-        last_doy = prev_weekday(datetime.date(self.year, 6, 30), self.lastdow)
+        first_doy = datetime.date(self.year-1, 7, 1)
+        last_doy = datetime.date(self.year, 6, 30)
+        if self.period != 'day':
+            first_doy = next_weekday(first_doy, self.firstdow)
+            last_doy = prev_weekday(last_doy, self.lastdow)
         df = df[df.index >= pd.to_datetime(first_doy)]
         df = df[df.index <= pd.to_datetime(last_doy)]
         # now keep those days you want to keep, eg. sunday to Wednesday
@@ -105,63 +234,60 @@ class ClusterData:
         # number of whole pday periods
         if self.periods is None:
             self.periods = int((ndays - ndays % self.pdays) / self.pdays)
-        # rearange into pdays
-        X1 = np.empty((self.periods, self.plen))
-        for j in range(self.periods):
-            X1[j] = np.concatenate(
-                [X[self.pdays * j + i] for i in range(self.pdays)])
-
-        return X1
-
-    def _calc_Xsynth(self, max=False):
-        # empty array of synthetic individual in each cluster
-        self.Xsynth = np.empty((self.max_d, self.nplen))
+        # rearange consecutive days into pday periods
+        return X[:self.periods * self.pdays].reshape(self.periods, self.plen).astype(
+            self.dtype, copy=False)
+
+    def _assign(self, max_d, method, metric):
+        '''Cluster number (1 to max_d) of each period observation'''
+        if method == 'kmedoids':
+            return kmedoids(self.X, max_d, metric=metric)
+        # Hierarchical clustering, memory grows with the square of the number of periods
+        Z = linkage(self.X, method, metric=metric)
+        return fcluster(Z, max_d, criterion='maxclust')
 
-        for k in range(self.max_d):
-            # calculate synthetic individual per clusters
-            if max:
-                self.Xsynth[k] = self.Xclus[k].max(axis=0)[:self.nplen]
-            else:
-                self.Xsynth[k] = self.Xclus[k].mean(axis=0)[:self.nplen]
-
-    def clusterset(self, max_d, method='average', metric='cityblock'):
-        # TODO expose method and metric to class initialisation
+    def clusterset(self, max_d, method=None, metric=None):
         """Group period observations into clusters and save into Xcluster"""
+        method = self.method if method is None else method
+        metric = self.metric if metric is None else metric
         self.max_d = max_d
-        # Perform selected clustering algorithm on dataset
-        Z = linkage(self.X, method, metric=metric)
+        key = None
+        if self.cache is not None:
+            key = self.cache.key(self.X, self.dates, max_d=max_d, method=method, metric=metric,
+                                 firstdow=self.firstdow, lastdow=self.lastdow,
+                                 maxsynth=self.maxsynth, period=self.period)
+            cached = self.cache.get(key)
+            self.cached = cached is not None
+            if self.cached:
+                self.Xcluster, self.sequence = cached
+                self.max_d = len(self.Xcluster)  # as found by the clustering run
+                return
         # vector indicating the cluster to which each member of X belongs
-        self.cluster = fcluster(Z, self.max_d, criterion='maxclust')
-        # Add index to dataset to backtrack day of the year
-        X2 = np.column_stack((self.X, range(1, self.X.shape[0] + 1)))
-        # Break down X into a list of numpy arrays, one for each cluster
-        self.Xclus = [np.empty((0, self.nplen + 1))] * self.max_d
-        for j in range(X2.shape[0]):
-            self.Xclus[self.cluster[j] - 1] \
-                = np.row_stack((self.Xclus[self.cluster[j] - 1], X2[j, :]))
-        # genereate Xsynth (by default is the max of all features in cluster)
-        self._calc_Xsynth(max=self.maxsynth)
+        self.cluster = self._assign(max_d, method, metric)
+        # cluster (scenario) number of each period in chronological order
+        self.sequence = self.cluster
+        self.max_d = int(self.cluster.max())  # fewer clusters than periods or distinct ones
+        # synthetic individual of each cluster (max or mean of all features in cluster)
+        self.Xsynth = np.empty((self.max_d, self.nplen))
 
         # Obtain the date index for the observation in each cluster
-        # closest to their respective cluster mean
+        # closest to their respective synthetic individual
         Xcl = []  # initialise array
         for k in range(self.max_d):
-            # slice into data and indices
-            Xclusidx = self.Xclus[k][:, self.nplen:]  # date indices
-            # observations in each cluster
-            Xclusobs = self.Xclus[k][:, :self.nplen]
-            # append mean to each cluster
-            Xclusobs = np.row_stack((self.Xsynth[k], Xclusobs))
-            # determine distance between mean and each observation in cluster
-            pdist_temp = pdist(Xclusobs, metric=metric)[:Xclusobs.shape[0] - 1]
-            idx = pdist_temp.argmin()  # nearest observation to Xsynth in clus
+            # observations in each cluster (row indices into X)
+            members = np.flatnonzero(self.cluster == k + 1)
+            Xclusobs = self.X[members]
+            self.Xsynth[k] = Xclusobs.max(axis=0) if self.maxsynth else Xclusobs.mean(axis=0)
+            # nearest observation to Xsynth in cluster
+            idx = members[cdist(self.Xsynth[k][np.newaxis], Xclusobs, metric=metric)[0].argmin()]
             # save day of the year index plus the cluster relative weight
-            Xcl.append((int(Xclusidx[idx]), self.dates[int(Xclusidx[idx]) - 1],
-                        (Xclusobs.shape[0] - 1) / self.periods))
+            Xcl.append((int(idx) + 1, self.dates[idx], members.size / self.periods))
 
         # store cluster information in a convenient pandas DataFrame
         self.Xcluster = pd.DataFrame(
             Xcl, columns=['week', 'date', 'weight']).sort_values(by='date')
+        if key is not None:
+            self.cache.put(key, self.Xcluster, self.sequence)
 
 
 class CSVCluster(ClusterData):
@@ -171,9 +297,12 @@ class CSVCluster(ClusterData):
             self,
             max_d=12,
             source='tests/SampleDemand.csv.gz',
+            cache=None,
+            method='average',
+            period='week',
     ):
         self.source = source
-        ClusterData.__init__(self, max_d=max_d)
+        ClusterData.__init__(self, max_d=max_d, cache=cache, method=method, period=period)
 
     def _data_query(self, region):
         df = pd.read_csv(
@@ -188,12 +317,13 @@ class CSVCluster(ClusterData):
 
 
 class InstanceCluster(ClusterData):
-    """Create weekly clusters from demand data in model instance"""
+    """Create weekly (or daily) clusters from demand data in model instance"""
 
-    def __init__(self, instance, max_d=12):
+    def __init__(self, instance, max_d=12, cache=None, method='average', period='week'):
         self.demand = cemo.jsonify.jsonifyld(
             instance)  # FIXME better name for jsonifyld
-        ClusterData.__init__(self, max_d=max_d, regions=instance.regions)
+        ClusterData.__init__(self, max_d=max_d, regions=instance.regions, cache=cache,
+                             method=method, period=period)
 
     def _data_query(self, region):
         # Pandas from demandionary
@@ -217,6 +347,24 @@ class InstanceCluster(ClusterData):
         return df
 
 
+class TraceStoreCluster(ClusterData):
+    """Create weekly (or daily) clusters from demand traces held in a memory mapped trace store"""
+
+    def __init__(self, store, year, max_d=12, regions=[1, 2, 3, 4, 5], cache=None,
+                 method='average', period='week', key=None):
+        self.store = store
+        self.year = year
+        self.key = year if key is None else key  # year label in store
+        ClusterData.__init__(self, max_d=max_d, regions=regions, cache=cache, method=method,
+                             dtype=np.float32 if method == 'kmedoids' else np.float64,
+                             period=period)
+
+    def _data_query(self, region):
+        return pd.DataFrame(
+            {'value': self.store.read(self.key, 'region_net_demand', region)},
+            index=pd.DatetimeIndex(self.store.timestamps(self.key)))
+
+
 class ClusterRun:
     """Class to run a model based on supplied cluster information"""
 
@@ -225,19 +373,30 @@ class ClusterRun:
                  template,
                  model_options,
                  solver='cbc',
-                 log=False):
+                 log=False,
+                 solver_options=None,
+                 chrono_storage=None):
         self.cluster = cluster
+        # Link storage levels of representative periods in chronological order,
+        # by default for representative days which are too short to be cyclic
+        if chrono_storage is None:
+            chrono_storage = cluster.period == 'day'
+        self.chrono_storage = chrono_storage
         self.template = template
         self.model_options = model_options
         self.solver = solver
+        self.solver_options = solver_options if solver_options is not None else {}
         self.log = log
         # Internal variables to class
         self.data = None
+        self.solver_stats = {'solver': solver}
         self.tmpdir = tempfile.mkdtemp()
 
     def _gen_dat_files(self):
         # generate a 1 week timestamp range for each cluster member
         # and produce a data control file for each member
+        with open(self.template, 'rt') as fin:
+            template = CompiledTemplate(fin.read(), TIMERANGE_LINE)
         for k in range(self.cluster.max_d):
             date1 = self.cluster.Xcluster['date'][k]
             date2 = date1 + datetime.timedelta(
@@ -245,12 +404,29 @@ class ClusterRun:
             sdate1 = "'" + str(date1) + "'"
             sdate2 = "'" + str(date2) + "'\n"
             drange = "WHERE timestamp BETWEEN " + sdate1 + " AND " + sdate2
-            with open(self.template, 'rt') as fin:
-                with open(self.tmpdir + '/S' + str(k + 1) + '.dat', 'w') as fo:
-                    for line in fin:
-                        if 'WHERE timestamp BETWEEN' in line:
-                            line = drange
-                        fo.write(line)
+            text = template.render(dict.fromkeys(template.keys, drange))
+            if self.solver not in DIRECT_SOLVERS:
+                text = absolute_loads(text)  # runef runs in tmpdir
+            with open(self.tmpdir + '/S' + str(k + 1) + '.dat', 'w') as fo:
+                fo.write(text)
+                if self.chrono_storage:
+                    fo.write(self._chrono_sets(k + 1))
+
+    def _chrono_sets(self, scenario):
+        '''Sets of chronological periods of the year and those represented by a scenario'''
+        sequence = np.asarray(self.cluster.sequence)
+        periods = ' '.join(str(p) for p in range(1, len(sequence) + 1))
+        rep = ' '.join(str(p) for p in np.flatnonzero(sequence == scenario) + 1)
+        return '\nset periods := %s;\nset rep_periods := %s;\n' % (periods, rep)
+
+    def _stage_vars(self):
+        '''Variables shared by all scenarios (first stage decisions)'''
+        stagevars = ['gen_cap_new[*,*]', 'stor_cap_new[*,*]', 'hyb_cap_new[*,*]',
+                     'gen_cap_ret[*,*]']
+        if self.chrono_storage:
+            # levels at the start of each period are shared by all scenarios
+            stagevars += ['stor_period_level[*,*,*]', 'hyb_period_level[*,*,*]']
+        return stagevars
 
     def _gen_scen_struct(self):
         setNodes = 'set Nodes:= Root '
@@ -269,6 +445,7 @@ class ClusterRun:
             setScenarios += Scenario + ' '
             paramScenLeaf += Scenario + ' ' + Node
 
+        stagevars = ' '.join(self._stage_vars())
         setNodes += ';'
         paramNodeStage += ';'
         setChildRoot += ';'
@@ -284,8 +461,8 @@ class ClusterRun:
             'parCondProbrep': parCondProb,
             'setScenariosrep': setScenarios,
             'paramScenLeafrep': paramScenLeaf,
-            'setstagevars1': 'set StageVariables[FS] := gen_cap_new[*,*] stor_cap_new[*,*] hyb_cap_new[*,*] gen_cap_ret[*,*];',
-            'setstagevars2': 'set StageVariables[SS] := gen_cap_new[*,*] stor_cap_new[*,*] hyb_cap_new[*,*] gen_cap_ret[*,*];',
+            'setstagevars1': 'set StageVariables[FS] := ' + stagevars + ';',
+            'setstagevars2': 'set StageVariables[SS] := ' + stagevars + ';',
             'stagecost': 'param StageCost := FS FSCost SS SSCost;',
         }
         with open(self.tmpdir + '/ScenarioStructure.dat', 'wt') as fo:
@@ -309,29 +486,101 @@ class ClusterRun:
             refmodel += "                     region_ret_ratio=" + str(
                 self.model_options['region_ret_ratio']) + ",\n"
             refmodel += "                     nem_disp_ratio=" + str(
-                self.model_options['nem_disp_ratio']) + ")\n"
+                self.model_options['nem_disp_ratio']) + ",\n"
+            if self.chrono_storage:
+                refmodel += "                     chrono_storage=True,\n"
+            # Cluster runs only determine capacity, prices are not needed
+            refmodel += "                     duals=False)\n"
             fo.write(refmodel)
 
+    def _run_direct(self):
+        '''
+        Build the extensive form in process, one block per cluster member, and
+        solve it with an in-process solver, without runef and its files
+        '''
+        from pyomo.environ import ConcreteModel, Constraint, Objective, value
+        from cemo.model import create_model
+        model = create_model('openCEM',
+                             unslim=True,
+                             emitlimit=self.model_options['emitlimit'],
+                             nem_ret_ratio=self.model_options['nem_ret_ratio'],
+                             nem_ret_gwh=self.model_options['nem_ret_gwh'],
+                             region_ret_ratio=self.model_options['region_ret_ratio'],
+                             nem_disp_ratio=self.model_options['nem_disp_ratio'],
+                             nem_re_disp_ratio=self.model_options.get('nem_re_disp_ratio', False),
+                             chrono_storage=self.chrono_storage,
+                             duals=False)
+        ef = ConcreteModel()
+        scenarios = []
+        for k in range(self.cluster.max_d):
+            inst = model.create_instance(self.tmpdir + '/S' + str(k + 1) + '.dat')
+            inst.Obj.deactivate()
+            ef.add_component('S' + str(k + 1), inst)
+            scenarios.append(inst)
+        ef.Obj = Objective(expr=sum(self.cluster.Xcluster['weight'][k]
+                                    * (inst.FSCost + inst.SSCost)
+                                    for k, inst in enumerate(scenarios)))
+        # Non anticipativity: stage variables of all scenarios equal those of the first
+        names = [v.split('[')[0] for v in self._stage_vars()]
+        for name in names:
+            first = scenarios[0].component(name)
+            ef.add_component(name + '_nonant', Constraint(
+                range(2, len(scenarios) + 1), list(first.keys()),
+                rule=lambda ef, k, *i, name=name, first=first:
+                scenarios[k - 1].component(name)[i] == first[i]))
+        self._solve_direct(ef)
+        self.data = {}
+        for name in names:
+            for i, v in scenarios[0].component(name).items():
+                key = ','.join(str(j) for j in (i if isinstance(i, tuple) else (i,)))
+                self.data[name + '[' + key + ']'] = {'solution': value(v)}
+        return self
+
+    def _solve_direct(self, ef):
+        '''Solve the extensive form in process, raising an error if there is no optimal solution'''
+        from pyomo.opt import TerminationCondition
+        opt = solver_factory(self.solver)
+        logfile = self.tmpdir + '/ef_solver.log'
+        with BUDGET.lease(self.solver, self.solver_options) as options:
+            opt.options.update(options)
+            results = opt.solve(ef, tee=self.log, logfile=logfile)
+        self.solver_stats = dict(opt.stats)
+        condition = results.solver.termination_condition
+        if condition != TerminationCondition.optimal:
+            raise RuntimeError("openCEM-cluster: extensive form solve ended %s, see %s"
+                               % (condition, logfile))
+        return results
+
     def run_cluster(self):
         self._gen_dat_files()  # generate .dat files for cluster members
+        if self.solver in DIRECT_SOLVERS:
+            return self._run_direct()
         self._gen_scen_struct()  # generate .dat file for runef tree
         self._gen_ref_model()  # generate reference model for runef
         cmd = [
             "runef", "-m", self.tmpdir, "-s", self.tmpdir, "--solve",
             "--solver=" + self.solver,
-            "--solution-writer=pyomo.pysp.plugins.jsonsolutionwriter"
+            "--solution-writer=pyomo.pysp.plugins.jsonsolutionwriter",
+            "--output-solver-log"
         ]
-        stdout = subprocess.DEVNULL
 
         if self.log:
-            cmd.append("--output-solver-log")
             cmd.append("--traceback")
-            stdout = subprocess.PIPE
 
-        proc = subprocess.run(cmd, stdout=stdout)
-        if proc.returncode == 0:
-            shutil.move("ef_solution.json", self.tmpdir)
-        else:
+        # Keep runef output (including solver log) to report solve statistics.
+        # runef writes ef_solution.json to its working directory, run it in tmpdir
+        # so that concurrent runs (e.g. jobs of a sweep) keep their solutions apart
+        with BUDGET.lease(self.solver, self.solver_options) as options:
+            if options:
+                cmd.append("--solver-options=" + runef_options(options))
+            proc = subprocess.run(cmd, stdout=subprocess.PIPE, universal_newlines=True,
+                                  cwd=self.tmpdir)
+        with open(self.tmpdir + '/runef.log', 'w') as f:
+            f.write(proc.stdout)
+        if self.log:
+            print(proc.stdout)
+        self.solver_stats = parse_log(self.solver, proc.stdout)
+        if proc.returncode != 0:
             sys.exit(proc.returncode)
 
         with open(self.tmpdir + '/ef_solution.json') as f:
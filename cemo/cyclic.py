@@ -0,0 +1,62 @@
+"""Cached cyclic offset tables of ordered sets for chronological constraints"""
+__author__ = "José Zapata"
+__copyright__ = "Copyright 2018, ITP Renewables, Australia"
+__credits__ = ["José Zapata", "Dylan McConnell", "Navid Hagdadi"]
+__license__ = "GPLv3"
+__version__ = "0.9.2"
+__maintainer__ = "José Zapata"
+__email__ = "jose.zapata@itpau.com.au"
+__status__ = "Development"
+import weakref
+
+_CACHE = {}
+
+
+class CyclicIndex:
+    """
+    Position of each member of an ordered set and, for each offset k, the
+    member k positions before it wrapping around the end of the set, as
+    Pyomo's prevw and nextw do. Offset tables are built once per k.
+    """
+
+    def __init__(self, members):
+        self.members = tuple(members)
+        self.position = {m: i for i, m in enumerate(self.members)}
+        self._lags = {}
+
+    def __len__(self):
+        return len(self.members)
+
+    def lag(self, k=1):
+        '''Dictionary of each member to the member k positions before it (after it if k < 0)'''
+        table = self._lags.get(k)
+        if table is None:
+            shift = k % len(self.members) if self.members else 0
+            table = self._lags[k] = dict(zip(
+                self.members, self.members[-shift:] + self.members[:-shift]))
+        return table
+
+    def prevw(self, t, k=1):
+        table = self._lags.get(k)
+        return (self.lag(k) if table is None else table)[t]
+
+    def nextw(self, t, k=1):
+        return self.prevw(t, -k)
+
+
+def cyclic_index(s):
+    '''
+    CyclicIndex of a constructed ordered Pyomo set, shared by all rules
+    constructing constraints over it. Sets are not hashable, so entries are
+    keyed by id and dropped when the set is garbage collected.
+    '''
+    entry = _CACHE.get(id(s))
+    if entry is not None and entry[0]() is s:
+        return entry[1]
+    key = id(s)
+
+    def _drop(ref):
+        if _CACHE.get(key, (None,))[0] is ref:
+            del _CACHE[key]
+    _CACHE[key] = (weakref.ref(s, _drop), CyclicIndex(s))
+    return _CACHE[key][1]
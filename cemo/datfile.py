@@ -0,0 +1,71 @@
+"""Scan openCEM data command files for the parameters they set"""
+__author__ = "José Zapata"
+__copyright__ = "Copyright 2018, ITP Renewables, Australia"
+__credits__ = ["José Zapata", "Dylan McConnell", "Navid Hagdadi"]
+__license__ = "GPLv3"
+__version__ = "0.9.2"
+__maintainer__ = "José Zapata"
+__email__ = "jose.zapata@itpau.com.au"
+__status__ = "Development"
+import os
+import re
+
+# Model options (create_model keyword arguments) enabled by a parameter in a data command file
+POLICY_FLAGS = {
+    'emitlimit': 'nem_year_emit_limit',
+    'nem_disp_ratio': 'nem_disp_ratio',
+    'nem_re_disp_ratio': 'nem_re_disp_ratio',
+    'nem_ret_ratio': 'nem_ret_ratio',
+    'nem_ret_gwh': 'nem_ret_gwh',
+    'region_ret_ratio': 'region_ret_ratio',
+}
+
+# Data commands start a line, so data lines and comments are skipped by the regular expression
+_START = re.compile(r'^[ \t]*(param|set|load)\b([^\n]*)', re.MULTILINE)
+# Rest of a load statement, up to the semicolon outside of quotes
+_LOAD = re.compile(r'(?:[^;"\'#]|"[^"]*"|\'[^\']*\'|#[^\n]*)*;')
+_QUOTED = re.compile(r'"[^"]*"|\'[^\']*\'|#[^\n]*|\[.*?\]')
+
+_CACHE = {}
+
+
+def _scan(text):
+    '''Names of sets and parameters declared or loaded in data command text'''
+    names = set()
+    for match in _START.finditer(text):
+        command, rest = match.groups()
+        if command == 'load':
+            statement = _LOAD.match(text, match.start(2))
+            if statement is not None:
+                body = _QUOTED.sub(' ', statement.group()).rstrip(';')
+                names.update(body[body.rfind(':') + 1:].replace(',', ' ').split())
+            continue
+        head = rest.split(':=')[0].split('#')[0]
+        if head.lstrip().startswith(':'):
+            # tabular form, param : name1 name2 :=
+            names.update(head.lstrip()[1:].split())
+        elif head.split():
+            names.add(head.split()[0])
+    return names
+
+
+def dat_names(filename):
+    '''
+    Names of sets and parameters set by `param`, `set` and `load` statements
+    of a data command file, ignoring comments. The file is read in a single
+    pass and the result is cached until the file changes.
+    '''
+    path = os.path.abspath(filename)
+    st = os.stat(path)
+    stamp = (st.st_mtime_ns, st.st_size)
+    cached = _CACHE.get(path)
+    if cached is None or cached[0] != stamp:
+        with open(path) as f:
+            cached = _CACHE[path] = (stamp, frozenset(_scan(f.read())))
+    return cached[1]
+
+
+def policy_flags(filename):
+    '''Dictionary of model options enabled by the parameters in a data command file'''
+    names = dat_names(filename)
+    return {option: param in names for option, param in POLICY_FLAGS.items()}
@@ -0,0 +1,220 @@
+"""In-process LP solver backends for openCEM instances"""
+__author__ = "José Zapata"
+__copyright__ = "Copyright 2018, ITP Renewables, Australia"
+__credits__ = ["José Zapata", "Dylan McConnell", "Navid Hagdadi"]
+__license__ = "GPLv3"
+__version__ = "0.9.2"
+__maintainer__ = "José Zapata"
+__email__ = "jose.zapata@itpau.com.au"
+__status__ = "Development"
+import time
+import weakref
+
+import numpy as np
+from pyomo.environ import Constraint, Objective, Suffix, maximize, value
+from pyomo.opt import SolverResults, SolverStatus, TerminationCondition
+from pyomo.repn import generate_standard_repn
+
+
+def _bound(b, inf):
+    return inf if b is None else value(b)
+
+
+class LinearProgram:
+    """
+    Row-wise sparse matrix, bounds and costs of the active linear constraints
+    and objective of an instance, built from their standard representations
+    without writing an LP file
+    """
+
+    def __init__(self, instance):
+        self.vars = []  # columns, unfixed variables in constraints or objective
+        self.cons = []  # rows, active constraints
+        col = {}
+        start, index, coef = [0], [], []
+        lower, upper = [], []
+        for c in instance.component_data_objects(Constraint, active=True):
+            repn = generate_standard_repn(c.body, quadratic=False)
+            if not repn.is_linear():
+                raise ValueError("openCEM-direct: constraint %s is not linear" % c.name)
+            for v, a in zip(repn.linear_vars, repn.linear_coefs):
+                j = col.get(id(v))
+                if j is None:
+                    j = col[id(v)] = len(self.vars)
+                    self.vars.append(v)
+                index.append(j)
+                coef.append(a)
+            start.append(len(index))
+            const = value(repn.constant)
+            lower.append(_bound(c.lower, -np.inf) - const)
+            upper.append(_bound(c.upper, np.inf) - const)
+            self.cons.append(c)
+        self._col = col
+        objs = list(instance.component_data_objects(Objective, active=True))
+        if len(objs) != 1:
+            raise ValueError("openCEM-direct: instance must have one active objective")
+        self.objective = objs[0]
+        self.sense = self.objective.sense
+        self.update_objective(add_vars=True)
+        self.start = np.array(start, dtype=np.int32)
+        self.index = np.array(index, dtype=np.int32)
+        self.coef = np.array(coef, dtype=float)
+        self.row_lower = np.array(lower, dtype=float)
+        self.row_upper = np.array(upper, dtype=float)
+        self.col_lower = np.array([_bound(v.lb, -np.inf) for v in self.vars], dtype=float)
+        self.col_upper = np.array([_bound(v.ub, np.inf) for v in self.vars], dtype=float)
+
+    def update_objective(self, add_vars=False):
+        '''
+        Costs and offset from the current objective expression (e.g. after changing
+        mutable cost parameters). Return False if it has variables not in the matrix.
+        '''
+        repn = generate_standard_repn(self.objective.expr, quadratic=False)
+        cost = {}
+        for v, a in zip(repn.linear_vars, repn.linear_coefs):
+            j = self._col.get(id(v))
+            if j is None:
+                if not add_vars:
+                    return False
+                j = self._col[id(v)] = len(self.vars)
+                self.vars.append(v)
+            cost[j] = cost.get(j, 0) + a
+        self.offset = value(repn.constant)
+        self.cost = np.zeros(len(self.vars))
+        self.cost[list(cost)] = list(cost.values())
+        return True
+
+    def load(self, instance, primal, dual=None):
+        '''Set variable values and, if given and imported, constraint duals of instance'''
+        for v, x in zip(self.vars, primal):
+            v.set_value(x, skip_validation=True)
+        duals = instance.component('dual')
+        if dual is not None and isinstance(duals, Suffix) and duals.import_enabled():
+            for c, y in zip(self.cons, dual):
+                duals[c] = y
+
+
+class HighsDirect:
+    """
+    Solve LP instances with the HiGHS library (highspy) in the Python process,
+    passing the constraint matrix directly instead of writing LP and solution
+    files. Used like a Pyomo solver: options dictionary and solve(instance).
+    """
+
+    name = 'highspy'
+
+    def __init__(self):
+        import highspy  # optional dependency, only needed for this backend
+        self._highspy = highspy
+        self.options = {}
+        self.stats = {'solver': self.name}
+        self._last = None  # (instance reference, LinearProgram, Highs) of last solve
+
+    def available(self, exception_flag=False):
+        return True
+
+    def solve(self, instance, tee=False, logfile=None, load_solutions=True, warmstart=False,
+              **kwargs):
+        '''
+        Solve instance, load primal values and duals, and return Pyomo SolverResults.
+        With warmstart, a new solve of the last instance only updates objective
+        costs (constraints must be unchanged) and restarts from the last basis.
+        '''
+        start = time.perf_counter()
+        last = self._last
+        if warmstart and last is not None and last[0]() is instance \
+                and last[1].update_objective():
+            lp, h = last[1], last[2]
+            h.changeColsCost(len(lp.vars), np.arange(len(lp.vars), dtype=np.int32), lp.cost)
+            h.changeObjectiveOffset(lp.offset)
+            # Last basis stays primal feasible when only costs change
+            h.setOptionValue('simplex_strategy', self.options.get('simplex_strategy', 4))
+        else:
+            lp = LinearProgram(instance)
+            h = self._pass_model(lp, tee, logfile)
+        build = time.perf_counter() - start
+        return self._run(instance, lp, h, load_solutions, build)
+
+    def _pass_model(self, lp, tee, logfile):
+        highspy = self._highspy
+        model = highspy.HighsLp()
+        model.num_col_ = len(lp.vars)
+        model.num_row_ = len(lp.cons)
+        model.col_cost_ = lp.cost
+        model.col_lower_ = lp.col_lower
+        model.col_upper_ = lp.col_upper
+        model.row_lower_ = lp.row_lower
+        model.row_upper_ = lp.row_upper
+        model.offset_ = lp.offset
+        model.a_matrix_.format_ = highspy.MatrixFormat.kRowwise
+        model.a_matrix_.num_col_ = len(lp.vars)
+        model.a_matrix_.num_row_ = len(lp.cons)
+        model.a_matrix_.start_ = lp.start
+        model.a_matrix_.index_ = lp.index
+        model.a_matrix_.value_ = lp.coef
+        if lp.sense == maximize:
+            model.sense_ = highspy.ObjSense.kMaximize
+
+        h = highspy.Highs()
+        h.setOptionValue('output_flag', bool(tee or logfile))
+        h.setOptionValue('log_to_console', bool(tee))
+        if logfile:
+            h.setOptionValue('log_file', logfile)
+        for key, val in self.options.items():
+            h.setOptionValue(key, val)
+        h.passModel(model)
+        return h
+
+    def _run(self, instance, lp, h, load_solutions, build):
+        highspy = self._highspy
+        start = time.perf_counter()
+        h.run()
+        run = time.perf_counter() - start
+        self._last = (weakref.ref(instance), lp, h)
+
+        status = h.getModelStatus()
+        info = h.getInfo()
+        results = SolverResults()
+        results.solver.name = self.name
+        optimal = status == highspy.HighsModelStatus.kOptimal
+        results.solver.status = SolverStatus.ok if optimal else SolverStatus.warning
+        results.solver.termination_condition = {
+            highspy.HighsModelStatus.kOptimal: TerminationCondition.optimal,
+            highspy.HighsModelStatus.kInfeasible: TerminationCondition.infeasible,
+            highspy.HighsModelStatus.kUnbounded: TerminationCondition.unbounded,
+            highspy.HighsModelStatus.kUnboundedOrInfeasible:
+                TerminationCondition.infeasibleOrUnbounded,
+            highspy.HighsModelStatus.kTimeLimit: TerminationCondition.maxTimeLimit,
+            highspy.HighsModelStatus.kIterationLimit: TerminationCondition.maxIterations,
+        }.get(status, TerminationCondition.other)
+        self.stats = {
+            'solver': self.name,
+            'status': h.modelStatusToString(status),
+            'objective': info.objective_function_value,
+            'iterations': info.simplex_iteration_count,
+            'barrier_iterations': info.ipm_iteration_count,
+            'solve_time': run,
+            'build_time': build,
+            'rows': len(lp.cons),
+            'cols': len(lp.vars),
+            'nnz': len(lp.coef),
+        }
+        if optimal and load_solutions:
+            solution = h.getSolution()
+            lp.load(instance, solution.col_value,
+                    solution.row_dual if solution.dual_valid else None)
+        return results
+
+
+# In-process backends by solver name, other names are Pyomo solvers
+DIRECT_SOLVERS = {
+    'highspy': HighsDirect,
+}
+
+
+def solver_factory(solver):
+    '''In-process backend for solver if there is one, Pyomo SolverFactory(solver) otherwise'''
+    if solver in DIRECT_SOLVERS:
+        return DIRECT_SOLVERS[solver]()
+    from pyomo.opt import SolverFactory
+    return SolverFactory(solver)
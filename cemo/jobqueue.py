@@ -0,0 +1,264 @@
+"""File based job queue to run openCEM scenario sweeps on several nodes"""
+__author__ = "José Zapata"
+__copyright__ = "Copyright 2018, ITP Renewables, Australia"
+__credits__ = ["José Zapata", "Dylan McConnell", "Navid Hagdadi"]
+__license__ = "GPLv3"
+__version__ = "0.9.2"
+__maintainer__ = "José Zapata"
+__email__ = "jose.zapata@itpau.com.au"
+__status__ = "Development"
+import configparser
+import datetime
+import hashlib
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from cemo.solveropts import BUDGET
+
+# Python code run by job processes, the arguments are the queue directory and job id
+JOB_WORKER = 'import sys; from cemo.jobqueue import run_job; run_job(sys.argv[1], sys.argv[2])'
+# Job states
+PENDING, RUNNING, STALE, DONE, FAILED = 'pending', 'running', 'stale', 'done', 'failed'
+
+
+def _write_json(filename, data):
+    '''Write to a temporary file and rename so readers never see partial files'''
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(filename), suffix='.tmp')
+    with os.fdopen(fd, 'w') as f:
+        json.dump(data, f, indent=1)
+    os.replace(tmp, filename)
+
+
+def run_job(path, job_id):
+    '''Run the multi year simulation of a job in this process, saving results in the queue'''
+    from cemo.multi import SolveTemplate
+    from cemo.profiler import Profiler
+
+    queue = JobQueue(path)
+    job = queue.job(job_id)
+    outdir = queue.result_dir(job_id)
+    X = SolveTemplate(job['cfgfile'], solver=job['solver'], tmpdir=outdir + 'tmp/',
+                      profiler=Profiler(outdir + 'profile.jsonl'),
+                      solver_opts=job['solver_options'])
+    os.makedirs(X.tmpdir, exist_ok=True)
+    X.results_file = outdir + 'results.json'
+    X.solve()
+
+
+class JobQueue:
+    """
+    Queue of multi year simulation jobs (a config file and its chain of
+    investment years) in a directory shared by the nodes of a sweep.
+    Workers claim a job by creating its lock file, which only one of them
+    can do, keep the lock fresh while the job runs in its own process, and
+    publish the results and a manifest in the job result directory.
+    """
+
+    def __init__(self, path):
+        self.path = os.path.abspath(path)
+        for d in ('jobs', 'locks', 'results'):
+            os.makedirs(os.path.join(self.path, d), exist_ok=True)
+
+    def __repr__(self):  # pragma: no cover
+        return 'Job queue at %r' % self.path
+
+    def _job_file(self, job_id):
+        return os.path.join(self.path, 'jobs', job_id + '.json')
+
+    def _lock_file(self, job_id):
+        return os.path.join(self.path, 'locks', job_id + '.lock')
+
+    def result_dir(self, job_id):
+        return os.path.join(self.path, 'results', job_id) + '/'
+
+    def _manifest_file(self, job_id):
+        return self.result_dir(job_id) + 'manifest.json'
+
+    def enqueue(self, cfgfile, solver='cbc', solver_options=None):
+        '''
+        Add the simulation of a config file to the queue and return its job id.
+        Files in the config are found relative to the current directory, which
+        must be shared with the workers. A config file is only queued once.
+        '''
+        cfgfile = os.path.abspath(cfgfile)
+        config = configparser.ConfigParser()
+        with open(cfgfile) as f:
+            config.read_file(f)
+        name = os.path.splitext(os.path.basename(cfgfile))[0]
+        job_id = name + '-' + hashlib.sha1(cfgfile.encode()).hexdigest()[:8]
+        if not os.path.exists(self._job_file(job_id)):
+            _write_json(self._job_file(job_id), {
+                'id': job_id,
+                'cfgfile': cfgfile,
+                'cwd': os.getcwd(),
+                'years': json.loads(config['Scenario']['Years']),
+                'solver': solver,
+                'solver_options': solver_options or {},
+                'enqueued': datetime.datetime.now().isoformat(),
+            })
+        return job_id
+
+    def jobs(self):
+        '''Ids of queued jobs in the order they were queued'''
+        files = [f for f in os.listdir(os.path.join(self.path, 'jobs')) if f.endswith('.json')]
+        files.sort(key=lambda f: (os.path.getmtime(os.path.join(self.path, 'jobs', f)), f))
+        return [os.path.splitext(f)[0] for f in files]
+
+    def job(self, job_id):
+        with open(self._job_file(job_id)) as f:
+            return json.load(f)
+
+    def manifest(self, job_id):
+        '''Manifest of a finished job, or None'''
+        try:
+            with open(self._manifest_file(job_id)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def state(self, job_id, stale=600):
+        '''State of a job, running jobs with locks older than stale seconds are stale'''
+        manifest = self.manifest(job_id)
+        if manifest is not None:
+            return manifest['status']
+        try:
+            age = time.time() - os.path.getmtime(self._lock_file(job_id))
+        except OSError:
+            return PENDING
+        return STALE if age > stale else RUNNING
+
+    def status(self, stale=600):
+        '''Dictionary of job ids by state'''
+        out = {s: [] for s in (PENDING, RUNNING, STALE, DONE, FAILED)}
+        for job_id in self.jobs():
+            out[self.state(job_id, stale)].append(job_id)
+        return out
+
+    def claim(self):
+        '''Lock the first pending job for this worker and return its id, or None'''
+        for job_id in self.jobs():
+            if self.manifest(job_id) is not None:
+                continue
+            try:
+                # Creating the lock file fails if another worker has claimed the job
+                fd = os.open(self._lock_file(job_id), os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                continue
+            with os.fdopen(fd, 'w') as f:
+                json.dump({'host': socket.gethostname(), 'pid': os.getpid(),
+                           'claimed': datetime.datetime.now().isoformat()}, f)
+            return job_id
+        return None
+
+    def requeue(self, stale=600, failed=False):
+        '''Release locks of stale jobs (and of failed jobs if failed) so they run again'''
+        released = []
+        for job_id in self.jobs():
+            state = self.state(job_id, stale)
+            if state == STALE or (failed and state == FAILED):
+                if state == FAILED:
+                    os.remove(self._manifest_file(job_id))
+                os.remove(self._lock_file(job_id))
+                released.append(job_id)
+        return released
+
+    def run(self, job_id, heartbeat=30, threads=None):
+        '''
+        Run a claimed job in a new process with its output in the job log,
+        refreshing its lock every heartbeat seconds, and publish its manifest
+        '''
+        job = self.job(job_id)
+        outdir = self.result_dir(job_id)
+        os.makedirs(outdir, exist_ok=True)
+        env = dict(os.environ, CEMO_THREADS=str(threads or BUDGET.total),
+                   PYTHONPATH=os.pathsep.join(filter(None, [
+                       os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                       os.environ.get('PYTHONPATH')])))
+        start = datetime.datetime.now()
+        wall = time.perf_counter()
+        with open(outdir + 'job.log', 'w') as log:
+            proc = subprocess.Popen([sys.executable, '-c', JOB_WORKER, self.path, job_id],
+                                    cwd=job['cwd'], env=env, stdout=log,
+                                    stderr=subprocess.STDOUT)
+            while True:
+                try:
+                    proc.wait(timeout=heartbeat)
+                    break
+                except subprocess.TimeoutExpired:
+                    os.utime(self._lock_file(job_id))
+        # Results are compressed if the config file says so
+        results = [f for f in ('results.json', 'results.json.gz') if os.path.exists(outdir + f)]
+        manifest = {
+            'id': job_id,
+            'cfgfile': job['cfgfile'],
+            'years': job['years'],
+            'status': DONE if proc.returncode == 0 else FAILED,
+            'returncode': proc.returncode,
+            'host': socket.gethostname(),
+            'start': start.isoformat(),
+            'wall': time.perf_counter() - wall,
+            'results': results[0] if proc.returncode == 0 and results else None,
+            'log': 'job.log',
+        }
+        _write_json(self._manifest_file(job_id), manifest)
+        return manifest
+
+    def work(self, workers=1, poll=10, wait=False, heartbeat=30):
+        '''
+        Claim and run jobs with a number of concurrent worker threads, sharing
+        the solver threads of this node, until the queue has no pending jobs
+        (or, if wait, until all jobs are finished). Return manifests of jobs run.
+        '''
+        threads = max(1, BUDGET.total // workers)
+        manifests = []
+
+        def loop():
+            while True:
+                job_id = self.claim()
+                if job_id is not None:
+                    manifests.append(self.run(job_id, heartbeat, threads))
+                    continue
+                status = self.status()
+                if not wait or not (status[PENDING] or status[RUNNING]):
+                    return
+                time.sleep(poll)
+
+        pool = [threading.Thread(target=loop) for _ in range(workers)]
+        for t in pool:
+            t.start()
+        for t in pool:
+            t.join()
+        return manifests
+
+    def merge(self, prefix, components=('gen_cap_op', 'stor_cap_op', 'hyb_cap_op')):
+        '''
+        Merge the sweep: manifests of finished jobs in prefix.json, with the
+        path of each job results file, and a prefix_<component>.csv table of
+        each component with a job column. Return the number of jobs merged.
+        '''
+        import pandas as pd
+        from cemo.reader import ResultsReader
+
+        manifests = [m for m in (self.manifest(j) for j in self.jobs())
+                     if m is not None and m['status'] == DONE]
+        frames = {name: [] for name in components}
+        for m in manifests:
+            m['results'] = self.result_dir(m['id']) + m['results']
+            reader = ResultsReader(m['results'])
+            for name in components:
+                frame = reader.frame(name)
+                frame.insert(0, 'job', m['id'])
+                frames[name].append(frame)
+        with open(prefix + '.json', 'w') as f:
+            json.dump({'queue': self.path, 'jobs': manifests}, f, indent=1)
+        for name, parts in frames.items():
+            if parts:
+                pd.concat(parts, ignore_index=True).to_csv(prefix + '_' + name + '.csv',
+                                                           index=False)
+        return len(manifests)
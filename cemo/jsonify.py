@@ -15,11 +15,13 @@ __status__ = "Development"
 
 from pyomo.environ import value
 
-from cemo.rules import cost_capital, cost_shadow
+from cemo.results import ResultView
+from cemo.rules import cost_shadow
 
 
-def jsonify(inst):
-    '''Produce full JSON model output'''
+def jsonify(inst, sparse=False):
+    '''Produce full JSON model output, with only non zero variable values if sparse'''
+    fill_var = fill_sparse_var if sparse else fill_complex_var
     out = {'sets':
            {
                inst.regions.name: list(inst.regions),
@@ -95,31 +97,31 @@ def jsonify(inst):
 
            },
            'vars': {
-               inst.gen_cap_new.name: fill_complex_var(inst.gen_cap_new),
-               inst.gen_cap_op.name: fill_complex_var(inst.gen_cap_op),
-               inst.stor_cap_new.name: fill_complex_var(inst.stor_cap_new),
-               inst.stor_cap_op.name: fill_complex_var(inst.stor_cap_op),
-               inst.hyb_cap_new.name: fill_complex_var(inst.hyb_cap_new),
-               inst.hyb_cap_op.name: fill_complex_var(inst.hyb_cap_op),
-               inst.gen_cap_ret.name: fill_complex_var(inst.gen_cap_ret),
-               inst.gen_cap_ret_neg.name: fill_complex_var(inst.gen_cap_ret_neg),
-               inst.gen_cap_exo_neg.name: fill_complex_var(inst.gen_cap_exo_neg),
-               inst.gen_disp.name: fill_complex_var(inst.gen_disp),
-               inst.stor_disp.name: fill_complex_var(inst.stor_disp),
-               inst.stor_charge.name: fill_complex_var(inst.stor_charge),
-               inst.hyb_disp.name: fill_complex_var(inst.hyb_disp),
-               inst.hyb_charge.name: fill_complex_var(inst.hyb_charge),
-               inst.stor_level.name: fill_complex_var(inst.stor_level),
-               inst.hyb_level.name: fill_complex_var(inst.hyb_level),
-               inst.unserved.name: fill_complex_var(inst.unserved),
-               inst.surplus.name: fill_complex_var(inst.surplus),
-               inst.intercon_disp.name: fill_complex_var(inst.intercon_disp)
-           },
-           'duals': {
-               'srmc': fill_dual_suffix(inst.dual, inst.ldbal)
+               inst.gen_cap_new.name: fill_var(inst.gen_cap_new),
+               inst.gen_cap_op.name: fill_var(inst.gen_cap_op),
+               inst.stor_cap_new.name: fill_var(inst.stor_cap_new),
+               inst.stor_cap_op.name: fill_var(inst.stor_cap_op),
+               inst.hyb_cap_new.name: fill_var(inst.hyb_cap_new),
+               inst.hyb_cap_op.name: fill_var(inst.hyb_cap_op),
+               inst.gen_cap_ret.name: fill_var(inst.gen_cap_ret),
+               inst.gen_cap_ret_neg.name: fill_var(inst.gen_cap_ret_neg),
+               inst.gen_cap_exo_neg.name: fill_var(inst.gen_cap_exo_neg),
+               inst.gen_disp.name: fill_var(inst.gen_disp),
+               inst.stor_disp.name: fill_var(inst.stor_disp),
+               inst.stor_charge.name: fill_var(inst.stor_charge),
+               inst.hyb_disp.name: fill_var(inst.hyb_disp),
+               inst.hyb_charge.name: fill_var(inst.hyb_charge),
+               inst.stor_level.name: fill_var(inst.stor_level),
+               inst.hyb_level.name: fill_var(inst.hyb_level),
+               inst.unserved.name: fill_var(inst.unserved),
+               inst.surplus.name: fill_var(inst.surplus),
+               inst.intercon_disp.name: fill_var(inst.intercon_disp)
            },
+           'duals': {},
            'objective_value': value(inst.Obj - cost_shadow(inst))
            }
+    if hasattr(inst, 'dual'):
+        out['duals'].update({'srmc': fill_dual_suffix(inst.dual, inst.ldbal)})
     if hasattr(inst, 'nem_year_emit_limit'):
         out['params'].update({inst.nem_year_emit_limit.name: inst.nem_year_emit_limit.value})
     if hasattr(inst, 'nem_ret_ratio'):
@@ -157,16 +159,34 @@ def jsoninit(inst):
     return out
 
 
+def carry_forward_cap(inst):
+    '''Capacity and capital costs to carry forward to next investment period as Param data'''
+    return {
+        inst.gen_cap_initial.name: {k: v.value for k, v in inst.gen_cap_op.items()},
+        inst.stor_cap_initial.name: {k: v.value for k, v in inst.stor_cap_op.items()},
+        inst.hyb_cap_initial.name: {k: v.value for k, v in inst.hyb_cap_op.items()},
+        inst.cost_cap_carry_forward.name: dict(zip(inst.zones,
+                                                   ResultView(inst).cost_capital().tolist()))
+    }
+
+
+def json_carry_forward(data):
+    '''Produce JSON output of carry forward Param data'''
+    return {name: [{"index": list(k) if isinstance(k, tuple) else k, "value": v}
+                   for k, v in values.items()]
+            for name, values in data.items()}
+
+
+def carry_forward_from_json(data):
+    '''Carry forward Param data from its JSON output'''
+    return {name: {tuple(v["index"]) if isinstance(v["index"], list) else v["index"]: v["value"]
+                   for v in values}
+            for name, values in data.items()}
+
+
 def json_carry_forward_cap(inst):
     '''Produce JSON output of capacity data to carry forward to next investment period'''
-    out = {
-        inst.gen_cap_initial.name: fill_complex_var(inst.gen_cap_op),
-        inst.stor_cap_initial.name: fill_complex_var(inst.stor_cap_op),
-        inst.hyb_cap_initial.name: fill_complex_var(inst.hyb_cap_op),
-        inst.cost_cap_carry_forward.name: [{"index": z, "value": value(cost_capital(inst, z))}
-                                           for z in inst.zones]
-    }
-    return out
+    return json_carry_forward(carry_forward_cap(inst))
 
 
 def jsonopcap0(inst):
@@ -198,7 +218,7 @@ def fill_complex_param(par):
     ''''Return indexed parameter dictionary'''
     out = []
     for i in par.keys():
-        out.append({'index': i, 'value': par[i]})
+        out.append({'index': i, 'value': value(par[i])})
     return out
 
 
@@ -214,7 +234,7 @@ def fill_scalar_key_param(par):
     '''Return scalar key parameter dictionary'''
     out = dict()
     for i in par.keys():
-        out[str(i)] = par[i]
+        out[str(i)] = value(par[i])
 
     return out
 
@@ -228,6 +248,21 @@ def fill_complex_var(var):
     return out
 
 
+def fill_sparse_var(var):
+    '''
+    Return sparse variable dictionary, with the names of the sets of its index
+    and the indices and values of its non zero elements in separate lists
+    '''
+    index = []
+    values = []
+    for i, v in var.items():
+        if v.value != 0:
+            index.append(i)
+            values.append(v.value)
+    return {'domain': [s.name for s in var.index_set().subsets()],
+            'index': index, 'value': values}
+
+
 def fill_dual_suffix(dual, name):
     '''Return dual suffix dictionary'''
     out = []
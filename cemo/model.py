@@ -29,13 +29,17 @@ from cemo.rules import (ScanForHybridperZone, ScanForStorageperZone,
                         con_chargelimhy, con_committed_cap, con_dischargelim,
                         con_dischargelimhy, con_disp_ramp_down,
                         con_disp_ramp_up, con_emissions, con_hybcharge,
-                        con_hycap, con_ldbal, con_max_mwh_as_cap_factor,
+                        con_hyb_level_max, con_hyb_level_min,
+                        con_hyb_period, con_hyb_period_max,
+                        con_hyb_period_min, con_hycap, con_ldbal, con_max_mwh_as_cap_factor,
                         con_maxcap, con_maxcharge, con_maxchargehy, con_maxmhw,
                         con_maxtrans, con_min_load_commit, con_nem_disp_ratio,
                         con_nem_re_disp_ratio, con_nem_ret_gwh,
                         con_nem_ret_ratio, con_opcap, con_ramp_down_uptime,
                         con_region_ret_ratio, con_slackbuild, con_slackretire,
-                        con_stcap, con_storcharge, con_uns,
+                        con_stcap, con_stor_level_max, con_stor_level_min,
+                        con_stor_period, con_stor_period_max,
+                        con_stor_period_min, con_storcharge, con_uns,
                         con_uptime_commitment, obj_cost)
 
 
@@ -46,7 +50,10 @@ def create_model(namestr,
                  nem_ret_gwh=False,
                  region_ret_ratio=False,
                  nem_disp_ratio=False,
-                 nem_re_disp_ratio=False):
+                 nem_re_disp_ratio=False,
+                 chrono_storage=False,
+                 mutable_costs=False,
+                 duals=True):
     """Creates an instance of the pyomo definition of openCEM"""
     m = AbstractModel(name=namestr)
     # Sets
@@ -69,6 +76,10 @@ def create_model(namestr,
     m.hyb_tech = Set(initialize=cemo.const.HYB_TECH) & m.all_tech
     # Set of dispatch intervals
     m.t = Set(ordered=True)
+    if chrono_storage:
+        # Chronological periods of the year and those represented by m.t
+        m.periods = Set(ordered=True)
+        m.rep_periods = Set(within=m.periods)
 
     # Sparse set of zones per region
     m.zones_in_regions = Set(dimen=2, initialize=init_zones_in_regions)
@@ -128,35 +139,39 @@ def create_model(namestr,
     m.SpZ_build = BuildAction(rule=ScanForStorageperZone)
 
     # @@ Parameters
+    # Cost parameters are mutable with mutable_costs, to change them in
+    # constructed instances (e.g. cost sensitivities)
     # Capital costs generators
     # Build costs for generators
-    m.cost_gen_build = Param(m.gen_tech_in_zones, default=9e7)
-    m.cost_stor_build = Param(m.stor_tech_in_zones)  # Capital costs storage
-    m.cost_hyb_build = Param(m.hyb_tech_in_zones)  # Capital costs hybrid
+    m.cost_gen_build = Param(m.gen_tech_in_zones, default=9e7, mutable=mutable_costs)
+    # Capital costs storage
+    m.cost_stor_build = Param(m.stor_tech_in_zones, mutable=mutable_costs)
+    # Capital costs hybrid
+    m.cost_hyb_build = Param(m.hyb_tech_in_zones, mutable=mutable_costs)
 
     m.cost_fuel = Param(
         m.fuel_gen_tech_in_zones,
-        initialize=init_default_fuel_price)  # Fuel cost
+        initialize=init_default_fuel_price, mutable=mutable_costs)  # Fuel cost
 
     # Fixed operating costs generators
-    m.cost_gen_fom = Param(m.all_tech)
+    m.cost_gen_fom = Param(m.all_tech, mutable=mutable_costs)
     # Variable operating costs generators
-    m.cost_gen_vom = Param(m.all_tech)
+    m.cost_gen_vom = Param(m.all_tech, mutable=mutable_costs)
     # Fixed operating costs storage
-    m.cost_stor_fom = Param(m.stor_tech)
+    m.cost_stor_fom = Param(m.stor_tech, mutable=mutable_costs)
     # Variable operating costs storage
-    m.cost_stor_vom = Param(m.stor_tech)
+    m.cost_stor_vom = Param(m.stor_tech, mutable=mutable_costs)
     # Fixed operating costs hybrid
-    m.cost_hyb_fom = Param(m.hyb_tech)
+    m.cost_hyb_fom = Param(m.hyb_tech, mutable=mutable_costs)
     # Variable operating costs hybrid
-    m.cost_hyb_vom = Param(m.hyb_tech)
+    m.cost_hyb_vom = Param(m.hyb_tech, mutable=mutable_costs)
     # Technology lifetime in years
     m.all_tech_lifetime = Param(m.all_tech, initialize=init_default_lifetime)
     # Project discount rate
-    m.all_tech_discount_rate = Param(default=0.05)
+    m.all_tech_discount_rate = Param(default=0.05, mutable=mutable_costs)
 
     # Technology fixed charge rate
-    m.fixed_charge_rate = Param(m.all_tech, initialize=init_fcr)
+    m.fixed_charge_rate = Param(m.all_tech, initialize=init_fcr, mutable=mutable_costs)
     # Per year cost adjustment for sims shorter than 1 year of dispatch
     m.year_correction_factor = Param(initialize=init_year_correction_factor)
 
@@ -165,7 +180,7 @@ def create_model(namestr,
         initialize=cemo.const.
         DEFAULT_COSTS["unserved"])  # cost of unserved power
     # cost in $/kg of total emissions
-    m.cost_emit = Param(initialize=cemo.const.DEFAULT_COSTS["emit"])
+    m.cost_emit = Param(initialize=cemo.const.DEFAULT_COSTS["emit"], mutable=mutable_costs)
     m.cost_trans = Param(
         initialize=cemo.const.DEFAULT_COSTS["trans"])  # cost of transmission
 
@@ -277,6 +292,18 @@ def create_model(namestr,
         m.hyb_tech_in_zones, m.t,
         within=NonNegativeReals)  # Charge level for storage
 
+    if chrono_storage:
+        # Level at the start of each period, shared by all representative periods
+        m.stor_period_level = Var(m.stor_tech_in_zones, m.periods, within=NonNegativeReals)
+        m.hyb_period_level = Var(m.hyb_tech_in_zones, m.periods, within=NonNegativeReals)
+        # Level before the first interval and range of levels within m.t
+        m.stor_start = Var(m.stor_tech_in_zones, within=NonNegativeReals)
+        m.stor_level_max = Var(m.stor_tech_in_zones, within=NonNegativeReals)
+        m.stor_level_min = Var(m.stor_tech_in_zones, within=NonNegativeReals)
+        m.hyb_start = Var(m.hyb_tech_in_zones, within=NonNegativeReals)
+        m.hyb_level_max = Var(m.hyb_tech_in_zones, within=NonNegativeReals)
+        m.hyb_level_min = Var(m.hyb_tech_in_zones, within=NonNegativeReals)
+
     m.unserved = Var(m.regions, m.t, within=NonNegativeReals)  # unserved power
     m.surplus = Var(
         m.regions, m.t, within=NonNegativeReals)  # surplus power (if any)
@@ -385,6 +412,26 @@ def create_model(namestr,
     # HyCap in existing period is previous stor_cap_op plus stor_cap_new
     m.hycap = Constraint(m.hyb_tech_in_zones, rule=con_hycap)
 
+    # Storage levels linked across the chronological periods of the year that
+    # the dispatch intervals represent (e.g. representative days of a cluster)
+    if chrono_storage:
+        # Level change over each represented period carried to the next period
+        m.con_stor_period = Constraint(m.stor_tech_in_zones, m.rep_periods, rule=con_stor_period)
+        m.con_hyb_period = Constraint(m.hyb_tech_in_zones, m.rep_periods, rule=con_hyb_period)
+        # Levels within represented periods stay within storage capacity
+        m.con_stor_period_max = Constraint(
+            m.stor_tech_in_zones, m.rep_periods, rule=con_stor_period_max)
+        m.con_stor_period_min = Constraint(
+            m.stor_tech_in_zones, m.rep_periods, rule=con_stor_period_min)
+        m.con_hyb_period_max = Constraint(
+            m.hyb_tech_in_zones, m.rep_periods, rule=con_hyb_period_max)
+        m.con_hyb_period_min = Constraint(
+            m.hyb_tech_in_zones, m.rep_periods, rule=con_hyb_period_min)
+        m.con_stor_level_max = Constraint(m.stor_tech_in_zones, m.t, rule=con_stor_level_max)
+        m.con_stor_level_min = Constraint(m.stor_tech_in_zones, m.t, rule=con_stor_level_min)
+        m.con_hyb_level_max = Constraint(m.hyb_tech_in_zones, m.t, rule=con_hyb_level_max)
+        m.con_hyb_level_min = Constraint(m.hyb_tech_in_zones, m.t, rule=con_hyb_level_min)
+
     # @@ Objective
     # Minimise capital, variable and fixed costs of system
     m.FSCost = Expression(expr=0)
@@ -392,6 +439,7 @@ def create_model(namestr,
     # objective: minimise all other objectives
     m.Obj = Objective(expr=m.FSCost + m.SSCost)
 
-    # Short run marginal prices
-    m.dual = Suffix(direction=Suffix.IMPORT)
+    # Short run marginal prices (skip dual import if prices are not needed)
+    if duals:
+        m.dual = Suffix(direction=Suffix.IMPORT)
     return m
@@ -9,26 +9,43 @@ __email__ = "jose.zapata@itpau.com.au"
 __status__ = "Development"
 import configparser
 import datetime
+import hashlib
 import json
 import os.path
+import pickle
+import subprocess
+import sys
 import tempfile
+from concurrent.futures import ThreadPoolExecutor
 
-import pandas as pd
-from pyomo.opt import SolverFactory
+from pyomo.environ import DataPortal
 
 import cemo.const
-from cemo.cluster import ClusterRun, InstanceCluster
-from cemo.jsonify import json_carry_forward_cap, jsonify
+from cemo.datfile import policy_flags
+from cemo.direct import DIRECT_SOLVERS, solver_factory
+from cemo.jsonify import (carry_forward_cap, carry_forward_from_json, json_carry_forward,
+                          jsonify)
 from cemo.model import create_model
+from cemo.profiler import Profiler, lp_size
+from cemo.reader import compress_year, write_archive, write_results, write_year
+from cemo.scaling import SCALING, solve
+from cemo.solverlog import parse_logfile
+from cemo.solveropts import BUDGET, barrier_options, solution_accuracy, solver_options
+from cemo.template import YEAR_PLACEHOLDERS, compile_template, placeholder_pattern
+from cemo.traces import TRACES, TraceStore, drop_loads, selection_key
 from cemo.utils import printstats
 
+# pandas and cemo.cluster (scipy) are imported where custom cost, exogenous capacity
+# and cluster options are used, keeping start up of runs without them fast
+
+
+# Python code run by year worker processes, the argument is the task file
+YEAR_WORKER = 'import sys; from cemo.multi import solve_year_task; solve_year_task(sys.argv[1])'
+
 
 def sqllist(techset):
     """Generate a technology set for SQL statement"""
-    out = []
-    for i in techset.keys():
-        for j in techset[i]:
-            out.append((i, j))
+    out = [(i, j) for i in techset for j in techset[i]]
     if not out:
         out.append((99, 99))  # preserve query syntax if list is empty
     return "(" + ", ".join(map(str, out)) + ")"
@@ -36,11 +53,7 @@ def sqllist(techset):
 
 def dclist(techset):
     """Generate a technology set for a data command statement"""
-    out = ""
-    for i in techset.keys():
-        for j in techset[i]:
-            out = out + str(i) + " " + str(j) + "\n"
-    return out
+    return "".join(str(i) + " " + str(j) + "\n" for i in techset for j in techset[i])
 
 
 def roundup(cap):
@@ -82,10 +95,67 @@ def setinstancecapacity(instance, clustercap):
     return instance
 
 
+def solve_year_task(task):
+    '''Solve a year task file saved by SolveTemplate.solve_year_process and save its result'''
+    with open(task, 'rb') as f:
+        t = pickle.load(f)
+    X = SolveTemplate(t['cfgfile'], solver=t['solver'], log=t['log'], tmpdir=t['tmpdir'],
+                      profiler=Profiler(keep=t['profile']), solver_opts=t['solver_options'])
+    X._carry_forward = t['carry_forward']
+    carry = X.solve_year(t['year'], t['year_template'], t['key'])
+    with open(task + '.out', 'wb') as f:
+        pickle.dump({'carry_forward': carry, 'spans': X.profiler.spans}, f)
+
+
+class SolveCache:
+    """
+    Persistent store of full year results (JSON output and capacity carried
+    forward) keyed by a hash of the year template, the capacity carried into
+    the year and the model options, so that identical years of scenario
+    sweeps are solved once. Data loaded by the template is assumed unchanged.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+
+    def __repr__(self):  # pragma: no cover
+        return 'Solve cache at %r' % self.path
+
+    def key(self, template, carry_forward, **params):
+        '''Hash of year template text, carry forward Param data and model options'''
+        h = hashlib.sha256()
+        h.update(json.dumps(params, sort_keys=True).encode())
+        h.update(json.dumps(json_carry_forward(carry_forward or {}), sort_keys=True).encode())
+        h.update(template.encode())
+        return h.hexdigest()
+
+    def _file(self, key):
+        return os.path.join(self.path, key + '.json')
+
+    def get(self, key):
+        '''Stored year JSON output and carry forward Param data, or None'''
+        try:
+            with open(self._file(key)) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return data['result'], carry_forward_from_json(data['carry_forward'])
+
+    def put(self, key, result, carry_forward):
+        data = {'result': result, 'carry_forward': json_carry_forward(carry_forward)}
+        # write to a temporary file and rename so readers never see partial results
+        fd, tmp = tempfile.mkstemp(dir=self.path, suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(data, f)
+        os.replace(tmp, self._file(key))
+
+
 class SolveTemplate:
     """Solve Multi year openCEM simulation based on template"""
 
-    def __init__(self, cfgfile, solver='cbc', log=False, tmpdir=tempfile.mkdtemp() + '/'):
+    def __init__(self, cfgfile, solver='cbc', log=False, tmpdir=tempfile.mkdtemp() + '/',
+                 profiler=None, solver_opts=None):
         config = configparser.ConfigParser()
         try:
             with open(cfgfile) as f:
@@ -138,6 +208,9 @@ class SolveTemplate:
         # Advanced configuration options
         Advanced = config['Advanced']
         self.Template = Advanced['Template']
+        # Policy parameters set in the template itself also enable their constraints
+        for option, enabled in policy_flags(self.Template).items():
+            self.model_options[option] = self.model_options[option] or enabled
 
         self.custom_costs = None
         if config.has_option('Advanced', 'custom_costs'):
@@ -147,9 +220,48 @@ class SolveTemplate:
         if config.has_option('Advanced', 'exogenous_capacity'):
             self.exogenous_capacity = Advanced['exogenous_capacity']
 
+        self.trace_store = None
+        if config.has_option('Advanced', 'trace_store'):
+            self.trace_store = TraceStore(Advanced['trace_store'])
+
+        self.cluster_cache = None
+        if config.has_option('Advanced', 'cluster_cache'):
+            from cemo.cluster import ClusterCache
+            self.cluster_cache = ClusterCache(Advanced['cluster_cache'])
+
+        self.solve_cache = None
+        if config.has_option('Advanced', 'solve_cache'):
+            self.solve_cache = SolveCache(Advanced['solve_cache'])
+
         self.cluster = Advanced.getboolean('cluster')
 
+        # Capacity is carried forward in memory, the JSON file is an optional checkpoint
+        self.carry_forward_checkpoint = Advanced.getboolean('carry_forward_checkpoint',
+                                                            fallback=False)
+        self._carry_forward = None  # (year, Param data) of last investment period
+        # Solve each year in a new process, which returns its memory when it exits
+        self.isolate_years = Advanced.getboolean('isolate_years', fallback=False)
+
+        # Short run marginal prices (ldbal duals) in results, skip dual import if not needed
+        self.prices = Advanced.getboolean('prices', fallback=True)
+        # Save only non zero variable values in results, readers can densify them
+        self.sparse_results = Advanced.getboolean('sparse_results', fallback=False)
+        # Save results as a gzip archive, compressing each year while the next one solves
+        self.compress_results = Advanced.getboolean('compress_results', fallback=False)
+        self._compressor = None
+        self._compressed = {}  # year offsets (futures) of compressed year files
+        # Solve LPs with barrier and no crossover to a basic solution
+        self.crossover = Advanced.getboolean('crossover', fallback=True)
+        # Export scaled LPs to solvers (none or geometric), solutions are unscaled
+        self.scaling = Advanced.get('scaling', fallback='none')
+        if self.scaling not in SCALING:
+            raise ValueError("openCEM-scaling: %s is not one of %s" % (self.scaling, SCALING))
+
         self.cluster_max_d = int(Advanced['cluster_sets'])
+        # Linkage method (e.g. average) or kmedoids for long or high resolution traces
+        self.cluster_method = Advanced.get('cluster_method', fallback='average')
+        # Cluster weeks or representative days (with storage linked across days)
+        self.cluster_period = Advanced.get('cluster_period', fallback='week')
 
         self.regions = cemo.const.REGION.keys()
         if config.has_option('Advanced', 'regions'):
@@ -165,8 +277,21 @@ class SolveTemplate:
         self.all_tech_per_zone = dict(json.loads(Advanced['all_tech_per_zone']))
 
         self.tmpdir = tmpdir
+        # Merged results file, named after the config file
+        self.results_file = self.cfgfile.split(".")[0] + '.json'
         self.solver = solver
+        # Solver options from config file, overriden by those given (e.g. in command line)
+        # Solver option names are case sensitive (e.g. primalT), unlike other config options
+        solver_config = configparser.ConfigParser()
+        solver_config.optionxform = str
+        with open(cfgfile) as f:
+            solver_config.read_file(f)
+        cfg_opts = dict(solver_config['Solver']) if solver_config.has_section('Solver') else {}
+        self.solver_options = solver_options(
+            solver, None if self.crossover else barrier_options(solver), cfg_opts, solver_opts)
         self.log = log
+        # Stage level instrumentation (disabled unless a profiler is given)
+        self.profiler = profiler if profiler is not None else Profiler()
         # initialisation functions
         self.tracetechs()  # TODO refactor this
 
@@ -376,8 +501,37 @@ class SolveTemplate:
                 i: [j for j in self.all_tech_per_zone[i] if j in cemo.const.RETIRE_TECH]
             })
 
+    @property
+    def checkpoint(self):
+        '''Save carry forward JSON file, runef reads it through the year template'''
+        return self.cluster or self.carry_forward_checkpoint
+
+    def carried_forward(self, year):
+        '''Param data carried forward in memory from the investment period before year'''
+        i = self.Years.index(year)
+        if i and self._carry_forward is not None and self._carry_forward[0] == self.Years[i - 1]:
+            return self._carry_forward[1]
+        return None
+
+    def update_carry_forward(self, data, year):
+        '''
+        Keep capacity and capital costs Param data to carry forward to the next
+        investment period (saving the checkpoint file if required).
+        Return the number of values that changed from the last period.
+        '''
+        prev = self._carry_forward[1] if self._carry_forward is not None else {}
+        changed = sum(1 for name, values in data.items()
+                      for k, v in values.items() if prev.get(name, {}).get(k) != v)
+        self._carry_forward = (year, data)
+        if self.checkpoint:
+            with open(self.tmpdir + 'gen_cap_op' + str(year) + '.json', 'w') as op:
+                json.dump(json_carry_forward(data), op)
+        return changed
+
     def carryforwardcap(self, year):
-        if self.Years.index(year):
+        if self.carried_forward(year) is not None and not self.checkpoint:
+            opcap0 = "#operating capacity carried forward in memory\n"
+        elif self.Years.index(year):
             prevyear = self.Years[self.Years.index(year) - 1]
             opcap0 = "load '" + self.tmpdir + "gen_cap_op" + \
                 str(prevyear) + \
@@ -418,7 +572,7 @@ group by zones,all_tech;" : [zones,all_tech] hyb_cap_initial;
     def carry_forward_cap_costs(self, year):
         '''Save total annualised capital costs in carry forward json'''
         carry_fwd_cost = ''
-        if self.Years.index(year):
+        if self.Years.index(year) and (self.carried_forward(year) is None or self.checkpoint):
             carry_fwd_cost = "#Carry forward annualised capital costs\n"
             prevyear = self.Years[self.Years.index(year) - 1]
             carry_fwd_cost += "load '" + self.tmpdir + "gen_cap_op" + \
@@ -441,6 +595,7 @@ group by zones,all_tech;" : [zones,all_tech] hyb_cap_initial;
             'cost_stor_fom': 'tech',
             'cost_stor_vom': 'tech'}
         if self.custom_costs is not None:
+            import pandas as pd
             costs = pd.read_csv(self.custom_costs, skipinitialspace=True)
             for key in keywords.keys():
                 if year in costs.columns:
@@ -482,6 +637,7 @@ group by zones,all_tech;" : [zones,all_tech] hyb_cap_initial;
             'ret_gen_cap_exo': 'zonetech',
         }
         if self.exogenous_capacity is not None:
+            import pandas as pd
             capacity = pd.read_csv(self.exogenous_capacity, skipinitialspace=True)
             prevyear = self.Years[self.Years.index(year) - 1]
             for key in keywords.keys():
@@ -501,6 +657,20 @@ group by zones,all_tech;" : [zones,all_tech] hyb_cap_initial;
 
         return exogenous_capacity
 
+    def fingerprint(self, year_template, year):
+        '''Solve cache key of a year, from its template, carried forward capacity and options'''
+        with open(year_template) as f:
+            # Temporary directory of this run is not part of the year
+            template = f.read().replace(self.tmpdir, '')
+        return self.solve_cache.key(
+            template, self.carried_forward(year), year=year,
+            model_options=self.model_options, solver=self.solver,
+            solver_options=self.solver_options, scaling=self.scaling, prices=self.prices,
+            crossover=self.crossover, sparse_results=self.sparse_results, cluster=self.cluster,
+            cluster_sets=self.cluster_max_d if self.cluster else None,
+            cluster_method=self.cluster_method if self.cluster else None,
+            cluster_period=self.cluster_period if self.cluster else None)
+
     def generateyeartemplate(self, year, test=False):
         """Generate data command file template used for clusters and full runs"""
         date1 = datetime.datetime(year-1, 7, 1, 0, 0, 0)
@@ -567,88 +737,156 @@ group by zones,all_tech;" : [zones,all_tech] hyb_cap_initial;
         else:
             prevyear = self.Years[self.Years.index(year) - 1]
 
-        with open(self.Template, 'rt') as fin:
-            with open(dcfName, 'w') as fo:
-                for line in fin:
-                    line = line.replace('[regions]', " ".join(str(i) for i in self.regions))
-                    line = line.replace('[zones]', " ".join(str(i) for i in self.zones))
-                    line = line.replace('[alltech]', " ".join(str(i) for i in self.all_tech))
-                    line = line.replace('XXXX', str(year))
-                    line = line.replace('WWWW', str(prevyear))
-                    line = line.replace('[gentech]', dclist(self.gentech))
-                    line = line.replace('[gentechdb]', sqllist(self.gentech))
-                    line = line.replace(
-                        '[gentechlist]', ", ".join(
-                            str(i) for i in cemo.const.GEN_TECH if i in self.all_tech))
-                    line = line.replace('[stortech]', dclist(self.stortech))
-                    line = line.replace('[stortechdb]', sqllist(self.stortech))
-                    line = line.replace(
-                        '[stortechlist]', ", ".join(
-                            str(i) for i in cemo.const.STOR_TECH if i in self.all_tech))
-                    line = line.replace('[hybtech]', dclist(self.hybtech))
-                    line = line.replace('[hybtechdb]', sqllist(self.hybtech))
-                    line = line.replace(
-                        '[hybtechlist]', ", ".join(
-                            str(i) for i in cemo.const.HYB_TECH if i in self.all_tech))
-                    line = line.replace('[retiretech]',
-                                        dclist(self.retiretech))
-                    line = line.replace('[retiretechdb]',
-                                        sqllist(self.retiretech))
-                    line = line.replace(
-                        '[retiretechset]', " ".join(
-                            str(i) for i in cemo.const.RETIRE_TECH))
-                    line = line.replace('[fueltech]', dclist(self.fueltech))
-                    line = line.replace('[fueltechdb]', sqllist(self.fueltech))
-                    line = line.replace(
-                        '[fueltechset]', " ".join(
-                            str(i) for i in cemo.const.FUEL_TECH))
-                    line = line.replace('[committech]', dclist(self.committech))
-                    line = line.replace('[regentech]', dclist(self.regentech))
-                    line = line.replace('[dispgentech]', dclist(self.dispgentech))
-                    line = line.replace('[redispgentech]', dclist(self.redispgentech))
-                    line = line.replace(
-                        '[stortechset]', " ".join(
-                            str(i) for i in cemo.const.STOR_TECH))
-                    line = line.replace(
-                        '[hybtechset]', " ".join(
-                            str(i) for i in cemo.const.HYB_TECH))
-                    line = line.replace(
-                        '[nobuildset]', " ".join(
-                            str(i) for i in cemo.const.NOBUILD_TECH))
-                    line = line.replace('[carryforwardcap]', opcap0)
-                    line = line.replace('[timerange]', drange)
-                    # REVIEW [___techset] entrie may be superceeded by model sets initialisation
-                    fo.write(line)
-                fo.write(custom_costs)
-                fo.write(exogenous_capacity)
-                fo.write(fcr)
-                fo.write(cemit)
-                fo.write(carry_fwd_cap)
-                fo.write(nem_ret_ratio)
-                fo.write(nem_ret_gwh)
-                fo.write(region_ret_ratio)
-                fo.write(emitlimit)
-                fo.write(nem_disp_ratio)
-                fo.write(nem_re_disp_ratio)
+        values = {
+            '[regions]': " ".join(str(i) for i in self.regions),
+            '[zones]': " ".join(str(i) for i in self.zones),
+            '[alltech]': " ".join(str(i) for i in self.all_tech),
+            'XXXX': str(year),
+            'WWWW': str(prevyear),
+            '[gentech]': dclist(self.gentech),
+            '[gentechdb]': sqllist(self.gentech),
+            '[gentechlist]': ", ".join(
+                str(i) for i in cemo.const.GEN_TECH if i in self.all_tech),
+            '[stortech]': dclist(self.stortech),
+            '[stortechdb]': sqllist(self.stortech),
+            '[stortechlist]': ", ".join(
+                str(i) for i in cemo.const.STOR_TECH if i in self.all_tech),
+            '[hybtech]': dclist(self.hybtech),
+            '[hybtechdb]': sqllist(self.hybtech),
+            '[hybtechlist]': ", ".join(
+                str(i) for i in cemo.const.HYB_TECH if i in self.all_tech),
+            '[retiretech]': dclist(self.retiretech),
+            '[retiretechdb]': sqllist(self.retiretech),
+            '[retiretechset]': " ".join(str(i) for i in cemo.const.RETIRE_TECH),
+            '[fueltech]': dclist(self.fueltech),
+            '[fueltechdb]': sqllist(self.fueltech),
+            '[fueltechset]': " ".join(str(i) for i in cemo.const.FUEL_TECH),
+            '[committech]': dclist(self.committech),
+            '[regentech]': dclist(self.regentech),
+            '[dispgentech]': dclist(self.dispgentech),
+            '[redispgentech]': dclist(self.redispgentech),
+            '[stortechset]': " ".join(str(i) for i in cemo.const.STOR_TECH),
+            '[hybtechset]': " ".join(str(i) for i in cemo.const.HYB_TECH),
+            '[nobuildset]': " ".join(str(i) for i in cemo.const.NOBUILD_TECH),
+            '[carryforwardcap]': opcap0,
+            '[timerange]': drange,
+        }
+        # REVIEW [___techset] entrie may be superceeded by model sets initialisation
+        template = compile_template(self.Template, placeholder_pattern(YEAR_PLACEHOLDERS))
+        with open(dcfName, 'w') as fo:
+            fo.write(template.render(values))
+            fo.write(custom_costs)
+            fo.write(exogenous_capacity)
+            fo.write(fcr)
+            fo.write(cemit)
+            fo.write(carry_fwd_cap)
+            fo.write(nem_ret_ratio)
+            fo.write(nem_ret_gwh)
+            fo.write(region_ret_ratio)
+            fo.write(emitlimit)
+            fo.write(nem_disp_ratio)
+            fo.write(nem_re_disp_ratio)
         return dcfName
 
+    def trace_key(self, year_template, year):
+        '''Trace store key of year and the time range, zones and techs of its template'''
+        with open(year_template) as f:
+            return selection_key(year, f, [list(self.regions), list(self.zones),
+                                           sorted(self.all_tech_per_zone.items())])
+
+    def create_instance(self, model, year_template, year, trace_key=None):
+        '''
+        Create model instance from year template.
+        Trace parameters come from the trace store when it holds the traces
+        selected by the template (trace_key), otherwise they are loaded by
+        the template and saved into the store.
+        '''
+        data = DataPortal(model=model)
+        if self.trace_store is not None and trace_key is None:
+            trace_key = self.trace_key(year_template, year)
+        stored = self.trace_store is not None and self.trace_store.has_year(trace_key)
+        carried = self.carried_forward(year)
+        with self.profiler.span('data_load', year=year):
+            # Skip loads of data served from the trace store or carried forward in memory
+            targets = (['t'] + list(TRACES) if stored else []) + list(carried or [])
+            if targets:
+                inst_template = os.path.splitext(year_template)[0] + '_inst.dat'
+                with open(year_template) as fin, open(inst_template, 'w') as fo:
+                    fo.writelines(drop_loads(fin, targets))
+                year_template = inst_template
+            data.load(filename=year_template)
+            if stored:
+                self.trace_store.to_dataportal(data, trace_key)
+            for name, values in (carried or {}).items():
+                data[name] = values
+        with self.profiler.span('create_instance', year=year):
+            inst = model.create_instance(data)
+        if self.profiler.enabled:
+            # Measured apart, generating the LP repn takes a large part of create_instance
+            with self.profiler.span('lp_size', year=year) as span:
+                span.update(lp_size(inst))
+        if self.trace_store is not None and not stored:
+            self.trace_store.from_instance(inst, trace_key)
+        return inst
+
     def solve(self):
         """
         Multi year simulation:
         Instantiate a template instance for each year in the simulation.
         Calcualte capacity using clustering and dispatch with full year.
         Alternatively caculate capacity and dispatch simultanteously using full year instance
-        Save capacity results for carry forward in json file.
-        Save full results for year in JSON file.
+        Keep capacity results in memory to carry forward (optionally saved to json file).
+        Optionally solve each year in a new process to keep memory down.
+        Save full results for year in JSON file (optionally compressed while next year solves).
         Assemble full simulation output as metadata+ full year results in each simulated year
         """
+        prof = self.profiler
         for y in self.Years:
             if self.log:
                 print("openCEM multi: Starting simulation for year %s" % y)
             # Populate template with this inv period's year and timestamps
-            year_template = self.generateyeartemplate(y)
-            # Solve full year capacity and dispatch instance
-            # Create model based on policy configuration options
+            with prof.span('template', year=y):
+                year_template = self.generateyeartemplate(y)
+            # Reuse stored results of an identical year solved before
+            key = None
+            if self.solve_cache is not None:
+                with prof.span('solve_cache', year=y) as span:
+                    key = self.fingerprint(year_template, y)
+                    stored = self.solve_cache.get(key)
+                    span['hit'] = stored is not None
+                if stored is not None:
+                    if self.log:
+                        print("openCEM multi: Reusing stored results for year %s" % y)
+                    out, carry = stored
+                    if y != self.Years[-1]:
+                        self.update_carry_forward(carry, y)
+                    write_year(self.tmpdir + str(y) + '.json', out)
+                    self.archive_year(y)
+                    continue
+            if self.isolate_years:
+                carry = self.solve_year_process(y, year_template, key)
+            else:
+                carry = self.solve_year(y, year_template, key)
+            self.archive_year(y)
+            # Carry forward operating capacity to next Inv period
+            with prof.span('carry_forward', year=y) as span:
+                if y != self.Years[-1]:
+                    span['changed'] = self.update_carry_forward(carry, y)
+        # Merge JSON output for all investment periods
+        if self.log:
+            print("openCEM multi: Saving final results to JSON file")
+        with prof.span('merge'):
+            self.mergejsonyears()
+
+    def solve_year(self, y, year_template, key=None):
+        '''
+        Solve year from its template and save its JSON results, also in the
+        solve cache if a key is given. Return the capacity data to carry forward.
+        '''
+        prof = self.profiler
+        # Solve full year capacity and dispatch instance
+        # Create model based on policy configuration options
+        with prof.span('create_model', year=y):
             model = create_model(
                 y,
                 nem_ret_ratio=self.model_options['nem_ret_ratio'],
@@ -656,60 +894,149 @@ group by zones,all_tech;" : [zones,all_tech] hyb_cap_initial;
                 region_ret_ratio=self.model_options['region_ret_ratio'],
                 emitlimit=self.model_options['emitlimit'],
                 nem_disp_ratio=self.model_options['nem_disp_ratio'],
-                nem_re_disp_ratio=self.model_options['nem_re_disp_ratio'])
-            # create model instance based in template data
-            inst = model.create_instance(year_template)
-            # These presolve capacity on a clustered form
-            if self.cluster:
-                clus = InstanceCluster(inst, self.cluster_max_d)
+                nem_re_disp_ratio=self.model_options['nem_re_disp_ratio'],
+                duals=self.prices)
+        # create model instance based in template data
+        trace_key = None
+        if self.trace_store is not None:
+            trace_key = self.trace_key(year_template, y)
+        inst = self.create_instance(model, year_template, y, trace_key)
+        # These presolve capacity on a clustered form
+        if self.cluster:
+            from cemo.cluster import ClusterRun, InstanceCluster, TraceStoreCluster
+            with prof.span('clustering', year=y) as span:
+                if self.trace_store is not None:
+                    clus = TraceStoreCluster(self.trace_store, y, self.cluster_max_d,
+                                             regions=list(inst.regions),
+                                             cache=self.cluster_cache,
+                                             method=self.cluster_method,
+                                             period=self.cluster_period, key=trace_key)
+                else:
+                    clus = InstanceCluster(inst, self.cluster_max_d, cache=self.cluster_cache,
+                                           method=self.cluster_method,
+                                           period=self.cluster_period)
+                span['cached'] = clus.cached
+            with prof.span('ef_solve', year=y):
                 ccap = ClusterRun(
                     clus,
                     year_template,
                     model_options=self.model_options,
                     solver=self.solver,
+                    solver_options=self.solver_options,
                     log=self.log).run_cluster()
+            with prof.span('setinstancecapacity', year=y):
                 inst = setinstancecapacity(inst, ccap)
 
-            # Solve the model (or just dispatch if capacity has been solved)
-            opt = SolverFactory(self.solver)
-            if self.log:
-                print("openCEM multi: Starting full year dispatch simulation")
-            opt.solve(inst, tee=self.log, keepfiles=self.log)
-
-            # Carry forward operating capacity to next Inv period
-            opcap = json_carry_forward_cap(inst)
-            if y != self.Years[-1]:
-                with open(self.tmpdir + 'gen_cap_op' + str(y) + '.json',
-                          'w') as op:
-                    json.dump(opcap, op)
-            # Dump simulation result in JSON forma
-            if self.log:
-                print("openCEM multi: Saving year %s results into temporary file" % y)
-            out = jsonify(inst)
-            with open(self.tmpdir + str(y) + '.json', 'w') as jo:
-                json.dump(out, jo)
-
-            printstats(inst)
-
-            del inst  # to keep memory down
-        # Merge JSON output for all investment periods
+        # Solve the model (or just dispatch if capacity has been solved)
+        opt = solver_factory(self.solver)
         if self.log:
-            print("openCEM multi: Saving final results to JSON file")
-        self.mergejsonyears()
+            print("openCEM multi: Starting full year dispatch simulation")
+        logfile = self.tmpdir + 'solver' + str(y) + '.log'
+        with prof.span('solve', year=y):
+            with BUDGET.lease(self.solver, self.solver_options) as options:
+                opt.options.update(options)
+                solve(opt, inst, self.scaling,
+                      tee=self.log, keepfiles=self.log, logfile=logfile)
+        if self.solver in DIRECT_SOLVERS:
+            solver_stats = {'dispatch': dict(opt.stats)}
+        else:
+            solver_stats = {'dispatch': parse_logfile(self.solver, logfile)}
+        if not self.crossover:
+            # Report accuracy of barrier solution without crossover
+            solver_stats['dispatch'].update(solution_accuracy(inst))
+        if self.cluster:
+            solver_stats['cluster'] = ccap.solver_stats
+
+        # Capacity to carry forward to next Inv period
+        with prof.span('carry_forward_cap', year=y):
+            carry = carry_forward_cap(inst)
+        # Dump simulation result in JSON forma
+        if self.log:
+            print("openCEM multi: Saving year %s results into temporary file" % y)
+        with prof.span('jsonify', year=y):
+            out = jsonify(inst, sparse=self.sparse_results)
+            out['solver_stats'] = solver_stats
+        with prof.span('json_dump', year=y):
+            # Offsets of components are saved next to the file, e.g. for compress_year
+            write_year(self.tmpdir + str(y) + '.json', out)
+        if key is not None:
+            self.solve_cache.put(key, out, carry)
+
+        with prof.span('printstats', year=y):
+            printstats(inst)
+        return carry
+
+    def solve_year_process(self, y, year_template, key=None):
+        '''
+        Solve year in a new Python process, so that memory held by the model,
+        its data and solver interfaces is returned when the process exits and
+        a crash in a year does not stop the driver without a report.
+        Return the capacity data to carry forward.
+        '''
+        task = self.tmpdir + 'year' + str(y) + '.task'
+        with open(task, 'wb') as f:
+            pickle.dump({
+                'cfgfile': self.cfgfile,
+                'solver': self.solver,
+                'solver_options': self.solver_options,
+                'log': self.log,
+                'tmpdir': self.tmpdir,
+                'profile': self.profiler.enabled,
+                'carry_forward': self._carry_forward,
+                'year': y,
+                'year_template': year_template,
+                'key': key,
+            }, f)
+        # Worker shares the thread budget and imports this cemo package
+        env = dict(os.environ, CEMO_THREADS=str(BUDGET.total),
+                   PYTHONPATH=os.pathsep.join(filter(None, [
+                       os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                       os.environ.get('PYTHONPATH')])))
+        with self.profiler.span('year_process', year=y) as span:
+            proc = subprocess.run([sys.executable, '-c', YEAR_WORKER, task], env=env)
+            span['returncode'] = proc.returncode
+        if proc.returncode != 0:
+            raise RuntimeError("openCEM-multi: year %s process failed with exit code %s,"
+                               " results of previous years are in %s"
+                               % (y, proc.returncode, self.tmpdir))
+        with open(task + '.out', 'rb') as f:
+            result = pickle.load(f)
+        self.profiler.extend(result['spans'])
+        return result['carry_forward']
+
+    def archive_year(self, y):
+        '''Compress JSON results of year in a background thread, if compress_results'''
+        if self.compress_results:
+            if self._compressor is None:
+                self._compressor = ThreadPoolExecutor(max_workers=1)
+            self._compressed[y] = self._compressor.submit(compress_year,
+                                                          self.tmpdir + str(y) + '.json')
 
     def mergejsonyears(self):
         '''Merge the full year JSON output for each simulated year in a single dictionary'''
-        data = self.generate_metadata()
-        for y in self.Years:
-            with open(self.tmpdir + str(y) + '.json', 'r') as f:
-                yeardata = {str(y): json.load(f)}
-            data.update(yeardata)
-        # Save json output named after .cfg file
-        with open(self.cfgfile.split(".")[0] + '.json', 'w') as fo:
-            json.dump(data, fo)
+        if self.compress_results:
+            def compressed():
+                for y in self.Years:
+                    if y not in self._compressed:
+                        self.archive_year(y)
+                    yield y, self.tmpdir + str(y) + '.json.gz', self._compressed[y].result()
+            # Archive of the compressed years, named after .cfg file by default
+            write_archive(self.results_file + '.gz', self.generate_metadata(), compressed())
+            self._compressor.shutdown()
+            self._compressor = None
+            return
+
+        def years():
+            for y in self.Years:
+                with open(self.tmpdir + str(y) + '.json', 'r') as f:
+                    yield y, json.load(f)
+        # Save json output (named after .cfg file by default), with an index for ResultsReader
+        write_results(self.results_file, self.generate_metadata(), years())
 
     def generate_metadata(self):
         '''Append simulation metadata to full JSON output'''
+        import pandas as pd
+
         meta = {
             "Name": self.Name,
             "Years": self.Years,
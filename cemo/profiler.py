@@ -0,0 +1,137 @@
+"""Stage level timing and memory instrumentation for openCEM runs"""
+__author__ = "José Zapata"
+__copyright__ = "Copyright 2018, ITP Renewables, Australia"
+__credits__ = ["José Zapata", "Dylan McConnell", "Navid Hagdadi"]
+__license__ = "GPLv3"
+__version__ = "0.9.2"
+__maintainer__ = "José Zapata"
+__email__ = "jose.zapata@itpau.com.au"
+__status__ = "Development"
+import contextlib
+import datetime
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+try:
+    import resource
+except ImportError:  # pragma: no cover
+    resource = None  # Not available in Windows
+
+
+def maxrss():
+    '''Peak resident set size in MB of this process and of its largest child (e.g. solver)'''
+    if resource is None:  # pragma: no cover
+        return None
+    # ru_maxrss is in kB in Linux and in bytes in macOS
+    scale = 2**20 if sys.platform == 'darwin' else 2**10
+    return max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+               resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss) / scale
+
+
+def rss():
+    '''Current resident set size in MB of this process, None if not known (not Linux)'''
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2**20
+    except (OSError, ValueError, IndexError):  # pragma: no cover
+        return None
+
+
+def _children_cpu():
+    if resource is None:  # pragma: no cover
+        return 0.0
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+def lp_size(inst):
+    '''Return rows, columns and non zeros of the LP of a model instance'''
+    from pyomo.environ import Constraint, Var
+    from pyomo.repn import generate_standard_repn
+
+    rows = 0
+    nnz = 0
+    for c in inst.component_data_objects(Constraint, active=True):
+        rows += 1
+        nnz += len(generate_standard_repn(c.body, compute_values=False).linear_vars)
+    cols = sum(1 for v in inst.component_data_objects(Var) if not v.fixed)
+    return {'rows': rows, 'cols': cols, 'nnz': nnz}
+
+
+class Profiler:
+    """
+    Record wall time, CPU time (own and child processes) and RSS at start
+    and end of named stages (spans), with the peak RSS of the process so far.
+    Spans are kept in memory and, if a trace file is given, appended to it
+    as JSON lines as soon as they finish.
+    A profiler without a trace file and not kept records nothing.
+    """
+
+    def __init__(self, path=None, memory=False, keep=False):
+        self.path = path
+        self.memory = memory  # trace python allocations (slower)
+        self.keep = keep  # keep spans in memory without a trace file
+        self.spans = []
+        if path is not None:
+            open(path, 'w').close()
+
+    @property
+    def enabled(self):
+        return self.path is not None or self.keep
+
+    @contextlib.contextmanager
+    def span(self, name, **attrs):
+        '''Measure the enclosed block as a stage called name, with extra attributes'''
+        if not self.enabled:
+            yield attrs
+            return
+        if self.memory:
+            tracemalloc.start()
+        start = datetime.datetime.now().isoformat()
+        rss_start = rss()
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        cpu_children = _children_cpu()
+        # attributes may be added by the enclosed block, e.g. LP size
+        try:
+            yield attrs
+        except BaseException as ex:
+            attrs['error'] = repr(ex)
+            raise
+        finally:
+            self._record(name, start, wall, cpu, cpu_children, rss_start, attrs)
+
+    def extend(self, spans):
+        '''Add spans recorded by another profiler, e.g. in a worker process'''
+        if not self.enabled:
+            return
+        self.spans.extend(spans)
+        if self.path is not None:
+            with open(self.path, 'a') as f:
+                for rec in spans:
+                    f.write(json.dumps(rec) + '\n')
+
+    def _record(self, name, start, wall, cpu, cpu_children, rss_start, attrs):
+        rec = {
+            'stage': name,
+            'start': start,
+            'wall': time.perf_counter() - wall,
+            'cpu': time.process_time() - cpu,
+            'cpu_children': _children_cpu() - cpu_children,
+            'rss_start_mb': rss_start,
+            'rss_mb': rss(),
+            # ru_maxrss is the peak over the life of the process, not within the span
+            'process_peak_rss_mb': maxrss(),
+            'pid': os.getpid(),
+        }
+        if self.memory:
+            rec['python_peak_mb'] = tracemalloc.get_traced_memory()[1] / 2**20
+            tracemalloc.stop()
+        rec.update(attrs)
+        self.spans.append(rec)
+        if self.path is not None:
+            with open(self.path, 'a') as f:
+                f.write(json.dumps(rec) + '\n')
@@ -0,0 +1,430 @@
+"""Lazy, queryable reader of merged multi year openCEM results"""
+__author__ = "José Zapata"
+__copyright__ = "Copyright 2018, ITP Renewables, Australia"
+__credits__ = ["José Zapata", "Dylan McConnell", "Navid Hagdadi"]
+__license__ = "GPLv3"
+__version__ = "0.9.2"
+__maintainer__ = "José Zapata"
+__email__ = "jose.zapata@itpau.com.au"
+__status__ = "Development"
+import gzip
+import itertools
+import json
+import os
+import re
+import shutil
+from json.decoder import scanstring
+
+import numpy as np
+
+import cemo.const
+
+# Sections of a year of results holding named components
+SECTIONS = ('sets', 'params', 'vars', 'duals')
+
+_ZN = ('zone', 'tech')
+_ZNT = ('zone', 'tech', 'timestamp')
+_RT = ('region', 'timestamp')
+# Names of index columns of result components
+COLUMNS = {
+    'gen_cap_new': _ZN, 'gen_cap_op': _ZN, 'stor_cap_new': _ZN, 'stor_cap_op': _ZN,
+    'hyb_cap_new': _ZN, 'hyb_cap_op': _ZN, 'gen_cap_ret': _ZN, 'gen_cap_ret_neg': _ZN,
+    'gen_cap_exo_neg': _ZN, 'cost_gen_build': _ZN, 'cost_stor_build': _ZN,
+    'cost_hyb_build': _ZN, 'cost_fuel': _ZN, 'fuel_heat_rate': _ZN, 'gen_build_limit': _ZN,
+    'gen_cap_initial': _ZN, 'stor_cap_initial': _ZN, 'hyb_cap_initial': _ZN,
+    'gen_cap_exo': _ZN, 'stor_cap_exo': _ZN, 'hyb_cap_exo': _ZN, 'ret_gen_cap_exo': _ZN,
+    'gen_disp': _ZNT, 'stor_disp': _ZNT, 'stor_charge': _ZNT, 'hyb_disp': _ZNT,
+    'hyb_charge': _ZNT, 'stor_level': _ZNT, 'hyb_level': _ZNT, 'gen_cap_factor': _ZNT,
+    'hyb_cap_factor': _ZNT,
+    'unserved': _RT, 'surplus': _RT, 'region_net_demand': _RT, 'srmc': _RT,
+    'intercon_disp': ('region', 'region_dest', 'timestamp'),
+    'intercon_prop_factor': ('region', 'region_dest'),
+    'intercon_trans_limit': ('region', 'region_dest'),
+}
+# Column filters accepted by ResultsReader.frame (regions also filter zone indexed components)
+FILTERS = {'zones': 'zone', 'techs': 'tech', 'regions': 'region'}
+
+_WS = re.compile(r'\s*')
+
+
+def is_sparse(comp):
+    '''True for components saved with only their non zero values (jsonify sparse output)'''
+    return isinstance(comp, dict) and 'domain' in comp
+
+
+def _key(i):
+    return tuple(i) if isinstance(i, list) else (i,)
+
+
+def densify(comp, sets):
+    '''
+    Records of all elements of a sparse component, in the order of its
+    domain, with value 0 for elements left out. sets are the members of
+    the domain sets as saved in results.
+    '''
+    stored = dict(zip((_key(i) for i in comp['index']), comp['value']))
+    out = []
+    for members in itertools.product(*(sets[d] for d in comp['domain'])):
+        key = sum((_key(m) for m in members), ())
+        out.append({'index': list(key) if len(key) > 1 else key[0],
+                    'value': stored.get(key, 0)})
+    return out
+
+
+def sparse_records(comp):
+    '''Records of the elements saved in a sparse component'''
+    return [{'index': i, 'value': v} for i, v in zip(comp['index'], comp['value'])]
+
+
+def index_file(filename):
+    return os.path.splitext(filename)[0] + '.index.json'
+
+
+def _stamp(filename):
+    st = os.stat(filename)
+    return {'size': st.st_size, 'mtime_ns': st.st_mtime_ns}
+
+
+class _Writer:
+    """Text file writer keeping the offset of the next character written"""
+
+    def __init__(self, f):
+        self.f = f
+        self.pos = 0
+
+    def __call__(self, s):
+        self.f.write(s)
+        self.pos += len(s)  # json.dumps escapes non ASCII characters
+
+
+def _write_year(write, yeardata):
+    '''Write a year of results (as json.dumps), return the offsets of the year and components'''
+    entry = {'span': [write.pos], 'sections': {}, 'other': {}}
+    write('{')
+    ysep = ''
+    for key, value in yeardata.items():
+        write(ysep + json.dumps(key) + ': ')
+        ysep = ', '
+        if key in SECTIONS and isinstance(value, dict):
+            section = entry['sections'][key] = {}
+            write('{')
+            csep = ''
+            for name, comp in value.items():
+                write(csep + json.dumps(name) + ': ')
+                csep = ', '
+                start = write.pos
+                write(json.dumps(comp))
+                section[name] = [start, write.pos]
+            write('}')
+        else:
+            start = write.pos
+            write(json.dumps(value))
+            entry['other'][key] = [start, write.pos]
+    write('}')
+    entry['span'].append(write.pos)
+    return entry
+
+
+def write_results(filename, meta, years):
+    '''
+    Write merged results JSON (same content as json.dump of the merged dictionary)
+    from meta data and an iterable of (year, year results) pairs, and save the
+    byte offsets of each year and component to a sidecar index file.
+    '''
+    index = {'meta': None, 'years': {}}
+    with open(filename, 'w') as fo:
+        write = _Writer(fo)
+        write('{')
+        sep = ''
+        for key, value in meta.items():
+            write(sep + json.dumps(key) + ': ')
+            sep = ', '
+            start = write.pos
+            write(json.dumps(value))
+            if key == 'meta':
+                index['meta'] = [start, write.pos]
+        for year, yeardata in years:
+            write(sep + json.dumps(str(year)) + ': ')
+            sep = ', '
+            index['years'][str(year)] = _write_year(write, yeardata)
+        write('}')
+    _save_index(filename, index)
+    return index
+
+
+def write_year(filename, yeardata):
+    '''
+    Write a year of results as JSON (same content as json.dump) and save
+    the offsets of its components to a sidecar index file for compress_year
+    '''
+    with open(filename, 'w') as fo:
+        entry = _write_year(_Writer(fo), yeardata)
+    with open(index_file(filename), 'w') as f:
+        json.dump(entry, f)
+    return entry
+
+
+def compress_year(filename, remove=True):
+    '''
+    Compress a year of results saved by write_year into a gzip file of its
+    own (filename + '.gz'), optionally removing the JSON file. Return the
+    byte offsets of the year and its components in the JSON text, for
+    write_archive. The file is compressed in chunks, not read into memory.
+    '''
+    with open(filename, 'rb') as fi, gzip.open(filename + '.gz', 'wb') as fo:
+        shutil.copyfileobj(fi, fo, 2**20)
+    with open(index_file(filename)) as f:
+        entry = json.load(f)
+    if remove:
+        os.remove(filename)
+        os.remove(index_file(filename))
+    return entry
+
+
+def _shift(entry, offset):
+    '''Year index entry with offsets moved by offset'''
+    def move(span):
+        return [span[0] + offset, span[1] + offset]
+    return {'span': move(entry['span']),
+            'sections': {s: {n: move(v) for n, v in comps.items()}
+                         for s, comps in entry['sections'].items()},
+            'other': {k: move(v) for k, v in entry['other'].items()}}
+
+
+def write_archive(filename, meta, years):
+    '''
+    Write merged results as a gzip file of several members: the meta data,
+    then for each year a short member with its key and the compressed year
+    file from compress_year. Decompressed, it is the same as write_results
+    output. The sidecar index also has the offsets of each member, so a
+    component is read by decompressing the member of its year only.
+    years is an iterable of (year, compressed year file, compress_year entry).
+    '''
+    index = {'meta': None, 'years': {}, 'members': []}
+    members = index['members']
+    with open(filename, 'wb') as fo:
+        def add(data, size):
+            '''Append a member of size bytes uncompressed, return its uncompressed start'''
+            cstart, ustart = (members[-1][1], members[-1][3]) if members else (0, 0)
+            fo.write(data)
+            members.append([cstart, cstart + len(data), ustart, ustart + size])
+            return ustart
+        head = '{'
+        sep = ''
+        for key, value in meta.items():
+            head += sep + json.dumps(key) + ': '
+            sep = ', '
+            start = len(head)
+            head += json.dumps(value)
+            if key == 'meta':
+                index['meta'] = [start, len(head)]
+        add(gzip.compress(head.encode()), len(head))
+        for year, gzfile, entry in years:
+            key = sep + json.dumps(str(year)) + ': '
+            sep = ', '
+            add(gzip.compress(key.encode()), len(key))
+            with open(gzfile, 'rb') as f:
+                start = add(f.read(), entry['span'][1])
+            index['years'][str(year)] = _shift(entry, start)
+        add(gzip.compress(b'}'), 1)
+    _save_index(filename, index)
+    return index
+
+
+def is_archive(filename):
+    return filename.endswith('.gz')
+
+
+def _save_index(filename, index):
+    with open(index_file(filename), 'w') as f:
+        json.dump({'file': _stamp(filename), 'index': index}, f)
+
+
+def _record(index, keys, span):
+    '''Record offsets of a value given the keys of the value and its parents'''
+    if keys[0] == 'meta':
+        if len(keys) == 1:
+            index['meta'] = span
+        return
+    if len(keys) > 3:
+        return
+    entry = index['years'].setdefault(keys[0], {'span': None, 'sections': {}, 'other': {}})
+    if len(keys) == 1:
+        entry['span'] = span
+    elif len(keys) == 2 and keys[1] not in SECTIONS:
+        entry['other'][keys[1]] = span
+    elif len(keys) == 3 and keys[1] in SECTIONS:
+        entry['sections'].setdefault(keys[1], {})[keys[2]] = span
+
+
+def _scan_object(text, pos, keys, index, decoder):
+    '''Record offsets of members of the object at pos, return the end of the object'''
+    pos += 1
+    while True:
+        pos = _WS.match(text, pos).end()
+        if text[pos] == '}':
+            return pos + 1
+        if text[pos] == ',':
+            pos = _WS.match(text, pos + 1).end()
+        key, pos = scanstring(text, pos + 1)
+        start = _WS.match(text, _WS.match(text, pos).end() + 1).end()  # skip colon
+        path = keys + [key]
+        # Descend into years and their sections, other values are only skipped
+        if text[start] == '{' and (len(path) == 1 and key != 'meta'
+                                   or len(path) == 2 and key in SECTIONS):
+            pos = _scan_object(text, start, path, index, decoder)
+        else:
+            pos = decoder.raw_decode(text, start)[1]
+        _record(index, path, [start, pos])
+
+
+def scan_results(filename):
+    '''Build the byte offset index of an existing merged results JSON file (or archive)'''
+    with (gzip.open if is_archive(filename) else open)(filename, 'rb') as f:
+        buf = f.read()
+    # json.dump output is ASCII, so character and byte offsets are the same
+    text = buf.decode('ascii')
+    index = {'meta': None, 'years': {}}
+    _scan_object(text, _WS.match(text).end(), [], index, json.JSONDecoder())
+    return index
+
+
+class ResultsReader:
+    """
+    Read components of merged multi year results (SolveTemplate output)
+    without loading the whole file. Byte offsets of each year and component
+    are kept in a sidecar index file, built on first use if needed.
+    Archives (.gz files from write_archive) are read one member at a time.
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.index = self._load_index()
+        self._member = (None, None)  # last decompressed archive member
+
+    def _load_index(self):
+        try:
+            with open(index_file(self.filename)) as f:
+                saved = json.load(f)
+            if saved['file'] == _stamp(self.filename):
+                return saved['index']
+        except (OSError, ValueError, KeyError):
+            pass
+        index = scan_results(self.filename)
+        _save_index(self.filename, index)
+        return index
+
+    def _read(self, span):
+        if self.index.get('members'):
+            ustart, text = self._decompress(span[0])
+            return json.loads(text[span[0] - ustart:span[1] - ustart].decode())
+        with (gzip.open if is_archive(self.filename) else open)(self.filename, 'rb') as f:
+            f.seek(span[0])
+            return json.loads(f.read(span[1] - span[0]).decode())
+
+    def _decompress(self, pos):
+        '''Uncompressed start and content of the archive member holding offset pos'''
+        for i, (cstart, cend, ustart, uend) in enumerate(self.index['members']):
+            if ustart <= pos < uend:
+                break
+        if self._member[0] != i:
+            with open(self.filename, 'rb') as f:
+                f.seek(cstart)
+                self._member = (i, gzip.decompress(f.read(cend - cstart)))
+        return ustart, self._member[1]
+
+    @property
+    def years(self):
+        return [int(y) for y in self.index['years']]
+
+    def meta(self):
+        '''Simulation meta data'''
+        return self._read(self.index['meta']) if self.index['meta'] else None
+
+    def components(self, year, section=None):
+        '''Names of components in a year of results, optionally only in a section'''
+        sections = self.index['years'][str(year)]['sections']
+        return [name for s in SECTIONS if s in sections and section in (None, s)
+                for name in sections[s]]
+
+    def _span(self, name, year):
+        entry = self.index['years'].get(str(year))
+        if entry is None:
+            raise KeyError("openCEM-Reader: year %s not in results" % year)
+        for section in SECTIONS:
+            if name in entry['sections'].get(section, {}):
+                return entry['sections'][section][name]
+        if name in entry['other']:
+            return entry['other'][name]
+        raise KeyError("openCEM-Reader: %s not in year %s of results" % (name, year))
+
+    def load(self, name, year, dense=False):
+        '''
+        Return a component (or other entry, e.g. objective_value) of a year as
+        stored or, if dense, sparse components as records of all their elements
+        '''
+        comp = self._read(self._span(name, year))
+        if dense and is_sparse(comp):
+            return densify(comp, {d: self.load(d, year) for d in comp['domain']})
+        return comp
+
+    def year(self, year):
+        '''Return a full year of results'''
+        return self._read(self.index['years'][str(year)]['span'])
+
+    def frame(self, name, years=None, zones=None, techs=None, regions=None,
+              start=None, end=None, dense=False):
+        '''
+        DataFrame of an indexed component with year, index and value columns.
+        Only the requested years are read and rows are filtered by zones,
+        techs, regions and timestamps between start and end (inclusive)
+        before the frame is built. Sparse components only have rows of non
+        zero values unless dense.
+        '''
+        import pandas as pd  # only needed for frames, not to write results
+
+        filters = {'zones': zones, 'techs': techs, 'regions': regions}
+        frames = []
+        for y in (self.years if years is None else years):
+            recs = self.load(name, y, dense=dense)
+            if is_sparse(recs):
+                recs = sparse_records(recs)
+            if not isinstance(recs, list) or (recs and not isinstance(recs[0], dict)):
+                raise ValueError("openCEM-Reader: %s is not an indexed component" % name)
+            cols = COLUMNS.get(name)
+            if cols is None:
+                width = len(recs[0]['index']) if recs and isinstance(recs[0]['index'], list) else 1
+                cols = tuple('index%d' % i for i in range(width))
+            mask = np.ones(len(recs), dtype=bool)
+            index = [r['index'] if isinstance(r['index'], list) else [r['index']] for r in recs]
+            data = {c: np.array([i[k] for i in index]) for k, c in enumerate(cols)}
+            for f, members in filters.items():
+                if members is None:
+                    continue
+                col = FILTERS[f]
+                if col == 'region' and col not in data and 'zone' in data:
+                    # zone indexed components are filtered by the zones of the regions
+                    col = 'zone'
+                    members = [z for r, z in cemo.const.ZONES_IN_REGIONS if r in members]
+                if col not in data:
+                    raise ValueError("openCEM-Reader: %s is not indexed by %s, cannot filter %s"
+                                     % (name, FILTERS[f], f))
+                mask &= np.isin(data[col], list(members))
+            if 'timestamp' in data and len(recs):
+                if start is not None:
+                    mask &= data['timestamp'] >= str(start)
+                if end is not None:
+                    mask &= data['timestamp'] <= str(end)
+            values = np.array([np.nan if r['value'] is None else r['value'] for r in recs],
+                              dtype=float)
+            frame = pd.DataFrame({c: v[mask] for c, v in data.items()})
+            frame.insert(0, 'year', y)
+            frame['value'] = values[mask]
+            frames.append(frame)
+        if not frames:
+            return pd.DataFrame(columns=['year', 'value'])
+        return pd.concat(frames, ignore_index=True)
+
+    def records(self, name, **filters):
+        '''NumPy record array of an indexed component, see frame for filters'''
+        return self.frame(name, **filters).to_records(index=False)
@@ -0,0 +1,182 @@
+"""Array backed view of openCEM model instance results"""
+__author__ = "José Zapata"
+__copyright__ = "Copyright 2018, ITP Renewables, Australia"
+__credits__ = ["José Zapata", "Dylan McConnell", "Navid Hagdadi"]
+__license__ = "GPLv3"
+__version__ = "0.9.2"
+__maintainer__ = "José Zapata"
+__email__ = "jose.zapata@itpau.com.au"
+__status__ = "Development"
+import numpy as np
+from pyomo.environ import Var, value
+
+import cemo.const
+
+# Index of model components read into arrays (r: region, z: zone, n: technology, t: time)
+DIMS = {
+    'gen_cap_op': 'zn', 'stor_cap_op': 'zn', 'hyb_cap_op': 'zn',
+    'gen_cap_new': 'zn', 'stor_cap_new': 'zn', 'hyb_cap_new': 'zn',
+    'gen_cap_exo': 'zn', 'stor_cap_exo': 'zn', 'hyb_cap_exo': 'zn',
+    'gen_cap_ret': 'zn', 'ret_gen_cap_exo': 'zn', 'gen_cap_ret_neg': 'zn',
+    'gen_cap_exo_neg': 'zn',
+    'cost_gen_build': 'zn', 'cost_stor_build': 'zn', 'cost_hyb_build': 'zn',
+    'cost_fuel': 'zn', 'fuel_heat_rate': 'zn',
+    'gen_disp': 'znt', 'stor_disp': 'znt', 'hyb_disp': 'znt', 'gen_disp_com_p': 'znt',
+    'gen_cap_factor': 'znt', 'hyb_cap_factor': 'znt',
+    'cost_gen_fom': 'n', 'cost_gen_vom': 'n', 'cost_stor_fom': 'n', 'cost_stor_vom': 'n',
+    'cost_hyb_fom': 'n', 'cost_hyb_vom': 'n', 'fixed_charge_rate': 'n', 'cost_retire': 'n',
+    'fuel_emit_rate': 'n',
+    'cost_cap_carry_forward': 'z',
+    'unserved': 'rt', 'surplus': 'rt', 'region_net_demand': 'rt',
+    'intercon_disp': 'rrt',
+}
+
+
+def _values(comp):
+    '''Return dictionary of index and values of a model component'''
+    if isinstance(comp, Var):
+        return {k: v.value for k, v in comp.items()}
+    return {k: value(v) for k, v in comp.extract_values().items()}
+
+
+class ResultView:
+    """
+    Values of a solved model instance as NumPy arrays indexed by region, zone,
+    technology and time codes. Each component is read from the instance once,
+    on first use, and results are vectorised reductions of these arrays.
+    """
+
+    def __init__(self, inst):
+        self.inst = inst
+        self.name = inst.name
+        self.regions = list(inst.regions)
+        self.zones = list(inst.zones)
+        self.techs = list(inst.all_tech)
+        self.hours = float(len(inst.t))
+        self._pos = {
+            'r': {r: i for i, r in enumerate(self.regions)},
+            'z': {z: i for i, z in enumerate(self.zones)},
+            'n': {n: i for i, n in enumerate(self.techs)},
+            't': {t: i for i, t in enumerate(inst.t)},
+        }
+        self._cache = {}
+
+    def _codes(self, dims, keys):
+        if len(dims) == 1:
+            cols = [keys]
+        else:
+            cols = list(zip(*keys))
+        return tuple(np.fromiter((self._pos[d][k] for k in col), dtype=np.intp, count=len(keys))
+                     for d, col in zip(dims, cols))
+
+    def __getitem__(self, name):
+        '''Dense array of component name, zero where component is not defined'''
+        if name not in self._cache:
+            dims = DIMS[name]
+            arr = np.zeros([len(self._pos[d]) for d in dims])
+            vals = _values(self.inst.component(name))
+            if vals:
+                keys = list(vals)
+                arr[self._codes(dims, keys)] = np.fromiter(
+                    (0.0 if v is None else v for v in vals.values()), dtype=float, count=len(keys))
+            self._cache[name] = arr
+        return self._cache[name]
+
+    def total(self, name):
+        '''Sum over time of a time indexed component'''
+        key = name + '.total'
+        if key not in self._cache:
+            self._cache[key] = self[name].sum(axis=-1)
+        return self._cache[key]
+
+    def mask(self, name):
+        '''Boolean (zone, technology) array of a sparse zone technology set'''
+        key = name + '.mask'
+        if key not in self._cache:
+            arr = np.zeros((len(self.zones), len(self.techs)), dtype=bool)
+            members = list(self.inst.component(name))
+            if members:
+                arr[self._codes('zn', members)] = True
+            self._cache[key] = arr
+        return self._cache[key]
+
+    def zones_in_regions(self):
+        '''Boolean array of zones that belong to the regions in the instance'''
+        inzone = np.zeros(len(self.zones), dtype=bool)
+        for (r, z) in self.inst.zones_in_regions:
+            if r in self._pos['r'] and z in self._pos['z']:
+                inzone[self._pos['z'][z]] = True
+        return inzone
+
+    def capacity(self):
+        '''Operating capacity in MW per zone and technology'''
+        return self['gen_cap_op'] + self['stor_cap_op'] + self['hyb_cap_op']
+
+    def dispatch(self):
+        '''Dispatch in MWh per zone and technology'''
+        return self.total('gen_disp') + self.total('stor_disp') + self.total('hyb_disp')
+
+    def cap_factor(self):
+        '''Sum over zones of total capacity factor hours and number of zones per technology'''
+        gen = self.mask('gen_tech_in_zones')
+        stor = self.mask('stor_tech_in_zones')
+        hyb = self.mask('hyb_tech_in_zones')
+        capf = self.total('gen_cap_factor') + 0.5 * self.hours * stor \
+            + self.total('hyb_cap_factor')
+        return capf.sum(axis=0), (gen.astype(int) + stor + hyb).sum(axis=0)
+
+    def emissions(self):
+        '''Emissions in kg per zone and technology'''
+        disp = self.total('gen_disp') * self.mask('fuel_gen_tech_in_zones') \
+            + self.total('gen_disp_com_p') * self.mask('commit_gen_tech_in_zones')
+        return self['fuel_emit_rate'] * disp
+
+    def emission_rate(self):
+        '''System emission rate in kg/MWh'''
+        inzone = self.zones_in_regions()
+        return self.emissions()[inzone].sum() / (self.dispatch()[inzone].sum() + 1.0e-12)
+
+    def unserved(self):
+        '''Unserved energy as percentage of demand per region'''
+        return 100.0 * self.total('unserved') / self.total('region_net_demand')
+
+    def cost_capital(self):
+        '''Annualised build costs plus capital costs carried forward per zone'''
+        fcr = self['fixed_charge_rate']
+        build = (self['cost_gen_build'] * (self['gen_cap_new'] + self['gen_cap_exo'])
+                 + self['cost_stor_build'] * (self['stor_cap_new'] + self['stor_cap_exo'])
+                 + self['cost_hyb_build'] * (self['hyb_cap_new'] + self['hyb_cap_exo'])) * fcr
+        return build.sum(axis=1) + self['cost_cap_carry_forward']
+
+    def costs(self):
+        '''Dictionary of total cost and its components'''
+        inst = self.inst
+        ycf = value(inst.year_correction_factor)
+        fuel = self.mask('fuel_gen_tech_in_zones')
+        commit = self.mask('commit_gen_tech_in_zones')
+        retire = self.mask('retire_gen_tech_in_zones')
+        penalty = np.array([cemo.const.GEN_COMMIT['penalty'].get(n, 0) for n in self.techs])
+        operating = ycf * (
+            (self['cost_gen_vom'] * self.total('gen_disp')).sum()
+            + (self['cost_fuel'] * self['fuel_heat_rate'] * self.total('gen_disp'))[fuel].sum()
+            + (self['cost_stor_vom'] * self.total('stor_disp')).sum()
+            + (self['cost_hyb_vom'] * self.total('hyb_disp')).sum()
+            + (self['cost_fuel'] * penalty * self.total('gen_disp_com_p'))[commit].sum())
+        fixed = (self['cost_gen_fom'] * self['gen_cap_op']
+                 + self['cost_stor_fom'] * self['stor_cap_op']
+                 + self['cost_hyb_fom'] * self['hyb_cap_op']).sum()
+        shadow = 1e7 * self['gen_cap_ret_neg'][retire].sum() \
+            + 1e7 * self['gen_cap_exo_neg'].sum() + 1e4 * self['surplus'].sum()
+        inzone = self.zones_in_regions()
+        return {
+            'total': value(inst.Obj) - shadow,
+            'build': (self.cost_capital() - self['cost_cap_carry_forward']).sum(),
+            'repayment': self['cost_cap_carry_forward'].sum(),
+            'operating': operating,
+            'fixed': fixed,
+            'transmission': ycf * value(inst.cost_trans) * self['intercon_disp'].sum(),
+            'unserved': ycf * value(inst.cost_unserved) * self['unserved'].sum(),
+            'emission': ycf * value(inst.cost_emit) * self.emissions()[inzone].sum(),
+            'retirement': (self['cost_retire'] * (self['gen_cap_ret']
+                                                  + self['ret_gen_cap_exo']))[retire].sum(),
+        }
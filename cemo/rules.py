@@ -10,6 +10,7 @@ __status__ = "Development"
 from pyomo.environ import Constraint
 
 import cemo.const
+from cemo.cyclic import cyclic_index
 
 
 def ScanForTechperZone(model):
@@ -247,30 +248,85 @@ def con_maxcharge(model, z, s, t):
 
 def con_storcharge(model, z, s, t):
     if t == model.t.first():
+        # Level before the period, cyclic unless linked chronologically to other periods
+        start = model.stor_start[z, s] if hasattr(model, 'stor_start') \
+            else model.stor_level[z, s, model.t.last()]
         return model.stor_level[z, s, t] \
-            == model.stor_level[z, s, model.t.last()]\
+            == start\
             - model.stor_disp[z, s, t] + \
             model.stor_rt_eff[s] * model.stor_charge[z, s, t]
 
     return model.stor_level[z, s, t] \
-        == model.stor_level[z, s, model.t.prev(t)] \
+        == model.stor_level[z, s, cyclic_index(model.t).prevw(t)] \
         - model.stor_disp[z, s, t] + \
         model.stor_rt_eff[s] * model.stor_charge[z, s, t]
 
 
 def con_hybcharge(model, z, h, t):
     if t == model.t.first():
+        start = model.hyb_start[z, h] if hasattr(model, 'hyb_start') \
+            else model.hyb_level[z, h, model.t.last()]
         return model.hyb_level[z, h, t] \
-            == model.hyb_level[z, h, model.t.last()]\
+            == start\
             - model.hyb_disp[z, h, t] \
             + model.hyb_charge[z, h, t]
 
     return model.hyb_level[z, h, t] \
-        == model.hyb_level[z, h, model.t.prev(t)] \
+        == model.hyb_level[z, h, cyclic_index(model.t).prevw(t)] \
         - model.hyb_disp[z, h, t] \
         + model.hyb_charge[z, h, t]
 
 
+def con_stor_period(model, z, s, p):
+    """Storage level at the start of the next chronological period"""
+    return model.stor_period_level[z, s, cyclic_index(model.periods).nextw(p)] \
+        == model.stor_period_level[z, s, p] \
+        + model.stor_level[z, s, model.t.last()] - model.stor_start[z, s]
+
+
+def con_stor_period_max(model, z, s, p):
+    return model.stor_period_level[z, s, p] + model.stor_level_max[z, s] - model.stor_start[z, s] \
+        <= model.stor_cap_op[z, s] * model.stor_charge_hours[s]
+
+
+def con_stor_period_min(model, z, s, p):
+    return model.stor_period_level[z, s, p] + model.stor_level_min[z, s] \
+        - model.stor_start[z, s] >= 0
+
+
+def con_stor_level_max(model, z, s, t):
+    return model.stor_level[z, s, t] <= model.stor_level_max[z, s]
+
+
+def con_stor_level_min(model, z, s, t):
+    return model.stor_level[z, s, t] >= model.stor_level_min[z, s]
+
+
+def con_hyb_period(model, z, h, p):
+    """Hybrid storage level at the start of the next chronological period"""
+    return model.hyb_period_level[z, h, cyclic_index(model.periods).nextw(p)] \
+        == model.hyb_period_level[z, h, p] \
+        + model.hyb_level[z, h, model.t.last()] - model.hyb_start[z, h]
+
+
+def con_hyb_period_max(model, z, h, p):
+    return model.hyb_period_level[z, h, p] + model.hyb_level_max[z, h] - model.hyb_start[z, h] \
+        <= model.hyb_cap_op[z, h] * model.hyb_charge_hours[h]
+
+
+def con_hyb_period_min(model, z, h, p):
+    return model.hyb_period_level[z, h, p] + model.hyb_level_min[z, h] \
+        - model.hyb_start[z, h] >= 0
+
+
+def con_hyb_level_max(model, z, h, t):
+    return model.hyb_level[z, h, t] <= model.hyb_level_max[z, h]
+
+
+def con_hyb_level_min(model, z, h, t):
+    return model.hyb_level[z, h, t] >= model.hyb_level_min[z, h]
+
+
 def con_chargelimhy(model, z, h, t):
     return model.hyb_charge[z, h, t] \
         <= model.hyb_col_mult[h] * model.hyb_cap_factor[z, h, t] * model.hyb_cap_op[z, h]
@@ -387,13 +443,14 @@ def con_disp_ramp_down(model, z, n, t):
     '''dispatch less than ramp down commitment'''
     ramp_dn = cemo.const.GEN_COMMIT['rate down'].get(n)
     return model.gen_disp[z, n, t] <= model.gen_disp_com[z, n, t] +\
-        (ramp_dn - 1) * model.gen_disp_com_m[z, n, model.t.nextw(t)]
+        (ramp_dn - 1) * model.gen_disp_com_m[z, n, cyclic_index(model.t).nextw(t)]
 
 
 def con_disp_ramp_up(model, z, n, t):
     '''dispatch less than ramp up commitment'''
     ramp_up = cemo.const.GEN_COMMIT['rate up'].get(n)
-    return model.gen_disp[z, n, t] <= model.gen_disp_com[z, n, model.t.prevw(t)] + \
+    return model.gen_disp[z, n, t] \
+        <= model.gen_disp_com[z, n, cyclic_index(model.t).prevw(t)] + \
         ramp_up * model.gen_disp_com_p[z, n, t]
 
 
@@ -405,14 +462,16 @@ def con_ramp_down_uptime(model, z, n, t):
 def con_uptime_commitment(model, z, n, t):
     '''capacity that can be switched off, observing up-time'''
     uptime = cemo.const.GEN_COMMIT['uptime'].get(n)
-    return model.gen_disp_com_s[z, n, t] == model.gen_disp_com_s[z, n, model.t.prevw(t)] +\
-        model.gen_disp_com_p[z, n, model.t.prevw(t, k=uptime)] - model.gen_disp_com_m[z, n, t]
+    lags = cyclic_index(model.t)
+    return model.gen_disp_com_s[z, n, t] == model.gen_disp_com_s[z, n, lags.prevw(t)] +\
+        model.gen_disp_com_p[z, n, lags.prevw(t, uptime)] - model.gen_disp_com_m[z, n, t]
 
 
 def con_committed_cap(model, z, n, t):
     '''Committed capacity for each time step'''
-    return model.gen_disp_com[z, n, t] == model.gen_disp_com[z, n, model.t.prevw(t)] -\
-        model.gen_disp_com_m[z, n, t] + model.gen_disp_com_p[z, n, model.t.prevw(t)]
+    prev = cyclic_index(model.t).prevw(t)
+    return model.gen_disp_com[z, n, t] == model.gen_disp_com[z, n, prev] -\
+        model.gen_disp_com_m[z, n, t] + model.gen_disp_com_p[z, n, prev]
 
 
 def con_uns(model, r):
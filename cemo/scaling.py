@@ -0,0 +1,113 @@
+"""Objective and constraint coefficient scaling of openCEM instances"""
+__author__ = "José Zapata"
+__copyright__ = "Copyright 2018, ITP Renewables, Australia"
+__credits__ = ["José Zapata", "Dylan McConnell", "Navid Hagdadi"]
+__license__ = "GPLv3"
+__version__ = "0.9.2"
+__maintainer__ = "José Zapata"
+__email__ = "jose.zapata@itpau.com.au"
+__status__ = "Development"
+import numpy as np
+from pyomo.environ import (Constraint, Objective, Suffix, TransformationFactory,
+                           Var)
+from pyomo.opt import TerminationCondition
+from pyomo.repn import generate_standard_repn
+
+# Scaling modes: none or geometric mean row/column scaling
+SCALING = ('none', 'geometric')
+# Objective in $M (scaled value = factor * value)
+UNIT_OBJECTIVE = 1e-6
+
+
+def _pow2(x):
+    '''Nearest power of two, so that scaling does not add rounding errors'''
+    return np.exp2(np.round(np.log2(x)))
+
+
+def _matrix(instance):
+    '''Rows, columns and coefficients of the active linear constraints'''
+    rows, cols, coefs = [], [], []
+    cons, col = [], {}
+    for c in instance.component_data_objects(Constraint, active=True):
+        repn = generate_standard_repn(c.body, quadratic=False)
+        i = len(cons)
+        cons.append(c)
+        for v, a in zip(repn.linear_vars, repn.linear_coefs):
+            if a:
+                rows.append(i)
+                cols.append(col.setdefault(id(v), len(col)))
+                coefs.append(abs(a))
+    return cons, col, np.array(rows, dtype=np.intp), np.array(cols, dtype=np.intp), \
+        np.array(coefs, dtype=float)
+
+
+def _geomean_factors(nrows, ncols, rows, cols, coefs, passes):
+    '''Row and column factors from alternating geometric mean passes over a sparse matrix'''
+    r = np.ones(nrows)
+    s = np.ones(ncols)
+    for _ in range(passes):
+        a = coefs * r[rows] * s[cols]
+        amax = np.zeros(nrows)
+        amin = np.full(nrows, np.inf)
+        np.maximum.at(amax, rows, a)
+        np.minimum.at(amin, rows, a)
+        nz = amax > 0
+        r[nz] /= np.sqrt(amin[nz] * amax[nz])
+        a = coefs * r[rows] * s[cols]
+        amax = np.zeros(ncols)
+        amin = np.full(ncols, np.inf)
+        np.maximum.at(amax, cols, a)
+        np.minimum.at(amin, cols, a)
+        nz = amax > 0
+        s[nz] /= np.sqrt(amin[nz] * amax[nz])
+    return _pow2(r), _pow2(s)
+
+
+def scaling_factors(instance, scaling='geometric', passes=4):
+    '''
+    Add a scaling_factor export suffix to a constructed instance. Variable
+    factors multiply variable values and row factors multiply constraints,
+    as the core.scale_model transformation expects.
+    '''
+    if scaling not in SCALING:
+        raise ValueError("openCEM scaling: unknown scaling '%s', use one of %s"
+                         % (scaling, ', '.join(SCALING)))
+    if instance.component('scaling_factor') is not None:
+        instance.del_component('scaling_factor')
+    instance.scaling_factor = Suffix(direction=Suffix.EXPORT)
+    sf = instance.scaling_factor
+    for o in instance.component_data_objects(Objective, active=True):
+        sf[o] = UNIT_OBJECTIVE
+    if scaling == 'geometric':
+        # Cost rows ($) and capacity factor rows (< 1) share variables, so a
+        # single unit per component would leave their coefficient range as is
+        cons, col, rows, cols, coefs = _matrix(instance)
+        r, s = _geomean_factors(len(cons), len(col), rows, cols, coefs, passes)
+        for c, f in zip(cons, r):
+            sf[c] = f
+        for v in instance.component_data_objects(Var):
+            j = col.get(id(v))
+            # a column factor s divides the variable (scaled value = value / s)
+            sf[v] = 1.0 / s[j] if j is not None else 1.0
+    return sf
+
+
+def solve(opt, instance, scaling='none', **kwargs):
+    '''
+    Solve instance with a solver, optionally exporting a scaled copy of the
+    LP and mapping its solution, duals included, back onto the instance
+    '''
+    if scaling == 'none':
+        return opt.solve(instance, **kwargs)
+    scaling_factors(instance, scaling)
+    try:
+        xfrm = TransformationFactory('core.scale_model')
+        scaled = xfrm.create_using(instance)
+        results = opt.solve(scaled, **kwargs)
+        # Without a solution, propagating would set instance values to None
+        if results.solver.termination_condition == TerminationCondition.optimal:
+            xfrm.propagate_solution(scaled, instance)
+    finally:
+        # Results of the instance do not include the scaling suffix
+        instance.del_component('scaling_factor')
+    return results
@@ -0,0 +1,92 @@
+"""Cost sensitivities by re-solving openCEM instances with mutable costs"""
+__author__ = "José Zapata"
+__copyright__ = "Copyright 2018, ITP Renewables, Australia"
+__credits__ = ["José Zapata", "Dylan McConnell", "Navid Hagdadi"]
+__license__ = "GPLv3"
+__version__ = "0.9.2"
+__maintainer__ = "José Zapata"
+__email__ = "jose.zapata@itpau.com.au"
+__status__ = "Development"
+from pyomo.environ import value
+from pyomo.opt import TerminationCondition
+
+import cemo.const
+from cemo.direct import DIRECT_SOLVERS, solver_factory
+from cemo.initialisers import init_fcr
+from cemo.results import ResultView
+from cemo.solveropts import BUDGET
+
+# Parameters mutable in instances of create_model(..., mutable_costs=True)
+COST_PARAMS = ('cost_gen_build', 'cost_stor_build', 'cost_hyb_build', 'cost_fuel',
+               'cost_gen_fom', 'cost_gen_vom', 'cost_stor_fom', 'cost_stor_vom',
+               'cost_hyb_fom', 'cost_hyb_vom', 'cost_emit', 'all_tech_discount_rate')
+
+
+class Sensitivity:
+    """
+    Re-solve an instance created with mutable costs for a sequence of values
+    of a cost parameter, and tabulate objective, capacity and emissions per
+    value. Cost parameters only change the objective, so in-process solvers
+    warm start each solve from the basis of the previous one.
+    """
+
+    def __init__(self, instance, solver='cbc', solver_options=None):
+        if not instance.cost_emit.mutable:
+            raise ValueError("openCEM-sensitivity: instance costs are not mutable, "
+                             "use create_model(..., mutable_costs=True)")
+        self.instance = instance
+        self.solver = solver
+        self.solver_options = solver_options if solver_options is not None else {}
+        self.opt = solver_factory(solver)
+        self._base = {}  # values of parameters before they were first changed
+
+    def set(self, name, val, index=None, relative=False):
+        '''
+        Set cost parameter name, one element if index is given or all of them
+        otherwise, to val or, if relative, to val times its original value
+        '''
+        if name not in COST_PARAMS:
+            raise ValueError("openCEM-sensitivity: %s is not one of %s" % (name, COST_PARAMS))
+        param = self.instance.component(name)
+        if name not in self._base:
+            self._base[name] = {k: value(v) for k, v in param.items()}
+        base = self._base[name]
+        keys = [index] if index is not None else list(base)
+        for k in keys:
+            param[k] = val * base[k] if relative else val
+        if name == 'all_tech_discount_rate':
+            # Fixed charge rates follow the discount rate
+            for n in self.instance.all_tech:
+                self.instance.fixed_charge_rate[n] = value(init_fcr(self.instance, n))
+
+    def solve(self, warmstart=True):
+        '''Solve instance and return dictionary of objective, capacity and emissions'''
+        kwargs = {'warmstart': warmstart} if self.solver in DIRECT_SOLVERS else {}
+        with BUDGET.lease(self.solver, self.solver_options) as options:
+            self.opt.options.update(options)
+            results = self.opt.solve(self.instance, **kwargs)
+        if results.solver.termination_condition != TerminationCondition.optimal:
+            raise ValueError("openCEM-sensitivity: solve terminated with %s"
+                             % results.solver.termination_condition)
+        res = ResultView(self.instance)
+        inzone = res.zones_in_regions()
+        row = {'objective': value(self.instance.Obj),
+               'emissions': res.emissions()[inzone].sum()}
+        capacity = res.capacity()[inzone].sum(axis=0)
+        row.update(('cap_' + cemo.const.TECH_TYPE[n], capacity[i])
+                   for i, n in enumerate(res.techs))
+        return row
+
+    def sweep(self, name, values, index=None, relative=False):
+        '''
+        DataFrame with a row of objective, emissions (kg) and capacity per
+        technology (MW) for each value of cost parameter name, see set
+        '''
+        import pandas as pd
+        rows = []
+        for val in values:
+            self.set(name, val, index=index, relative=relative)
+            row = {name: val}
+            row.update(self.solve())
+            rows.append(row)
+        return pd.DataFrame(rows)
@@ -0,0 +1,104 @@
+"""Parse solver logs into solve statistics for openCEM results"""
+__author__ = "José Zapata"
+__copyright__ = "Copyright 2018, ITP Renewables, Australia"
+__credits__ = ["José Zapata", "Dylan McConnell", "Navid Hagdadi"]
+__license__ = "GPLv3"
+__version__ = "0.9.2"
+__maintainer__ = "José Zapata"
+__email__ = "jose.zapata@itpau.com.au"
+__status__ = "Development"
+import re
+
+_NUM = r'([-+]?\d+(?:\.\d*)?(?:[eE][-+]?\d+)?)'
+
+# (regular expression, statistic names for each group) per solver. Last match wins.
+LOG_PATTERNS = {
+    'cbc': [
+        (r'Presolve (\d+) \(-?(\d+)\) rows, (\d+) \(-?(\d+)\) columns'
+         r' and (\d+) \(-?(\d+)\) elements',
+         ('presolved_rows', 'rows_removed', 'presolved_cols', 'cols_removed',
+          'presolved_nnz', 'nnz_removed')),
+        (r'Optimal objective ' + _NUM + r' - (\d+) iterations time ' + _NUM,
+         ('objective', 'iterations', 'simplex_time')),
+        (r'Barrier.* (\d+) iterations', ('barrier_iterations',)),
+        (r'Total iterations:\s+(\d+)', ('iterations',)),
+        (r'Objective value:\s+' + _NUM, ('objective',)),
+        (r'Gap:\s+' + _NUM, ('mip_gap',)),
+        (r'Time \(Wallclock seconds\):\s+' + _NUM, ('solve_time',)),
+        (r'Result - (.+?)\s*$', ('status',)),
+    ],
+    'glpk': [
+        (r'(\d+) rows, (\d+) columns, (\d+) non-zeros',
+         ('presolved_rows', 'presolved_cols', 'presolved_nnz')),
+        (r'^\*\s*(\d+): obj =\s+' + _NUM, ('iterations', 'objective')),
+        (r'^\+\s*\d+: mip =\s+' + _NUM + r'\s+[<>]=\s+\S+\s+' + _NUM + '%',
+         ('objective', 'mip_gap')),
+        (r'Time used:\s+' + _NUM + ' secs', ('solve_time',)),
+        (r'^((?:INTEGER )?OPTIMAL.* SOLUTION FOUND|.*HAS NO .*FEASIBLE SOLUTION)', ('status',)),
+    ],
+    'cplex': [
+        (r'(?:LP|MIP) Presolve eliminated (\d+) rows and (\d+) columns',
+         ('rows_removed', 'cols_removed')),
+        (r'Reduced (?:LP|MIP) has (\d+) rows, (\d+) columns, and (\d+) nonzeros',
+         ('presolved_rows', 'presolved_cols', 'presolved_nnz')),
+        (r'Barrier time = ' + _NUM + ' sec', ('barrier_time',)),
+        (r'[Cc]rossover time = ' + _NUM + ' sec', ('crossover_time',)),
+        (r'Solution time =\s+' + _NUM + r' sec\.\s+Iterations = (\d+)',
+         ('solve_time', 'iterations')),
+        (r' - ([\w ]+?):\s+Objective =\s+' + _NUM, ('status', 'objective')),
+        (r'gap = \S+, ' + _NUM + '%', ('mip_gap',)),
+    ],
+    'gurobi': [
+        (r'Presolve removed (\d+) rows and (\d+) columns', ('rows_removed', 'cols_removed')),
+        (r'Presolved: (\d+) rows, (\d+) columns, (\d+) nonzeros',
+         ('presolved_rows', 'presolved_cols', 'presolved_nnz')),
+        (r'Barrier solved model in (\d+) iterations and ' + _NUM + ' seconds',
+         ('barrier_iterations', 'barrier_time')),
+        (r'Solved in (\d+) iterations and ' + _NUM + ' seconds', ('iterations', 'solve_time')),
+        (r'\((\d+) simplex iterations\) in ' + _NUM + ' seconds', ('iterations', 'solve_time')),
+        (r'^(Optimal) objective\s+' + _NUM, ('status', 'objective')),
+        (r'Best objective ' + _NUM + r', best bound \S+, gap ' + _NUM + '%',
+         ('objective', 'mip_gap')),
+        (r'^(Infeasible model|Unbounded model|Infeasible or unbounded model|Time limit reached)',
+         ('status',)),
+    ],
+}
+
+
+def _number(s):
+    try:
+        return int(s)
+    except ValueError:
+        try:
+            return float(s)
+        except ValueError:
+            return s.strip()
+
+
+def solver_family(solver):
+    '''Return log parser name for a Pyomo solver name, e.g. gurobi for gurobi_direct'''
+    for name in LOG_PATTERNS:
+        if solver.lower().startswith(name):
+            return name
+    return None
+
+
+def parse_log(solver, text):
+    '''Return dictionary of solve statistics found in a solver log'''
+    stats = {'solver': solver}
+    family = solver_family(solver)
+    if family is None or not text:
+        return stats
+    for pattern, names in LOG_PATTERNS[family]:
+        for match in re.finditer(pattern, text, re.MULTILINE):
+            stats.update(zip(names, (_number(g) for g in match.groups())))
+    return stats
+
+
+def parse_logfile(solver, filename):
+    '''Return solve statistics from a solver log file, if it exists'''
+    try:
+        with open(filename) as f:
+            return parse_log(solver, f.read())
+    except FileNotFoundError:
+        return {'solver': solver}
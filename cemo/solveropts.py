@@ -0,0 +1,161 @@
+"""Solver options and thread budget for openCEM solves"""
+__author__ = "José Zapata"
+__copyright__ = "Copyright 2018, ITP Renewables, Australia"
+__credits__ = ["José Zapata", "Dylan McConnell", "Navid Hagdadi"]
+__license__ = "GPLv3"
+__version__ = "0.9.2"
+__maintainer__ = "José Zapata"
+__email__ = "jose.zapata@itpau.com.au"
+__status__ = "Development"
+import contextlib
+import os
+import threading
+
+# Options used unless set in the [Solver] section or in the command line
+SOLVER_DEFAULTS = {
+    'cbc': {'threads': 4, 'ratio': 0.0001},
+}
+# Name of the option setting the number of threads in each solver
+THREADS_OPTION = {
+    'cbc': 'threads',
+    'cplex': 'threads',
+    'gurobi': 'threads',
+    'highs': 'threads',
+    'xpress': 'threads',
+}
+
+# Options to solve LPs with interior point (barrier) and no crossover to a basic solution
+BARRIER_OPTIONS = {
+    'cplex': {'lpmethod': 4, 'barrier_crossover': -1},
+    'gurobi': {'method': 2, 'crossover': 0},
+    'highs': {'solver': 'ipm', 'run_crossover': 'off'},
+    'xpress': {'defaultalg': 4, 'crossover': 0},
+}
+
+
+def _value(s):
+    for conv in (int, float):
+        try:
+            return conv(s)
+        except ValueError:
+            pass
+    return s
+
+
+def _family(solver, table):
+    for name in table:
+        if solver.lower().startswith(name):
+            return name
+    return None
+
+
+def parse_options(items):
+    '''Return dictionary of solver options from a list of KEY=VALUE strings'''
+    options = {}
+    for item in items or []:
+        key, sep, value = item.partition('=')
+        if not sep or not key.strip():
+            raise ValueError("openCEM-Solver: option %s is not in KEY=VALUE form" % item)
+        options[key.strip()] = _value(value.strip())
+    return options
+
+
+def solver_options(solver, *options):
+    '''Merge solver defaults with option dictionaries, later ones take precedence'''
+    out = dict(SOLVER_DEFAULTS.get(_family(solver, SOLVER_DEFAULTS), {}))
+    for opts in options:
+        out.update({k: _value(v) if isinstance(v, str) else v for k, v in (opts or {}).items()})
+    return out
+
+
+def barrier_options(solver):
+    '''Return options to run barrier without crossover in solver'''
+    family = _family(solver, BARRIER_OPTIONS)
+    if family is None:
+        raise ValueError("openCEM-Solver: barrier without crossover not available in %s" % solver)
+    return dict(BARRIER_OPTIONS[family])
+
+
+def solution_accuracy(inst):
+    '''
+    Return largest constraint and variable bound violations of a solved instance.
+    Barrier solutions without crossover are only feasible within solver tolerances.
+    '''
+    from pyomo.environ import Constraint, Var, value
+
+    rows = 0.0
+    for c in inst.component_data_objects(Constraint, active=True):
+        body = value(c.body, exception=False)
+        if body is None:
+            continue
+        if c.has_lb():
+            rows = max(rows, value(c.lower) - body)
+        if c.has_ub():
+            rows = max(rows, body - value(c.upper))
+    cols = 0.0
+    for v in inst.component_data_objects(Var):
+        if v.value is None:
+            continue
+        if v.has_lb():
+            cols = max(cols, v.lb - v.value)
+        if v.has_ub():
+            cols = max(cols, v.value - v.ub)
+    return {'max_row_violation': rows, 'max_bound_violation': cols}
+
+
+def runef_options(options):
+    '''Format solver options for the runef --solver-options argument'''
+    return ' '.join('%s=%s' % (k, v) for k, v in options.items())
+
+
+class ThreadBudget:
+    """
+    Share a fixed number of solver threads among concurrent solves
+    (cluster, scenario or window workers) so that cores are not oversubscribed.
+    A solve is granted as many threads as it asks for, or as are free,
+    and waits while no threads are free.
+    """
+
+    def __init__(self, total=None):
+        self.total = total or os.cpu_count() or 1
+        self.free = self.total
+        self._cond = threading.Condition()
+
+    def set_total(self, total):
+        '''Change the number of threads in the budget'''
+        with self._cond:
+            self.free += total - self.total
+            self.total = total
+            self._cond.notify_all()
+
+    def acquire(self, want=None):
+        '''Wait for at least one free thread and return the number of threads granted'''
+        want = max(1, min(want or self.total, self.total))
+        with self._cond:
+            while self.free < 1:
+                self._cond.wait()
+            granted = min(want, self.free)
+            self.free -= granted
+        return granted
+
+    def release(self, granted):
+        with self._cond:
+            self.free += granted
+            self._cond.notify_all()
+
+    @contextlib.contextmanager
+    def lease(self, solver, options):
+        '''Yield a copy of solver options with threads limited to those granted by the budget'''
+        key = THREADS_OPTION.get(_family(solver, THREADS_OPTION))
+        granted = self.acquire(options.get(key) if key else 1)
+        options = dict(options)
+        if key is not None:
+            options[key] = granted
+        try:
+            yield options
+        finally:
+            self.release(granted)
+
+
+# Process wide budget, CEMO_THREADS caps the total threads (default all cores)
+BUDGET = ThreadBudget(int(os.environ.get('CEMO_THREADS', 0)) or None)
@@ -0,0 +1,82 @@
+"""Compiled data command file templates for openCEM year and cluster runs"""
+__author__ = "José Zapata"
+__copyright__ = "Copyright 2018, ITP Renewables, Australia"
+__credits__ = ["José Zapata", "Dylan McConnell", "Navid Hagdadi"]
+__license__ = "GPLv3"
+__version__ = "0.9.2"
+__maintainer__ = "José Zapata"
+__email__ = "jose.zapata@itpau.com.au"
+__status__ = "Development"
+import os
+import re
+
+# Placeholders of SolveTemplate templates
+YEAR_PLACEHOLDERS = (
+    '[regions]', '[zones]', '[alltech]', 'XXXX', 'WWWW',
+    '[gentech]', '[gentechdb]', '[gentechlist]',
+    '[stortech]', '[stortechdb]', '[stortechlist]',
+    '[hybtech]', '[hybtechdb]', '[hybtechlist]',
+    '[retiretech]', '[retiretechdb]', '[retiretechset]',
+    '[fueltech]', '[fueltechdb]', '[fueltechset]',
+    '[committech]', '[regentech]', '[dispgentech]', '[redispgentech]',
+    '[stortechset]', '[hybtechset]', '[nobuildset]',
+    '[carryforwardcap]', '[timerange]',
+)
+# Whole lines with the time range of the year in a year template, replaced for each cluster
+TIMERANGE_LINE = r'[^\n]*WHERE timestamp BETWEEN[^\n]*\n?'
+# File name of a load command in a data command file
+LOAD_FILE = r'(\bload\s+)([\'"])([^\'"]+)\2'
+
+_CACHE = {}
+
+
+class CompiledTemplate:
+    """
+    Template text split once into literal chunks and the placeholders between
+    them, so that each rendering is a single join of chunks and values.
+    """
+
+    def __init__(self, text, pattern):
+        self.chunks = []
+        self.keys = []
+        pos = 0
+        for match in re.finditer(pattern, text):
+            self.chunks.append(text[pos:match.start()])
+            self.keys.append(match.group())
+            pos = match.end()
+        self.chunks.append(text[pos:])
+
+    def render(self, values):
+        '''Template text with each placeholder replaced by values[placeholder]'''
+        out = [None] * (2 * len(self.keys) + 1)
+        out[::2] = self.chunks
+        out[1::2] = [values[k] for k in self.keys]
+        return ''.join(out)
+
+
+def absolute_loads(text):
+    '''Data command text with files loaded by paths relative to this directory made absolute'''
+    def absolute(match):
+        path = match.group(3)
+        if os.path.isabs(path) or not os.path.exists(path):
+            return match.group()  # e.g. a database host name
+        return match.group(1) + match.group(2) + os.path.abspath(path) + match.group(2)
+    return re.sub(LOAD_FILE, absolute, text)
+
+
+def placeholder_pattern(placeholders):
+    '''Regular expression matching any of placeholders, longest first'''
+    return '|'.join(re.escape(p) for p in sorted(placeholders, key=len, reverse=True))
+
+
+def compile_template(filename, pattern):
+    '''Compiled template of a file, cached until the file changes'''
+    path = os.path.abspath(filename)
+    st = os.stat(path)
+    key = (path, pattern)
+    stamp = (st.st_mtime_ns, st.st_size)
+    cached = _CACHE.get(key)
+    if cached is None or cached[0] != stamp:
+        with open(path) as f:
+            cached = _CACHE[key] = (stamp, CompiledTemplate(f.read(), pattern))
+    return cached[1]
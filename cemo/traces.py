@@ -0,0 +1,187 @@
+"""Memory mapped store of hourly traces for openCEM"""
+__author__ = "José Zapata"
+__copyright__ = "Copyright 2018, ITP Renewables, Australia"
+__credits__ = ["José Zapata", "Dylan McConnell", "Navid Hagdadi"]
+__license__ = "GPLv3"
+__version__ = "0.9.2"
+__maintainer__ = "José Zapata"
+__email__ = "jose.zapata@itpau.com.au"
+__status__ = "Development"
+import hashlib
+import json
+import os
+import re
+import tempfile
+
+import numpy as np
+
+# Trace parameters held in store and the model set indexing each of their traces
+TRACES = {
+    'region_net_demand': 'regions',
+    'gen_cap_factor': 'gen_tech_in_zones',
+    'hyb_cap_factor': 'hyb_tech_in_zones',
+}
+
+
+def _trace_file(name, index):
+    '''File name for trace name and index tuple, e.g. gen_cap_factor-5-12.npy'''
+    return '-'.join([name] + [str(i) for i in index]) + '.npy'
+
+
+def _as_tuple(index):
+    return index if isinstance(index, tuple) else (index,)
+
+
+def _split_loads(lines, targets):
+    '''
+    Split data command lines into load statements and other lines, yielding
+    (lines, True) for load statements whose targets are all in targets and
+    (lines, False) otherwise
+    '''
+    statement = []
+    for line in lines:
+        if not statement and not line.lstrip().startswith('load'):
+            yield [line], False
+            continue
+        statement.append(line)
+        text = ''.join(statement)
+        # statement ends with a semicolon outside of query quotes
+        if text.count('"') % 2 or not text.rstrip().endswith(';'):
+            continue
+        tail = text[text.rfind(':') + 1:].rstrip().rstrip(';')
+        names = re.sub(r'\[.*?\]', '', tail).split()
+        yield statement, bool(names) and set(names) <= set(targets)
+        statement = []
+    if statement:
+        yield statement, False
+
+
+def drop_loads(lines, targets):
+    '''
+    Filter data command lines, skipping `load` statements whose
+    targets are all in targets. Other lines pass through unchanged.
+    '''
+    for statement, dropped in _split_loads(lines, targets):
+        if not dropped:
+            yield from statement
+
+
+def selection_key(year, lines, sets):
+    '''
+    Store key of the traces of year loaded by data command lines: the year
+    and a hash of the trace load statements (with their time range and the
+    zones and technologies they query) and of sets, e.g. regions and
+    technologies per zone, so that different selections of a year are
+    stored apart
+    '''
+    sha = hashlib.sha1()
+    for statement, trace in _split_loads(lines, ['t'] + list(TRACES)):
+        if trace:
+            sha.update(''.join(statement).encode())
+    sha.update(json.dumps(sets).encode())
+    return '%s-%s' % (year, sha.hexdigest()[:12])
+
+
+class TraceStore:
+    """
+    On disk store with one contiguous float32 array per (trace, year)
+    indexed by a timestamp axis shared by all traces in a year. Years are
+    any label, e.g. a selection_key of the year and the data it selects.
+    Arrays are memory mapped read only so that instances, cluster data and
+    worker processes share the same pages.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self._maps = {}
+
+    def __repr__(self):  # pragma: no cover
+        return 'Trace store at %r' % self.path
+
+    def _yeardir(self, year):
+        return os.path.join(self.path, str(year))
+
+    def _save(self, year, fname, arr):
+        # write to a temporary file and rename so readers never see partial arrays
+        ydir = self._yeardir(year)
+        os.makedirs(ydir, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=ydir, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            np.save(f, arr)
+        os.replace(tmp, os.path.join(ydir, fname))
+        self._maps.pop((str(year), fname), None)
+
+    def _map(self, year, fname):
+        key = (str(year), fname)
+        if key not in self._maps:
+            self._maps[key] = np.load(os.path.join(self._yeardir(year), fname),
+                                      mmap_mode='r')
+        return self._maps[key]
+
+    def has_year(self, year):
+        '''True if store holds a timestamp axis for year'''
+        return os.path.isfile(os.path.join(self._yeardir(year), 'timestamps.npy'))
+
+    def write_timestamps(self, year, timestamps):
+        '''Save the shared timestamp axis for year'''
+        self._save(year, 'timestamps.npy', np.asarray(timestamps, dtype='M8[s]'))
+
+    def write(self, year, name, index, values):
+        '''Save a single trace for year as a float32 array'''
+        values = np.ascontiguousarray(values, dtype=np.float32)
+        if values.shape != self.timestamps(year).shape:
+            raise ValueError("openCEM-TraceStore: Trace %s%s length does not match timestamps"
+                             % (name, list(_as_tuple(index))))
+        self._save(year, _trace_file(name, _as_tuple(index)), values)
+
+    def timestamps(self, year):
+        '''Timestamp axis for year as datetime64 array'''
+        return self._map(year, 'timestamps.npy')
+
+    def t(self, year):
+        '''Timestamp axis for year as strings in the format of model set t'''
+        return [s.replace('T', ' ')
+                for s in np.datetime_as_string(self.timestamps(year), unit='s')]
+
+    def indices(self, year, name):
+        '''List index tuples of traces stored for name in year'''
+        out = []
+        for f in sorted(os.listdir(self._yeardir(year))):
+            base, ext = os.path.splitext(f)
+            parts = base.split('-')
+            if ext == '.npy' and parts[0] == name:
+                out.append(tuple(int(p) for p in parts[1:]))
+        return out
+
+    def read(self, year, name, index):
+        '''Read only memory mapped array of a trace'''
+        return self._map(year, _trace_file(name, _as_tuple(index)))
+
+    def param_data(self, year, name, indices=None):
+        '''Return trace as a pyomo data dictionary {(*index, t): value}'''
+        t = self.t(year)
+        if indices is None:
+            indices = self.indices(year, name)
+        out = {}
+        for idx in indices:
+            idx = _as_tuple(idx)
+            out.update(zip((idx + (s,) for s in t), self.read(year, name, idx).tolist()))
+        return out
+
+    def to_dataportal(self, data, year):
+        '''Populate set t and trace parameters of a DataPortal from store'''
+        data['t'] = {None: self.t(year)}
+        for name in TRACES:
+            data[name] = self.param_data(year, name)
+        return data
+
+    def from_instance(self, inst, year):
+        '''Save traces of a constructed model instance into store'''
+        t = list(inst.t)
+        self.write_timestamps(year, t)
+        for name, indexset in TRACES.items():
+            param = getattr(inst, name)
+            for idx in getattr(inst, indexset):
+                idx = _as_tuple(idx)
+                self.write(year, name, idx, [param[idx + (s,)] for s in t])
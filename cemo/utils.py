@@ -10,15 +10,14 @@ __status__ = "Development"
 import locale
 import sys
 
-import matplotlib.pyplot as plt
 import numpy as np
 from pyomo.environ import value
-from si_prefix import si_format
 
 import cemo.const
-import cemo.rules
+from cemo.results import ResultView
 
-locale.setlocale(locale.LC_ALL, '')
+# matplotlib and si_prefix are imported on first use, so that importing utils for
+# printstats does not load plotting libraries in solver runs
 
 
 def printonly(instance, key):  # pragma: no cover
@@ -60,6 +59,8 @@ def plotresults(instance):  # pragma: no cover
     """ Process results to plot.
      Feel free to improve the efficiency of this code
     """
+    import matplotlib.pyplot as plt
+
     tname = _get_textid('technology_type')
     rname = _get_textid('region')
     # Process results to plot.
@@ -120,6 +121,8 @@ def plotcapacity(instance):  # pragma: no cover
     """ Stacked plot of capacities
      Feel free to improve the efficiency of this code
     """
+    import matplotlib.pyplot as plt
+
     tname = _get_textid('technology_type')
     rname = _get_textid('region')
     # create set of plots that fits all NEM regions
@@ -178,111 +181,74 @@ def plotcapacity(instance):  # pragma: no cover
     plt.show()
 
 
-def _printcosts(inst):
-    print("Total Cost:\t %20s" %
-          locale.currency(value(inst.Obj - cemo.rules.cost_shadow(inst)), grouping=True))
-    print("Build cost:\t %20s" %
-          locale.currency(value(sum(cemo.rules.cost_capital(inst, z) - inst.cost_cap_carry_forward[z] for z in inst.zones)),
-                          grouping=True))
-    print("Repayment cost:\t %20s" %
-          locale.currency(value(sum(inst.cost_cap_carry_forward[z] for z in inst.zones)),
-                          grouping=True))
-    print("Operating cost:\t %20s" %
-          locale.currency(value(cemo.rules.cost_operating(inst)),
-                          grouping=True))
-    print("Fixed cost:\t %20s" %
-          locale.currency(value(cemo.rules.cost_fixed(inst)),
-                          grouping=True))
-    print("Transm. cost:\t %20s" %
-          locale.currency(value(cemo.rules.cost_transmission(inst)),
-                          grouping=True))
-    print("Unserved cost:\t %20s" %
-          locale.currency(value(cemo.rules.cost_unserved(inst)),
-                          grouping=True))
-    print("Emission cost:\t %20s" %
-          locale.currency(value(cemo.rules.cost_emissions(inst)),
-                          grouping=True))
-    print("Retirmt cost:\t %20s" %
-          locale.currency(value(cemo.rules.cost_retirement(inst)),
-                          grouping=True))
-
-
-def _printemissionrate(instance):
-    emrate = sum(value(cemo.rules.emissions(instance, r))
-                 for r in instance.regions) /\
-        (sum(value(cemo.rules.dispatch(instance, r)) for r in instance.regions)+1.0e-12)
-    print("Total Emission rate: %s kg/MWh" % str(emrate))
-
-
-def _printunserved(instance):
+def _printcosts(view):
+    locale.setlocale(locale.LC_ALL, '')
+    costs = view.costs()
+    for label, key in [("Total Cost:", 'total'),
+                       ("Build cost:", 'build'),
+                       ("Repayment cost:", 'repayment'),
+                       ("Operating cost:", 'operating'),
+                       ("Fixed cost:", 'fixed'),
+                       ("Transm. cost:", 'transmission'),
+                       ("Unserved cost:", 'unserved'),
+                       ("Emission cost:", 'emission'),
+                       ("Retirmt cost:", 'retirement')]:
+        print("%s\t %20s" % (label, locale.currency(costs[key], grouping=True)))
+
+
+def _printemissionrate(view):
+    print("Total Emission rate: %s kg/MWh" % str(float(view.emission_rate())))
+
+
+def _printunserved(view):
     uns = np.zeros(5, dtype=float)
-    for r in instance.regions:
-        uns[r - 1] = 100.0 * sum(value(instance.unserved[r, t])
-                                 for t in instance.t) / sum(value(instance.region_net_demand[r, t]) for t in instance.t)
+    for r, u in zip(view.regions, view.unserved()):
+        uns[r - 1] = u
 
     print('Unserved %:' + str(uns))
 
 
-def _printcapacity(instance):
+def _printcapacity(view):
+    from si_prefix import si_format
+
     tname = _get_textid('technology_type')
-    hours = float(len(instance.t))
-    techtotal = [0] * len(instance.all_tech)
-    disptotal = [0] * len(instance.all_tech)
-    capftotal = [0] * len(instance.all_tech)
-    nperz = [0] * len(instance.all_tech)
-    idx = list(instance.all_tech)
-    for z in instance.zones:
-        for n in instance.gen_tech_per_zone[z]:
-            techtotal[idx.index(n)] += value(instance.gen_cap_op[z, n])
-            disptotal[idx.index(n)] += value(sum(instance.gen_disp[z, n, t]
-                                                 for t in instance.t))
-            capftotal[idx.index(n)] += value(sum(instance.gen_cap_factor[z, n, t]
-                                                 for t in instance.t))
-            nperz[idx.index(n)] += 1
-        for s in instance.stor_tech_per_zone[z]:
-            techtotal[idx.index(s)] += value(instance.stor_cap_op[z, s])
-            disptotal[idx.index(s)] += value(sum(instance.stor_disp[z, s, t]
-                                                 for t in instance.t))
-            capftotal[idx.index(s)] += 0.5 * hours
-            nperz[idx.index(s)] += 1
-
-        for h in instance.hyb_tech_per_zone[z]:
-            techtotal[idx.index(h)] += value(instance.hyb_cap_op[z, h])
-            disptotal[idx.index(h)] += value(sum(instance.hyb_disp[z, h, t]
-                                                 for t in instance.t))
-            capftotal[idx.index(h)] += value(sum(instance.hyb_cap_factor[z, h, t]
-                                                 for t in instance.t))
-            nperz[idx.index(h)] += 1
-
-    NEMcap = sum(techtotal)
-    NEMdis = sum(disptotal)
+    hours = view.hours
+    techtotal = view.capacity().sum(axis=0)
+    disptotal = view.dispatch().sum(axis=0)
+    capftotal, nperz = view.cap_factor()
+
+    NEMcap = techtotal.sum()
+    NEMdis = disptotal.sum()
     print("NEM Capacity total: %sW\tNEM Dispatch total: %sWh" % (
           si_format(NEMcap * 1e6, precision=2),
           si_format(NEMdis * 1e6, precision=2)
           ))
 
-    for j in instance.all_tech:
-        if techtotal[idx.index(j)] > 0:
+    for j, n in enumerate(view.techs):
+        if techtotal[j] > 0:
             print("%17s: %7sW | dispatch: %7sWh | avg cap factor: %.2f(%.2f)" % (
-                tname[j],
-                si_format(techtotal[idx.index(j)] * 1e6, precision=1),
-                si_format(disptotal[idx.index(j)] * 1e6, precision=1),
-                disptotal[idx.index(j)] / hours / techtotal[idx.index(j)],
-                capftotal[idx.index(j)] / hours / nperz[idx.index(j)]
+                tname[n],
+                si_format(techtotal[j] * 1e6, precision=1),
+                si_format(disptotal[j] * 1e6, precision=1),
+                disptotal[j] / hours / techtotal[j],
+                capftotal[j] / hours / nperz[j]
             ))
 
 
 def printstats(instance):
     """Print summary of results for model instance"""
-    _printcapacity(instance)
-    _printcosts(instance)
-    _printunserved(instance)
-    _printemissionrate(instance)
+    view = ResultView(instance)
+    _printcapacity(view)
+    _printcosts(view)
+    _printunserved(view)
+    _printemissionrate(view)
     print("End of results for %s" % instance.name, flush=True)
 
 
 def plotcluster(cluster, row=3, col=4, ylim=[5500, 16000]):  # pragma: no cover
     # Plot cluster result from full set of weeks, cluster weeks and weights
+    import matplotlib.pyplot as plt
+
     t = range(1, cluster.nplen + 1)
     # Make  row * col subplots
     f, axarr = plt.subplots(row, col, sharex=True)
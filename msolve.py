@@ -15,6 +15,8 @@ import os
 import time
 
 from cemo.multi import SolveTemplate
+from cemo.profiler import Profiler
+from cemo.solveropts import BUDGET, parse_options
 
 
 def valid_file(param):
@@ -41,7 +43,8 @@ parser.add_argument(
 parser.add_argument(
     "--solver",
     help="Specify solver used by model." +
-    " For Pyomo supported solvers installed in your system ",
+    " For Pyomo supported solvers installed in your system," +
+    " or highspy to solve in process with the HiGHS library",
     type=str,
     metavar='SOLVER',
     default="cbc")
@@ -52,6 +55,26 @@ parser.add_argument(
     help="Request solver logging and traceback information",
     action='store_true')
 
+parser.add_argument(
+    "--solver-option",
+    help="Pass option KEY=VALUE to solver (e.g. threads=8), overrides config file [Solver]" +
+    " options. Can be repeated",
+    type=str,
+    action='append',
+    metavar='KEY=VALUE')
+
+parser.add_argument(
+    "--threads",
+    help="Total solver threads shared by all solves in this run (default all cores)",
+    type=int,
+    metavar='N')
+
+parser.add_argument(
+    "--profile",
+    help="Save per stage timing, memory and LP size of the run to a JSON lines trace file",
+    type=str,
+    metavar='TRACE')
+
 parser.add_argument(
     "-k",
     "--keepfiles",
@@ -65,8 +88,13 @@ args = parser.parse_args()
 # Read configuration file name from
 cfgfile = args.config
 
+if args.threads:
+    BUDGET.set_total(args.threads)
+
 # create Multi year simulation
-X = SolveTemplate(cfgfile, solver=args.solver, log=args.log)
+X = SolveTemplate(cfgfile, solver=args.solver, log=args.log,
+                  profiler=Profiler(args.profile) if args.profile else None,
+                  solver_opts=parse_options(args.solver_option))
 
 # make a temporary directoy
 if args.keepfiles:
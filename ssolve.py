@@ -15,19 +15,16 @@ import pickle
 import sys
 import time
 
-from pyomo.opt import SolverFactory, TerminationCondition
+from pyomo.opt import TerminationCondition
 
 import cemo.utils
+from cemo.datfile import policy_flags
+from cemo.direct import DIRECT_SOLVERS, solver_factory
 from cemo.model import create_model
-
-
-def check_arg(config_file, parameter):
-    '''Parse .dat file for parameters that enable constraints'''
-    with open(config_file + '.dat', 'r') as file:
-        for line in file:
-            if parameter in line:
-                return True
-        return False
+from cemo.profiler import Profiler, lp_size
+from cemo.scaling import SCALING, solve
+from cemo.solveropts import (BUDGET, barrier_options, parse_options, solution_accuracy,
+                             solver_options)
 
 
 # start the clock on the run
@@ -46,10 +43,31 @@ PARSER.add_argument("name",
 # Obtain a solver name from command line, default cbc
 PARSER.add_argument("--solver",
                     help="Specify solver used by model."
-                    + " For Pyomo supported solvers installed in your system ",
+                    + " For Pyomo supported solvers installed in your system,"
+                    + " or highspy to solve in process with the HiGHS library",
                     type=str,
                     metavar='SOLVER',
                     default="cbc")
+PARSER.add_argument("--solver-option",
+                    help="Pass option KEY=VALUE to solver (e.g. threads=8). Can be repeated",
+                    type=str,
+                    action='append',
+                    metavar='KEY=VALUE')
+PARSER.add_argument("--barrier",
+                    help="Solve with barrier and no crossover (faster, solution within tolerances)",
+                    action="store_true")
+PARSER.add_argument("--scaling",
+                    help="Export a scaled LP to the solver, with geometric mean row/column"
+                    + " scaling and the objective in $M. Results are unscaled",
+                    choices=SCALING,
+                    default='none')
+PARSER.add_argument("--no-prices",
+                    help="Do not import short run marginal prices (duals) from solver",
+                    action="store_true")
+PARSER.add_argument("--threads",
+                    help="Maximum solver threads (default all cores)",
+                    type=int,
+                    metavar='N')
 # Produce only a printout of the instance and exist
 PARSER.add_argument("--printonly",
                     help="Produce model.STR.pprint() output and exit."
@@ -78,48 +96,67 @@ PARSER.add_argument("-r", "--results",
 PARSER.add_argument("-v", "--verbose",
                     help="Print additional output, e.g. solver output",
                     action="store_true")
+# Stage level instrumentation
+PARSER.add_argument("--profile",
+                    help="Save per stage timing, memory and LP size to a JSON lines trace file",
+                    type=str,
+                    metavar='TRACE')
 
 # parse arguments into args structure
 ARGS = PARSER.parse_args()
+# YAML output stores the solver solution of the instance, which is not solved when scaled
+if ARGS.yaml and ARGS.scaling != 'none':
+    PARSER.error("--yaml requires --scaling none")
+# In-process solvers load the solution into the instance without a Pyomo solution object
+if ARGS.yaml and ARGS.solver in DIRECT_SOLVERS:
+    PARSER.error("--yaml is not available with solver %s" % ARGS.solver)
 
 # Model name comes from command line
 MODEL_NAME = ARGS.name
 
+PROF = Profiler(ARGS.profile)
+
 # create cemo model
-MODEL = create_model(MODEL_NAME,
-                     unslim=ARGS.unserved,
-                     emitlimit=check_arg(MODEL_NAME, 'nem_year_emit_limit'),
-                     nem_disp_ratio=check_arg(MODEL_NAME, 'nem_disp_ratio'),
-                     nem_ret_ratio=check_arg(MODEL_NAME, 'nem_ret_ratio'),
-                     nem_ret_gwh=check_arg(MODEL_NAME, 'nem_ret_gwh'),
-                     region_ret_ratio=check_arg(MODEL_NAME, 'region_ret_ratio'),
-                     nem_re_disp_ratio=check_arg(MODEL_NAME, 'nem_re_disp_ratio'))
+with PROF.span('create_model'):
+    # Policy constraints are enabled by their parameters in the data command file
+    MODEL = create_model(MODEL_NAME,
+                         unslim=ARGS.unserved,
+                         duals=not ARGS.no_prices,
+                         **policy_flags(MODEL_NAME + '.dat'))
 # create a specific instance using file modelName.dat
 try:
-    INSTANCE = MODEL.create_instance(MODEL_NAME + '.dat')
+    with PROF.span('create_instance'):
+        INSTANCE = MODEL.create_instance(MODEL_NAME + '.dat')
 except Exception as ex:
     print("openCEM solve.py: ", ex)
     sys.exit(1)  # exit gracefully if file does not exist
 
+if PROF.enabled:
+    with PROF.span('lp_size') as SPAN:
+        SPAN.update(lp_size(INSTANCE))
+
 # Produce only a debugging printout of model and then exit
 if ARGS.printonly:
     cemo.utils.printonly(INSTANCE, ARGS.printonly)  # print requested keys
     sys.exit(0)  # exit with no error
 
 # declare a solver for the model instance
-OPT = SolverFactory(ARGS.solver)
+OPT = solver_factory(ARGS.solver)
 
-# Use multiple threads for CBC solver (if available)
-# TODO pass solver options via command line interface
-if ARGS.solver == "cbc":
-    OPT.options['threads'] = 4
-    OPT.options['ratio'] = 0.0001
+# Solver defaults (e.g. CBC threads and ratio) overriden by command line options
+if ARGS.threads:
+    BUDGET.set_total(ARGS.threads)
+SOLVER_OPTIONS = solver_options(ARGS.solver,
+                                barrier_options(ARGS.solver) if ARGS.barrier else None,
+                                parse_options(ARGS.solver_option))
 
 # instruct the solver to calculate the solution
 print("openCEM solve.py: Runtime %s (pre solver)" %
       str(datetime.timedelta(seconds=(time.time() - START_TIME)))
       )
-RESULTS = OPT.solve(INSTANCE, tee=ARGS.verbose, keepfiles=False)
+with PROF.span('solve'), BUDGET.lease(ARGS.solver, SOLVER_OPTIONS) as OPTIONS:
+    OPT.options.update(OPTIONS)
+    RESULTS = solve(OPT, INSTANCE, ARGS.scaling, tee=ARGS.verbose, keepfiles=False)
 print("openCEM solve.py: Runtime %s (post solver)" %
       str(datetime.timedelta(seconds=(time.time() - START_TIME)))
       )
@@ -127,6 +164,9 @@ print("openCEM solve.py: Solver status %s" % RESULTS.solver.status)
 if RESULTS.solver.termination_condition == TerminationCondition.infeasible:
     print("openCEM solve.py: Problem infeasible, no solution found.")
     sys.exit(1)
+if ARGS.barrier:
+    print("openCEM solve.py: Barrier solution max row violation %(max_row_violation)g,"
+          " max bound violation %(max_bound_violation)g" % solution_accuracy(INSTANCE))
 # Produce YAML output of model results
 if ARGS.yaml:
     # rescue actual results from instance
@@ -139,7 +179,8 @@ if ARGS.pickle:
     pickle.dump(INSTANCE, open(MODEL_NAME + '.p', 'wb'))
 
 if ARGS.results:
-    cemo.utils.printstats(INSTANCE)
+    with PROF.span('printstats'):
+        cemo.utils.printstats(INSTANCE)
 # Produce local plot of results
 if ARGS.plot:
     cemo.utils.plotresults(INSTANCE)
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""sweep.py: Run openCEM scenario sweeps through a job queue shared by several nodes"""
+__version__ = "0.9.2"
+__author__ = "José Zapata"
+__copyright__ = "Copyright 2018, ITP Renewables, Australia"
+__credits__ = ["José Zapata", "Dylan McConnell", "Navid Hagdadi"]
+__license__ = "GPLv3"
+__maintainer__ = "José Zapata"
+__email__ = "jose.zapata@itpau.com.au"
+__status__ = "Development"
+
+import argparse
+import sys
+
+from cemo.jobqueue import JobQueue
+from cemo.solveropts import BUDGET, parse_options
+
+# create parser object
+PARSER = argparse.ArgumentParser(description="openCEM scenario sweep job queue")
+PARSER.add_argument("queue",
+                    help="Job queue directory, shared by the coordinator and all workers",
+                    type=str,
+                    metavar='QUEUE')
+COMMANDS = PARSER.add_subparsers(dest='command')
+
+ENQUEUE = COMMANDS.add_parser("enqueue", help="Queue the simulation of config files")
+ENQUEUE.add_argument("config",
+                     help="Configuration files, with paths relative to a directory shared"
+                     + " by the workers",
+                     type=str,
+                     nargs='+',
+                     metavar='CONFIG')
+ENQUEUE.add_argument("--solver",
+                     help="Specify solver used by model",
+                     type=str,
+                     metavar='SOLVER',
+                     default="cbc")
+ENQUEUE.add_argument("--solver-option",
+                     help="Pass option KEY=VALUE to solver, overrides config file [Solver]"
+                     + " options. Can be repeated",
+                     type=str,
+                     action='append',
+                     metavar='KEY=VALUE')
+
+WORK = COMMANDS.add_parser("work", help="Claim and run queued jobs on this node")
+WORK.add_argument("--workers",
+                  help="Jobs run at the same time on this node (default 1)",
+                  type=int,
+                  default=1)
+WORK.add_argument("--threads",
+                  help="Total solver threads shared by the jobs on this node (default all cores)",
+                  type=int,
+                  metavar='N')
+WORK.add_argument("--wait",
+                  help="Keep polling until all jobs are finished instead of exiting when"
+                  + " no jobs are pending",
+                  action="store_true")
+WORK.add_argument("--poll",
+                  help="Seconds between polls of the queue when waiting (default 10)",
+                  type=float,
+                  default=10)
+
+STATUS = COMMANDS.add_parser("status", help="Show jobs by state")
+STATUS.add_argument("--stale",
+                    help="Seconds without heartbeat after which a running job is stale"
+                    + " (default 600)",
+                    type=float,
+                    default=600)
+
+REQUEUE = COMMANDS.add_parser("requeue", help="Release stale (and failed) jobs to run again")
+REQUEUE.add_argument("--stale",
+                     help="Seconds without heartbeat after which a running job is stale"
+                     + " (default 600)",
+                     type=float,
+                     default=600)
+REQUEUE.add_argument("--failed",
+                     help="Also run failed jobs again",
+                     action="store_true")
+
+MERGE = COMMANDS.add_parser("merge", help="Merge manifests and results of finished jobs")
+MERGE.add_argument("output",
+                   help="Prefix of merged JSON manifest and component CSV tables",
+                   type=str,
+                   metavar='PREFIX')
+MERGE.add_argument("--component",
+                   help="Result component tabulated across jobs (default operating"
+                   + " capacities). Can be repeated",
+                   type=str,
+                   action='append',
+                   metavar='NAME')
+
+ARGS = PARSER.parse_args()
+if ARGS.command is None:
+    PARSER.error("a command is required")
+
+QUEUE = JobQueue(ARGS.queue)
+
+if ARGS.command == 'enqueue':
+    for cfg in ARGS.config:
+        print("openCEM sweep.py: Queued %s" % QUEUE.enqueue(
+            cfg, solver=ARGS.solver, solver_options=parse_options(ARGS.solver_option)))
+elif ARGS.command == 'work':
+    if ARGS.threads:
+        BUDGET.set_total(ARGS.threads)
+    MANIFESTS = QUEUE.work(workers=ARGS.workers, poll=ARGS.poll, wait=ARGS.wait)
+    for m in MANIFESTS:
+        print("openCEM sweep.py: %s %s in %.1f s" % (m['id'], m['status'], m['wall']))
+    if any(m['status'] != 'done' for m in MANIFESTS):
+        sys.exit(1)
+elif ARGS.command in ('status', 'requeue'):
+    if ARGS.command == 'requeue':
+        for job_id in QUEUE.requeue(stale=ARGS.stale, failed=ARGS.failed):
+            print("openCEM sweep.py: Released %s" % job_id)
+    for state, jobs in QUEUE.status(stale=ARGS.stale).items():
+        print("openCEM sweep.py: %8s %3d %s" % (state, len(jobs), ' '.join(jobs)))
+elif ARGS.command == 'merge':
+    KWARGS = {'components': ARGS.component} if ARGS.component else {}
+    COUNT = QUEUE.merge(ARGS.output, **KWARGS)
+    print("openCEM sweep.py: Merged %d finished jobs into %s.json" % (COUNT, ARGS.output))
@@ -6,4 +6,5 @@ model = create_model('openCEM',
                      nem_ret_ratio=False,
                      nem_ret_gwh=False,
                      region_ret_ratio=False,
-                     nem_disp_ratio=False)
+                     nem_disp_ratio=False,
+                     duals=False)
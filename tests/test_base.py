@@ -12,3 +12,17 @@ def test_model_instantiation(instance, benchmark):
     assert instance.zones.data() == benchmark.zones.data(), "Mismatch in test regions"
     assert instance.all_tech.data() \
         == benchmark.all_tech.data(), "Mismatch in list of gen techs"
+
+
+def test_model_without_duals():
+    from cemo.model import create_model
+    assert not hasattr(create_model('nodual', duals=False), 'dual')
+
+
+def test_model_chrono_storage():
+    from cemo.model import create_model
+    model = create_model('chrono', chrono_storage=True)
+    for name in ['periods', 'rep_periods', 'stor_period_level', 'hyb_period_level',
+                 'con_stor_period', 'con_hyb_period']:
+        assert hasattr(model, name)
+    assert not hasattr(create_model('cyclic'), 'stor_period_level')
@@ -0,0 +1,33 @@
+import json
+
+import pytest
+
+import cemo.benchmark
+
+
+def test_synthetic_data(temp_data_dir):
+    datfile = cemo.benchmark.synthetic_data(str(temp_data_dir), regions=[4, 5],
+                                            zones_per_region=2, techs=[2, 8, 12, 13, 15],
+                                            hours=48)
+    with open(datfile.replace('.dat', '.json')) as f:
+        data = json.load(f)
+    assert data['zones'] == [16, 9, 10]
+    assert len(data['t']) == 48
+    assert len(data['region_net_demand']) == 2 * 48
+    assert len(data['gen_cap_factor']) == 3 * 3 * 48
+    assert len(data['hyb_cap_factor']) == 3 * 48
+    assert data['stor_tech_in_zones'] == [[16, 15], [9, 15], [10, 15]]
+
+
+def test_compare():
+    base = {'stages': [{'stage': 'solve', 'wall': 2.0}, {'stage': 'jsonify', 'wall': 1.0}]}
+    new = {'stages': [{'stage': 'solve', 'wall': 1.0}, {'stage': 'clusterset', 'wall': 1.0}]}
+    assert cemo.benchmark.compare(base, new) == [('solve', 2.0, 1.0, pytest.approx(0.5))]
+
+
+@pytest.mark.parametrize("module", ['cemo.model', 'cemo.multi', 'cemo.utils'])
+def test_import_time(module):
+    wall, loaded = cemo.benchmark.import_time(module, repeat=1)
+    assert wall > 0
+    # plotting, clustering and pandas load on first use
+    assert loaded == []
@@ -1,6 +1,12 @@
 import filecmp
+import json
+import os
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
 from difflib import SequenceMatcher
 
+import numpy as np
+import pandas as pd
 import pytest
 
 import cemo.cluster
@@ -50,3 +56,130 @@ def test_cluster_gen_ref_model(temp_data_dir, model_options):
     a._gen_ref_model()
     assert filecmp.cmp(a.tmpdir + '/ReferenceModel.py',
                        'tests/ReferenceModel.py')
+
+
+def cluster_data(X, cache, method='average', period='week', max_d=4):
+    '''ClusterData on a given data array, without querying traces'''
+    clus = cemo.cluster.ClusterData.__new__(cemo.cluster.ClusterData)
+    clus.cache = cache
+    clus.method, clus.metric = method, 'cityblock'
+    clus.cached = False
+    clus.firstdow, clus.lastdow, clus.maxsynth = 4, 3, False
+    clus.period = period
+    clus.pdays = 1 if period == 'day' else 7
+    clus.X = X
+    clus.periods, clus.nplen = X.shape
+    clus.dates = np.arange('2019-07-04', X.shape[0] * clus.pdays, clus.pdays,
+                           dtype='M8[D]').astype('M8[s]')
+    clus.clusterset(max_d)
+    return clus
+
+
+def test_cluster_cache(temp_data_dir):
+    cache = cemo.cluster.ClusterCache(str(temp_data_dir.join('cluster_cache')))
+    X = np.random.RandomState(0).rand(52, 24)
+    first = cluster_data(X, cache)
+    assert not first.cached
+    second = cluster_data(X, cache)
+    assert second.cached
+    pd.testing.assert_frame_equal(first.Xcluster, second.Xcluster, check_dtype=False)
+    assert second.sequence.tolist() == first.sequence.tolist()
+    # different data is clustered again
+    assert not cluster_data(X * 2, cache).cached
+
+
+def test_cluster_cache_fewer_clusters(temp_data_dir):
+    '''Cached results with fewer clusters than requested set the number found'''
+    cache = cemo.cluster.ClusterCache(str(temp_data_dir.join('cluster_cache')))
+    X = np.repeat(np.random.RandomState(0).rand(3, 24), [10, 20, 22], axis=0)
+    first = cluster_data(X, cache, max_d=6)
+    assert first.max_d == 3
+    second = cluster_data(X, cache, max_d=6)
+    assert second.cached
+    assert second.max_d == len(second.Xcluster) == 3
+
+
+def test_kmedoids():
+    rng = np.random.RandomState(0)
+    centres = rng.rand(3, 48) * 1000
+    truth = rng.randint(3, size=90)
+    X = (centres[truth] + rng.rand(90, 48)).astype(np.float32)
+    labels = cemo.cluster.kmedoids(X, 3, batch=16)
+    assert sorted(set(labels)) == [1, 2, 3]
+    # same grouping as the generating centres
+    assert len(set(zip(truth, labels))) == 3
+
+
+def test_cluster_kmedoids_contract():
+    X = np.random.RandomState(1).rand(52, 24)
+    clus = cluster_data(X, None, method='kmedoids')
+    assert list(clus.Xcluster.columns) == ['week', 'date', 'weight']
+    assert clus.Xcluster['weight'].sum() == pytest.approx(1)
+    assert clus.Xcluster['date'].is_monotonic_increasing
+
+
+def test_cluster_days():
+    clus = cemo.cluster.CSVCluster(max_d=6, period='day')
+    assert clus.pdays == 1
+    assert clus.Xcluster.size == 6 * 3
+    # every day of the year is assigned to a cluster in chronological order
+    assert len(clus.sequence) == clus.periods >= 364
+    assert sorted(set(clus.sequence)) == list(range(1, 7))
+
+
+def test_cluster_chrono_storage(model_options):
+    clus = cluster_data(np.random.RandomState(2).rand(365, 24), None, period='day')
+    a = cemo.cluster.ClusterRun(clus, 'tests/CNEM.template', model_options)
+    assert a.chrono_storage
+    # each day is represented by exactly one scenario
+    rep = []
+    for k in range(clus.max_d):
+        lines = a._chrono_sets(k + 1).split(';')
+        assert lines[0].split(':=')[1].split() == [str(d) for d in range(1, 366)]
+        rep += [int(d) for d in lines[1].split(':=')[1].split()]
+    assert sorted(rep) == list(range(1, 366))
+    a._gen_scen_struct()
+    with open(a.tmpdir + '/ScenarioStructure.dat') as f:
+        assert 'stor_period_level[*,*,*] hyb_period_level[*,*,*]' in f.read()
+    a._gen_ref_model()
+    with open(a.tmpdir + '/ReferenceModel.py') as f:
+        assert 'chrono_storage=True' in f.read()
+
+
+def test_cluster_runef_files(monkeypatch, model_options):
+    '''Concurrent runef cluster runs write their solutions to their own directories'''
+    clus = cluster_data(np.random.RandomState(3).rand(52, 24), None)
+
+    def runef(cmd, cwd=None, **kwargs):
+        # runef writes the extensive form solution to its working directory
+        with open(os.path.join(cwd or '.', 'ef_solution.json'), 'w') as f:
+            json.dump({'node solutions': {'Root': {'variables': {'cwd': cwd}}}}, f)
+        return subprocess.CompletedProcess(cmd, 0, stdout='')
+
+    monkeypatch.setattr(cemo.cluster.subprocess, 'run', runef)
+    runs = [cemo.cluster.ClusterRun(clus, 'tests/CNEM.template', model_options)
+            for _ in range(2)]
+    with ThreadPoolExecutor(2) as pool:
+        list(pool.map(lambda run: run.run_cluster(), runs))
+    assert [run.data for run in runs] == [{'cwd': run.tmpdir} for run in runs]
+    assert not os.path.exists('ef_solution.json')
+
+
+@pytest.mark.parametrize("bound,optimal", [(1, True), (-1, False)])
+def test_cluster_solve_direct(model_options, bound, optimal):
+    '''In-process extensive form solves without an optimal solution raise an error'''
+    pytest.importorskip('highspy')
+    from pyomo.environ import ConcreteModel, Constraint, NonNegativeReals, Objective, Var
+    ef = ConcreteModel()
+    ef.x = Var(within=NonNegativeReals)
+    ef.c = Constraint(expr=ef.x <= bound)
+    ef.Obj = Objective(expr=-ef.x)
+    clus = cluster_data(np.random.RandomState(4).rand(52, 24), None)
+    run = cemo.cluster.ClusterRun(clus, 'tests/CNEM.template', model_options, solver='highspy')
+    if optimal:
+        run._solve_direct(ef)
+        assert ef.x.value == pytest.approx(1)
+    else:
+        with pytest.raises(RuntimeError):
+            run._solve_direct(ef)
+    assert run.solver_stats['solver'] == 'highspy'
@@ -0,0 +1,23 @@
+import pytest
+from pyomo.environ import ConcreteModel, Set
+
+from cemo.cyclic import CyclicIndex, cyclic_index
+
+
+@pytest.mark.parametrize("k", [1, 4, 12, 30, -1, -12])
+def test_cyclic_index_as_pyomo(k):
+    m = ConcreteModel()
+    m.t = Set(ordered=True, initialize=['2020-01-01 %02d:00:00' % h for h in range(24)])
+    lags = cyclic_index(m.t)
+    assert [lags.prevw(t, k) for t in m.t] == [m.t.prevw(t, k) for t in m.t]
+    assert [lags.nextw(t, k) for t in m.t] == [m.t.nextw(t, k) for t in m.t]
+    # tables are shared by all rules using the same set
+    assert cyclic_index(m.t) is lags
+
+
+def test_cyclic_index_positions():
+    lags = CyclicIndex('abcd')
+    assert lags.position == {'a': 0, 'b': 1, 'c': 2, 'd': 3}
+    assert lags.lag(1) == {'a': 'd', 'b': 'a', 'c': 'b', 'd': 'c'}
+    assert lags.lag(4) == {m: m for m in 'abcd'}
+    assert lags.nextw('d') == 'a'
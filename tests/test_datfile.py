@@ -0,0 +1,35 @@
+import os
+
+import pytest
+
+from cemo.datfile import dat_names, policy_flags
+
+
+@pytest.mark.parametrize("datfile,expected", [
+    ('tests/CTV_trans.dat', True),
+    ('tests/ISPNeutral.dat', False),
+])
+def test_policy_flags(datfile, expected):
+    flags = policy_flags(datfile)
+    assert set(flags.values()) == {expected}
+
+
+def test_dat_names(temp_data_dir):
+    datfile = str(temp_data_dir.join('scan.dat'))
+    with open(datfile, 'w') as f:
+        f.write("# param nem_year_emit_limit := 1;\n"
+                "set zones := 1 2;\n"
+                "param nem_ret_ratio := 0.1; # region_ret_ratio\n"
+                "param : stor_rt_eff stor_charge_hours :=\n14 0.8 6\n;\n"
+                "load \"host\" database=db\nquery=\"select x as param from y;\"\n"
+                "  : [zones,all_tech] gen_cap_initial;\n"
+                "load 'carry.json' : cost_cap_carry_forward;\n")
+    assert dat_names(datfile) == {'zones', 'nem_ret_ratio', 'stor_rt_eff', 'stor_charge_hours',
+                                  'gen_cap_initial', 'cost_cap_carry_forward'}
+    flags = policy_flags(datfile)
+    assert flags['nem_ret_ratio'] and not flags['emitlimit'] and not flags['region_ret_ratio']
+    # cached result is refreshed when the file changes
+    with open(datfile, 'a') as f:
+        f.write("param nem_year_emit_limit := 110;\n")
+    os.utime(datfile, ns=(0, os.stat(datfile).st_mtime_ns + 1))
+    assert policy_flags(datfile)['emitlimit']
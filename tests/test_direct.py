@@ -0,0 +1,45 @@
+import pytest
+from pyomo.environ import (ConcreteModel, Constraint, NonNegativeReals, Objective, Suffix,
+                           Var, value)
+from pyomo.opt import TerminationCondition
+
+import cemo.direct
+
+
+def lp():
+    '''Dispatch of two generators against a load, with the load balance dual as price'''
+    m = ConcreteModel()
+    m.dual = Suffix(direction=Suffix.IMPORT)
+    m.disp = Var([1, 2], within=NonNegativeReals, bounds=(0, 60))
+    m.ldbal = Constraint(expr=m.disp[1] + m.disp[2] >= 100)
+    m.Obj = Objective(expr=20 * m.disp[1] + 50 * m.disp[2] + 10)
+    return m
+
+
+def test_linear_program():
+    m = lp()
+    prog = cemo.direct.LinearProgram(m)
+    assert len(prog.vars) == 2 and len(prog.cons) == 1
+    assert list(prog.start) == [0, 2]
+    assert list(prog.row_lower) == [100] and prog.offset == 10
+
+
+def test_highs_direct():
+    pytest.importorskip('highspy')
+    m = lp()
+    opt = cemo.direct.solver_factory('highspy')
+    results = opt.solve(m)
+    assert results.solver.termination_condition == TerminationCondition.optimal
+    assert value(m.disp[1]) == pytest.approx(60)
+    assert value(m.disp[2]) == pytest.approx(40)
+    assert opt.stats['objective'] == pytest.approx(value(m.Obj))
+    # Price is the cost of the marginal generator
+    assert m.dual[m.ldbal] == pytest.approx(50)
+
+
+def test_highs_direct_infeasible():
+    pytest.importorskip('highspy')
+    m = lp()
+    m.cap = Constraint(expr=m.disp[1] + m.disp[2] <= 90)
+    results = cemo.direct.solver_factory('highspy').solve(m)
+    assert results.solver.termination_condition == TerminationCondition.infeasible
@@ -0,0 +1,99 @@
+import os
+import time
+
+import pandas as pd
+
+import pytest
+
+import cemo.jobqueue
+from cemo.jobqueue import DONE, FAILED, PENDING, RUNNING, STALE, JobQueue
+
+
+# Job process writing one year of results, or failing for configs called bad
+STUB_WORKER = '''
+import sys
+from cemo.jobqueue import JobQueue
+from cemo.reader import write_results
+queue = JobQueue(sys.argv[1])
+job = queue.job(sys.argv[2])
+outdir = queue.result_dir(sys.argv[2])
+with open(outdir + 'runs', 'a') as f:
+    f.write('run')
+if job['cfgfile'].endswith('bad.cfg'):
+    sys.exit(3)
+year = {'vars': {'gen_cap_op': [{'index': [5, 12], 'value': 100.0}]}}
+write_results(outdir + 'results.json', {'meta': {}}, [(2020, year)])
+'''
+
+
+@pytest.fixture
+def queue(tmpdir):
+    q = JobQueue(str(tmpdir.join('queue')))
+    for name in ('a', 'b'):
+        cfg = tmpdir.join(name + '.cfg')
+        cfg.write('[Scenario]\nYears=[2020,2025]\n')
+        q.enqueue(str(cfg), solver='highspy')
+    return q
+
+
+def finish(q, job_id, status):
+    os.makedirs(q.result_dir(job_id), exist_ok=True)
+    cemo.jobqueue._write_json(q._manifest_file(job_id), {'id': job_id, 'status': status})
+
+
+def test_jobqueue_enqueue(tmpdir, queue):
+    jobs = queue.jobs()
+    assert len(jobs) == 2 and jobs[0].startswith('a-')
+    # Queuing a config file again does not add a job
+    assert queue.enqueue(str(tmpdir.join('a.cfg'))) == jobs[0]
+    assert len(queue.jobs()) == 2
+    job = queue.job(jobs[0])
+    assert job['years'] == [2020, 2025] and job['solver'] == 'highspy'
+
+
+def test_jobqueue_claim(queue):
+    first = queue.claim()
+    second = queue.claim()
+    assert {first, second} == set(queue.jobs())
+    assert queue.claim() is None
+    assert queue.state(first) == RUNNING
+
+
+def test_jobqueue_states(queue):
+    a, b = queue.jobs()
+    assert queue.status()[PENDING] == [a, b]
+    queue.claim()
+    finish(queue, a, FAILED)
+    queue.claim()
+    old = time.time() - 1000
+    os.utime(queue._lock_file(b), (old, old))
+    assert queue.state(a) == FAILED and queue.state(b) == STALE
+    assert queue.requeue() == [b]
+    assert queue.requeue(failed=True) == [a]
+    assert queue.status()[PENDING] == [a, b]
+    queue.claim()
+    finish(queue, a, DONE)
+    assert queue.claim() == b
+
+
+def test_jobqueue_work(tmpdir, queue, monkeypatch):
+    monkeypatch.setattr(cemo.jobqueue, 'JOB_WORKER', STUB_WORKER)
+    bad = tmpdir.join('bad.cfg')
+    bad.write('[Scenario]\nYears=[2020]\n')
+    bad_id = queue.enqueue(str(bad))
+    manifests = queue.work(workers=2, heartbeat=0.05)
+    # Each job runs once, in its own process
+    assert sorted(m['id'] for m in manifests) == sorted(queue.jobs())
+    for job_id in queue.jobs():
+        with open(queue.result_dir(job_id) + 'runs') as f:
+            assert f.read() == 'run'
+    status = queue.status()
+    assert status[FAILED] == [bad_id] and len(status[DONE]) == 2
+    assert queue.manifest(bad_id)['returncode'] == 3
+    assert queue.manifest(bad_id)['results'] is None
+    assert queue.work() == []
+    prefix = str(tmpdir.join('sweep'))
+    assert queue.merge(prefix, components=('gen_cap_op',)) == 2
+    table = pd.read_csv(prefix + '_gen_cap_op.csv')
+    assert sorted(table['job']) == sorted(status[DONE])
+    assert list(table['value']) == [100.0, 100.0]
@@ -1,6 +1,10 @@
 import json
 
-from cemo.jsonify import jsoninit
+from pyomo.environ import ConcreteModel, Set, Var
+
+from cemo.jsonify import (carry_forward_from_json, fill_complex_var, fill_sparse_var,
+                          json_carry_forward, jsoninit)
+from cemo.reader import densify
 
 
 def test_json_init(solution):
@@ -10,3 +14,31 @@ def test_json_init(solution):
     with open('tests/jsoninit_test.json', 'r') as f1:
         data2 = json.load(f1)
     assert json.dumps(data) == json.dumps(data2)
+
+
+def test_json_carry_forward():
+    data = {'gen_cap_initial': {(5, 12): 100.0}, 'cost_cap_carry_forward': {5: 2.5e6}}
+    assert json_carry_forward(data) == {
+        'gen_cap_initial': [{'index': [5, 12], 'value': 100.0}],
+        'cost_cap_carry_forward': [{'index': 5, 'value': 2.5e6}],
+    }
+
+
+def test_carry_forward_from_json():
+    data = {'gen_cap_initial': {(5, 12): 100.0}, 'cost_cap_carry_forward': {5: 2.5e6}}
+    assert carry_forward_from_json(json.loads(json.dumps(json_carry_forward(data)))) == data
+
+
+def test_fill_sparse_var():
+    m = ConcreteModel()
+    m.gen_tech_in_zones = Set(dimen=2, initialize=[(5, 12), (6, 2)])
+    m.t = Set(ordered=True, initialize=['2020-01-01 00:00:00', '2020-01-01 01:00:00'])
+    m.gen_disp = Var(m.gen_tech_in_zones, m.t, initialize=0)
+    m.gen_disp[6, 2, '2020-01-01 00:00:00'] = 3.5
+    sparse = fill_sparse_var(m.gen_disp)
+    assert sparse == {'domain': ['gen_tech_in_zones', 't'],
+                      'index': [(6, 2, '2020-01-01 00:00:00')], 'value': [3.5]}
+    sets = json.loads(json.dumps({'gen_tech_in_zones': list(m.gen_tech_in_zones),
+                                  't': list(m.t)}))
+    dense = json.loads(json.dumps(fill_complex_var(m.gen_disp)))
+    assert densify(json.loads(json.dumps(sparse)), sets) == dense
@@ -1,12 +1,17 @@
 # Multi year simulation unit tests
 import filecmp
 import json
+import os
 import tempfile
 from difflib import SequenceMatcher
 
 import pytest
 
+import cemo.multi
 from cemo.multi import SolveTemplate
+from cemo.profiler import Profiler
+from cemo.reader import ResultsReader, write_year
+from cemo.traces import TraceStore
 
 
 def test_multi_conf_file_not_found():
@@ -86,3 +91,168 @@ def test_multi_metadata():
     with open('tests/metadata.json', 'r') as f:
         metad = json.load(f)
     assert json.dumps(meta, indent=2) == json.dumps(metad, indent=2)
+
+
+def test_multi_solver_options():
+    '''Solver options from config file [Solver] section, overriden by those given'''
+    fp = tempfile.NamedTemporaryFile()
+    with open('tests/Sample.cfg') as fin:
+        with open(fp.name, 'w') as fo:
+            fo.write(fin.read() + '\n[Solver]\nthreads = 2\nprimalT = 1e-7\n')
+    X = SolveTemplate(cfgfile=fp.name, solver_opts={'threads': 8})
+    assert X.solver_options == {'threads': 8, 'ratio': 0.0001, 'primalT': 1e-7}
+
+
+@pytest.mark.parametrize("solver,options", [
+    ('gurobi', {'method': 2, 'crossover': 0}),
+    ('cplex', {'lpmethod': 4, 'barrier_crossover': -1}),
+])
+def test_multi_no_crossover(solver, options):
+    '''Barrier without crossover and no prices from config file'''
+    fp = tempfile.NamedTemporaryFile()
+    with open('tests/Sample.cfg') as fin:
+        with open(fp.name, 'w') as fo:
+            fo.write(fin.read().replace('[Advanced]', '[Advanced]\ncrossover = no\nprices = no'))
+    X = SolveTemplate(cfgfile=fp.name, solver=solver)
+    assert not X.prices
+    assert X.solver_options == options
+    with pytest.raises(ValueError):
+        SolveTemplate(cfgfile=fp.name, solver='glpk')
+
+
+@pytest.mark.parametrize("cluster,checkpoint", [
+    ('no', 'no'),
+    ('no', 'yes'),
+    ('yes', 'no'),
+])
+def test_multi_carry_forward(cluster, checkpoint):
+    '''Carry forward data is kept in memory, template loads JSON checkpoint only if needed'''
+    fp = tempfile.NamedTemporaryFile()
+    with open('tests/Sample.cfg') as fin:
+        with open(fp.name, 'w') as fo:
+            fo.write(fin.read().replace(
+                'cluster = yes',
+                'cluster = %s\ncarry_forward_checkpoint = %s' % (cluster, checkpoint)))
+    X = SolveTemplate(cfgfile=fp.name)
+    first, second = X.Years[0], X.Years[1]
+    data = {'gen_cap_initial': {(5, 12): 100.0}, 'cost_cap_carry_forward': {5: 2.5e6}}
+    assert X.carried_forward(second) is None
+    X._carry_forward = (first, data)
+    assert X.carried_forward(first) is None
+    assert X.carried_forward(second) == data
+    assert X.carried_forward(X.Years[2]) is None
+    saved = X.checkpoint
+    assert saved == (cluster == 'yes' or checkpoint == 'yes')
+    assert ('gen_cap_op' + str(first) + '.json' in X.carryforwardcap(second)) == saved
+    assert bool(X.carry_forward_cap_costs(second)) == saved
+
+
+def test_multi_solve_cache(tmpdir):
+    '''Identical years share a solve cache key independent of the run directory'''
+    fp = tempfile.NamedTemporaryFile()
+    with open('tests/Sample.cfg') as fin:
+        with open(fp.name, 'w') as fo:
+            fo.write(fin.read().replace('[Advanced]', '[Advanced]\nsolve_cache = %s' % tmpdir))
+    X = SolveTemplate(cfgfile=fp.name, tmpdir=tempfile.mkdtemp() + '/')
+    Y = SolveTemplate(cfgfile=fp.name, tmpdir=tempfile.mkdtemp() + '/')
+    first, second = X.Years[0], X.Years[1]
+    key = X.fingerprint(X.generateyeartemplate(first, test=True), first)
+    assert Y.fingerprint(Y.generateyeartemplate(first, test=True), first) == key
+    assert X.solve_cache.get(key) is None
+    data = {'gen_cap_initial': {(5, 12): 100.0}, 'cost_cap_carry_forward': {5: 2.5e6}}
+    X.solve_cache.put(key, {'objective': 1.0}, data)
+    assert Y.solve_cache.get(key) == ({'objective': 1.0}, data)
+    # Capacity carried into a year is part of the key
+    X._carry_forward = (first, data)
+    Y._carry_forward = (first, dict(data, cost_cap_carry_forward={5: 3e6}))
+    assert X.fingerprint(X.generateyeartemplate(second, test=True), second) != \
+        Y.fingerprint(Y.generateyeartemplate(second, test=True), second)
+    # So are solver options and scaling, which may land on another optimum
+    Z = SolveTemplate(cfgfile=fp.name, tmpdir=tempfile.mkdtemp() + '/',
+                      solver_opts={'primalT': 1e-9})
+    assert Z.fingerprint(Z.generateyeartemplate(first, test=True), first) != key
+    Y.scaling = 'geometric'
+    assert Y.fingerprint(Y.generateyeartemplate(first, test=True), first) != key
+
+
+@pytest.mark.parametrize("option,isolate", [('', False), ('isolate_years = yes', True)])
+def test_multi_isolate_years(option, isolate):
+    fp = tempfile.NamedTemporaryFile()
+    with open('tests/Sample.cfg') as fin:
+        with open(fp.name, 'w') as fo:
+            fo.write(fin.read().replace('[Advanced]', '[Advanced]\n' + option))
+    assert SolveTemplate(cfgfile=fp.name).isolate_years == isolate
+
+
+def test_multi_compress_results():
+    fp = tempfile.NamedTemporaryFile()
+    with open('tests/Sample.cfg') as fin:
+        with open(fp.name, 'w') as fo:
+            fo.write(fin.read().replace('[Advanced]', '[Advanced]\ncompress_results = yes'))
+    X = SolveTemplate(cfgfile=fp.name, tmpdir=tempfile.mkdtemp() + '/')
+    X.results_file = X.tmpdir + 'results.json'
+    for y in X.Years:
+        write_year(X.tmpdir + str(y) + '.json', {'objective_value': float(y)})
+        X.archive_year(y)
+    X.mergejsonyears()
+    reader = ResultsReader(X.results_file + '.gz')
+    assert reader.years == X.Years
+    assert reader.load('objective_value', X.Years[-1]) == X.Years[-1]
+    assert reader.meta()['Name'] == X.Name
+
+
+def test_multi_trace_key(tmpdir):
+    '''Traces of a test range, or of other zones and techs, are not reused for a full year'''
+    X = SolveTemplate(cfgfile='tests/Sample.cfg', tmpdir=tempfile.mkdtemp() + '/')
+    y = X.Years[0]
+    test = X.trace_key(X.generateyeartemplate(y, test=True), y)
+    full = X.trace_key(X.generateyeartemplate(y), y)
+    assert test != full
+    assert X.trace_key(X.generateyeartemplate(y), y) == full
+    store = TraceStore(str(tmpdir))
+    store.write_timestamps(test, ['2019-07-01 00:00:00'])
+    assert store.has_year(test) and not store.has_year(full)
+    X.all_tech_per_zone[1] = [1]
+    X.tracetechs()
+    assert X.trace_key(X.generateyeartemplate(y), y) not in (test, full)
+
+
+# Year process solving a stub year: carry forward capacity grows by the year
+STUB_YEAR_WORKER = '''
+import sys
+from cemo.multi import SolveTemplate, solve_year_task
+
+
+def solve_year(self, y, year_template, key=None):
+    with self.profiler.span('solve', year=y, template=year_template):
+        cap = self._carry_forward[1]['gen_cap_initial'][(5, 12)]
+    return {'gen_cap_initial': {(5, 12): cap + y}}
+
+
+SolveTemplate.solve_year = solve_year
+solve_year_task(sys.argv[1])
+'''
+
+
+@pytest.mark.parametrize("worker,returncode", [(STUB_YEAR_WORKER, 0),
+                                               ('import sys; sys.exit(5)', 5)],
+                         ids=['solved', 'crashed'])
+def test_multi_solve_year_process(monkeypatch, worker, returncode):
+    monkeypatch.setattr(cemo.multi, 'YEAR_WORKER', worker)
+    X = SolveTemplate(cfgfile='tests/Sample.cfg', tmpdir=tempfile.mkdtemp() + '/',
+                      profiler=Profiler(keep=True))
+    first, second = X.Years[0], X.Years[1]
+    X._carry_forward = (first, {'gen_cap_initial': {(5, 12): 100.0}})
+    if returncode:
+        # A crashing year is reported by the driver
+        with pytest.raises(RuntimeError):
+            X.solve_year_process(second, 'Sim.dat')
+    else:
+        carry = X.solve_year_process(second, 'Sim.dat')
+        assert carry == {'gen_cap_initial': {(5, 12): 100.0 + second}}
+        # Spans of the year process are added to the profile of the driver
+        assert [s['stage'] for s in X.profiler.spans] == ['year_process', 'solve']
+        assert X.profiler.spans[1]['template'] == 'Sim.dat'
+        assert X.profiler.spans[1]['pid'] != os.getpid()
+    assert X.profiler.spans[0]['stage'] == 'year_process'
+    assert X.profiler.spans[0]['returncode'] == returncode
@@ -0,0 +1,54 @@
+import json
+
+import pytest
+
+from cemo.profiler import Profiler
+
+
+def test_profiler_trace_file(temp_data_dir):
+    trace = str(temp_data_dir.join('trace.jsonl'))
+    prof = Profiler(trace)
+    with prof.span('jsonify', year=2020) as span:
+        span.update({'rows': 10})
+    with pytest.raises(ZeroDivisionError):
+        with prof.span('solve', year=2020):
+            1 / 0
+    with open(trace) as f:
+        spans = [json.loads(line) for line in f]
+    assert [s['stage'] for s in spans] == ['jsonify', 'solve']
+    assert spans[0]['year'] == 2020
+    assert spans[0]['rows'] == 10
+    assert spans[0]['wall'] >= 0
+    assert spans[0]['rss_start_mb'] > 0 and spans[0]['rss_mb'] > 0
+    assert spans[0]['process_peak_rss_mb'] > 0
+    assert spans[1]['error'] == 'ZeroDivisionError(\'division by zero\')'
+
+
+def test_profiler_disabled():
+    prof = Profiler()
+    with prof.span('solve'):
+        pass
+    assert not prof.enabled
+    assert prof.spans == []
+
+
+def test_profiler_memory():
+    prof = Profiler(memory=True, keep=True)
+    with prof.span('alloc'):
+        [0] * 100000
+    assert prof.spans[0]['python_peak_mb'] > 0.5
+
+
+def test_profiler_extend(temp_data_dir):
+    '''Spans of a worker process profiler are added to the trace file'''
+    trace = str(temp_data_dir.join('extend.jsonl'))
+    worker = Profiler(keep=True)
+    with worker.span('solve', year=2025):
+        pass
+    prof = Profiler(trace)
+    prof.extend(worker.spans)
+    with open(trace) as f:
+        assert [json.loads(line)['stage'] for line in f] == ['solve']
+    disabled = Profiler()
+    disabled.extend(worker.spans)
+    assert disabled.spans == []
@@ -0,0 +1,148 @@
+import gzip
+import json
+import os
+
+import pytest
+
+from cemo.reader import (ResultsReader, compress_year, index_file, scan_results, write_archive,
+                         write_results, write_year)
+
+TIMES = ['2020-01-01 00:00:00', '2020-01-01 01:00:00', '2020-01-01 02:00:00']
+
+
+def year_results(year):
+    return {
+        'sets': {'zones': [5, 6], 'gen_tech_in_zones': [[5, 12], [6, 2]]},
+        'params': {'cost_gen_vom': [{'index': 12, 'value': 0.0}],
+                   'cost_emit': 0.023},
+        'vars': {
+            'gen_cap_op': [{'index': [5, 12], 'value': 100.0 * year},
+                           {'index': [6, 2], 'value': None}],
+            'gen_disp': [{'index': [z, n, t], 'value': year + 10 * z + n + i}
+                         for z, n in [(5, 12), (6, 2)] for i, t in enumerate(TIMES)],
+        },
+        'duals': {'srmc': [{'index': [4, t], 'value': 50.0} for t in TIMES]},
+        'objective_value': 1.5e9,
+        'solver_stats': {'dispatch': {'solver': 'cbc', 'iterations': 12}},
+    }
+
+
+@pytest.fixture
+def results(temp_data_dir):
+    filename = str(temp_data_dir.join('Results.json'))
+    meta = {'meta': {'Name': 'Test é', 'Years': [2020, 2025]}}
+    write_results(filename, meta, ((y, year_results(y)) for y in [2020, 2025]))
+    return filename, meta
+
+
+def test_write_results_content(results):
+    filename, meta = results
+    data = dict(meta)
+    data.update({str(y): year_results(y) for y in [2020, 2025]})
+    with open(filename) as f:
+        assert f.read() == json.dumps(data)
+
+
+def test_scan_results_index(results):
+    filename, meta = results
+    with open(index_file(filename)) as f:
+        written = json.load(f)['index']
+    assert scan_results(filename) == written
+
+
+@pytest.mark.parametrize("scan", [False, True])
+def test_reader_load(results, scan):
+    filename, meta = results
+    if scan:
+        os.remove(index_file(filename))
+    reader = ResultsReader(filename)
+    assert reader.years == [2020, 2025]
+    assert reader.meta() == meta['meta']
+    assert reader.components(2025, 'vars') == ['gen_cap_op', 'gen_disp']
+    assert reader.load('gen_cap_op', 2025)[0]['value'] == 202500.0
+    assert reader.load('objective_value', 2020) == 1.5e9
+    assert reader.year(2020) == year_results(2020)
+    with pytest.raises(KeyError):
+        reader.load('gen_disp', 2030)
+
+
+def test_reader_frame_filters(results):
+    reader = ResultsReader(results[0])
+    frame = reader.frame('gen_disp', years=[2025], zones=[5], start=TIMES[1])
+    assert list(frame.columns) == ['year', 'zone', 'tech', 'timestamp', 'value']
+    assert list(frame['timestamp']) == TIMES[1:]
+    assert list(frame['value']) == [2025 + 62 + 1, 2025 + 62 + 2]
+    assert len(reader.frame('gen_disp', techs=[2], end=TIMES[0])) == 2
+    assert reader.frame('gen_cap_op')['value'].isna().sum() == 2
+    assert reader.records('srmc', regions=[4]).shape == (6,)
+    with pytest.raises(ValueError):
+        reader.frame('zones')
+
+
+def test_reader_frame_regions(results):
+    '''Regions filter zone indexed components by the zones in each region'''
+    reader = ResultsReader(results[0])
+    # zones 5 and 6 are in region 1 (NSW)
+    assert len(reader.frame('gen_disp', regions=[1])) == 12
+    assert reader.frame('gen_disp', regions=[2]).empty
+    assert list(reader.frame('gen_cap_op', years=[2020], regions=[1])['zone']) == [5, 6]
+
+
+@pytest.mark.parametrize("filters", [{'zones': [5]}, {'techs': [2]}])
+def test_reader_frame_unknown_filter(results, filters):
+    '''Filters on columns a component is not indexed by raise an error'''
+    reader = ResultsReader(results[0])
+    with pytest.raises(ValueError):
+        reader.frame('srmc', **filters)
+
+
+def test_reader_stale_index(results):
+    filename, meta = results
+    write_results(filename, meta, [(2030, year_results(2030))])
+    with open(index_file(filename), 'w') as f:
+        json.dump({'file': {'size': 0, 'mtime_ns': 0}, 'index': {}}, f)
+    assert ResultsReader(filename).years == [2030]
+
+
+def test_reader_sparse(temp_data_dir):
+    filename = str(temp_data_dir.join('Sparse.json'))
+    year = year_results(2020)
+    year['sets']['t'] = TIMES
+    year['vars']['gen_disp'] = {'domain': ['gen_tech_in_zones', 't'],
+                                'index': [[6, 2, TIMES[1]]], 'value': [7.0]}
+    write_results(filename, {'meta': {}}, [(2020, year)])
+    reader = ResultsReader(filename)
+    dense = reader.load('gen_disp', 2020, dense=True)
+    assert [r['index'] for r in dense] == [[z, n, t] for z, n in [(5, 12), (6, 2)]
+                                           for t in TIMES]
+    assert [r['value'] for r in dense] == [0, 0, 0, 0, 7.0, 0]
+    assert list(reader.frame('gen_disp')['value']) == [7.0]
+    assert list(reader.frame('gen_disp', dense=True, zones=[6])['value']) == [0, 7.0, 0]
+
+
+@pytest.mark.parametrize("scan", [False, True])
+def test_reader_archive(temp_data_dir, results, scan):
+    filename, meta = results
+    years = []
+    for y in [2020, 2025]:
+        yearfile = str(temp_data_dir.join('%d.json' % y))
+        write_year(yearfile, year_results(y))
+        with open(yearfile) as f:
+            assert f.read() == json.dumps(year_results(y))
+        years.append((y, yearfile + '.gz', compress_year(yearfile)))
+        assert not os.path.exists(yearfile) and not os.path.exists(index_file(yearfile))
+        with gzip.open(yearfile + '.gz') as f:
+            assert json.load(f) == year_results(y)
+    archive = str(temp_data_dir.join('Results.json.gz'))
+    index = write_archive(archive, meta, years)
+    # One member for meta data, two per year and one to close the object
+    assert len(index['members']) == 6
+    with gzip.open(archive) as f, open(filename, 'rb') as fp:
+        assert f.read() == fp.read()
+    if scan:
+        os.remove(index_file(archive))
+    reader = ResultsReader(archive)
+    assert reader.meta() == meta['meta']
+    assert reader.year(2025) == year_results(2025)
+    assert reader.load('objective_value', 2020) == 1.5e9
+    assert reader.frame('gen_disp').equals(ResultsReader(filename).frame('gen_disp'))
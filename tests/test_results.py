@@ -0,0 +1,37 @@
+import pytest
+from pyomo.environ import value
+
+import cemo.rules
+from cemo.results import ResultView
+
+
+def test_result_view_arrays(solution):
+    view = ResultView(solution)
+    z, n, t = solution.gen_disp.index_set().first()
+    assert view['gen_disp'][view.zones.index(z), view.techs.index(n), 0] \
+        == pytest.approx(value(solution.gen_disp[z, n, t]))
+    assert view['gen_disp'].shape == (len(solution.zones), len(solution.all_tech),
+                                      len(solution.t))
+
+
+def test_result_view_costs(solution):
+    costs = ResultView(solution).costs()
+    assert costs['total'] == pytest.approx(value(solution.Obj - cemo.rules.cost_shadow(solution)))
+    assert costs['operating'] == pytest.approx(value(cemo.rules.cost_operating(solution)))
+    assert costs['fixed'] == pytest.approx(value(cemo.rules.cost_fixed(solution)))
+    assert costs['transmission'] == pytest.approx(value(cemo.rules.cost_transmission(solution)))
+    assert costs['emission'] == pytest.approx(value(cemo.rules.cost_emissions(solution)))
+
+
+def test_result_view_cost_capital(solution):
+    view = ResultView(solution)
+    assert view.cost_capital().tolist() == pytest.approx(
+        [value(cemo.rules.cost_capital(solution, z)) for z in view.zones])
+
+
+def test_result_view_emissions(solution):
+    view = ResultView(solution)
+    assert view.emissions().sum() == pytest.approx(
+        sum(value(cemo.rules.emissions(solution, r)) for r in solution.regions))
+    assert view.dispatch().sum() == pytest.approx(
+        sum(value(cemo.rules.dispatch(solution, r)) for r in solution.regions))
@@ -0,0 +1,114 @@
+import numpy as np
+import pytest
+from pyomo.environ import (ConcreteModel, Constraint, NonNegativeReals, Objective, Suffix,
+                           TransformationFactory, Var, value)
+from pyomo.opt import SolverResults, TerminationCondition
+
+import cemo.scaling
+from cemo.direct import solver_factory
+
+
+def lp():
+    '''Small LP mixing a large shadow cost with capacity factor coefficients'''
+    m = ConcreteModel()
+    m.cap = Var(within=NonNegativeReals)
+    m.disp = Var([1, 2], within=NonNegativeReals)
+    m.slack = Var(within=NonNegativeReals)
+    m.caplim = Constraint([1, 2], rule=lambda m, t: m.disp[t] <= 0.35 * m.cap)
+    m.ldbal = Constraint([1, 2], rule=lambda m, t: m.disp[t] + m.slack >= 5000.0)
+    # cost row, as the stage costs of cluster runs
+    m.cost = Var()
+    m.costdef = Constraint(
+        expr=m.cost == 9e7 * m.cap + 5 * sum(m.disp[t] for t in m.disp) + 1e7 * m.slack)
+    m.Obj = Objective(expr=m.cost)
+    return m
+
+
+def coef_range(m):
+    '''Ratio of largest to smallest constraint coefficient'''
+    coefs = cemo.scaling._matrix(m)[4]
+    return coefs.max() / coefs.min()
+
+
+def test_geomean_factors():
+    rows = np.array([0, 0, 1, 1])
+    cols = np.array([0, 1, 0, 1])
+    coefs = np.array([1e7, 1.0, 0.35, 1.0])
+    r, s = cemo.scaling._geomean_factors(2, 2, rows, cols, coefs, passes=4)
+    a = coefs * r[rows] * s[cols]
+    assert a.max() / a.min() < coefs.max() / coefs.min()
+    # factors are powers of two
+    assert np.all(np.log2(np.concatenate([r, s])) % 1 == 0)
+
+
+def test_scaling_round_trip():
+    m = lp()
+    sf = cemo.scaling.scaling_factors(m, 'geometric')
+    assert sf[m.Obj] == cemo.scaling.UNIT_OBJECTIVE
+    xfrm = TransformationFactory('core.scale_model')
+    scaled = xfrm.create_using(m)
+    solution = {'cap': 14285.714, 'disp[1]': 5000.0, 'disp[2]': 5000.0, 'slack': 0.0,
+                'cost': 9e7 * 14285.714 + 5e4}
+    for name, v in solution.items():
+        component = scaled.find_component('scaled_' + name)
+        component.set_value(v * scaled.component_scaling_factor_map[component])
+    xfrm.propagate_solution(scaled, m)
+    for name, v in solution.items():
+        assert value(m.find_component(name)) == pytest.approx(v)
+    assert value(m.Obj) == pytest.approx(value(scaled.scaled_Obj) / sf[m.Obj])
+
+
+def test_scaling_coefficient_range():
+    '''Scaling narrows the range of constraint coefficients'''
+    m = lp()
+    cemo.scaling.scaling_factors(m, 'geometric')
+    scaled = TransformationFactory('core.scale_model').create_using(m)
+    assert coef_range(scaled) < coef_range(m) / 1000
+
+
+@pytest.mark.parametrize("scaling", ['log', 'units'])
+def test_scaling_unknown(scaling):
+    with pytest.raises(ValueError):
+        cemo.scaling.scaling_factors(lp(), scaling)
+
+
+def test_scaling_solve():
+    '''Scaled solves give the solution and duals of the unscaled solve'''
+    pytest.importorskip('highspy')
+    base = lp()
+    base.dual = Suffix(direction=Suffix.IMPORT)
+    cemo.scaling.solve(solver_factory('highspy'), base)
+    m = lp()
+    m.dual = Suffix(direction=Suffix.IMPORT)
+    results = cemo.scaling.solve(solver_factory('highspy'), m, 'geometric')
+    assert results.solver.termination_condition == TerminationCondition.optimal
+    assert m.component('scaling_factor') is None
+    assert value(m.Obj) == pytest.approx(value(base.Obj))
+    for c in [m.ldbal[1], m.ldbal[2], m.caplim[1], m.caplim[2], m.costdef]:
+        assert m.dual[c] == pytest.approx(base.dual[base.find_component(c.name)])
+
+
+class FailingSolver:
+    def __init__(self, termination=None):
+        self.termination = termination
+
+    def solve(self, instance, **kwargs):
+        if self.termination is None:
+            raise RuntimeError('solver crashed')
+        results = SolverResults()
+        results.solver.termination_condition = self.termination
+        return results
+
+
+def test_scaling_solve_failed():
+    m = lp()
+    m.cap.set_value(100.0)
+    with pytest.raises(RuntimeError):
+        cemo.scaling.solve(FailingSolver(), m, 'geometric')
+    assert m.component('scaling_factor') is None
+    failing = FailingSolver(TerminationCondition.infeasible)
+    results = cemo.scaling.solve(failing, m, 'geometric')
+    assert results.solver.termination_condition == TerminationCondition.infeasible
+    # Values are not overwritten without a solution
+    assert m.cap.value == 100.0
+    assert m.component('scaling_factor') is None
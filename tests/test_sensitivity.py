@@ -0,0 +1,51 @@
+import pytest
+from pyomo.environ import value
+
+import cemo.sensitivity
+from cemo.initialisers import init_fcr
+from cemo.model import create_model
+
+
+@pytest.fixture(scope="module")
+def mutable_instance():
+    model = create_model('CTV_trans',
+                         unslim=True,
+                         emitlimit=True,
+                         nem_disp_ratio=True,
+                         nem_re_disp_ratio=True,
+                         nem_ret_ratio=True,
+                         nem_ret_gwh=True,
+                         region_ret_ratio=True,
+                         mutable_costs=True)
+    return model.create_instance('tests/CTV_trans.dat')
+
+
+def test_sensitivity_not_mutable(instance):
+    with pytest.raises(ValueError):
+        cemo.sensitivity.Sensitivity(instance)
+
+
+def test_sensitivity_set(mutable_instance):
+    sens = cemo.sensitivity.Sensitivity(mutable_instance)
+    key = next(iter(mutable_instance.cost_gen_build))
+    base = value(mutable_instance.cost_gen_build[key])
+    sens.set('cost_gen_build', 2, relative=True)
+    sens.set('cost_gen_build', 1.5, relative=True)
+    # relative to the original value, not to the last one set
+    assert value(mutable_instance.cost_gen_build[key]) == pytest.approx(1.5 * base)
+    sens.set('all_tech_discount_rate', 0.08)
+    n = next(iter(mutable_instance.all_tech))
+    assert value(mutable_instance.fixed_charge_rate[n]) == \
+        pytest.approx(value(init_fcr(mutable_instance, n)))
+    with pytest.raises(ValueError):
+        sens.set('cost_unserved', 1)
+
+
+def test_sensitivity_sweep(request, mutable_instance):
+    sens = cemo.sensitivity.Sensitivity(mutable_instance,
+                                        solver=request.config.getoption("--solver"))
+    table = sens.sweep('cost_emit', [0.0, 0.05])
+    assert list(table['cost_emit']) == [0.0, 0.05]
+    assert {'objective', 'emissions', 'cap_wind'} <= set(table.columns)
+    assert table['objective'][1] > table['objective'][0]
+    assert table['emissions'][1] <= table['emissions'][0]
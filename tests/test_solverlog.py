@@ -0,0 +1,79 @@
+import pytest
+
+from cemo.solverlog import parse_log, parse_logfile
+
+CBC_LOG = """Presolve 4129 (-3122) rows, 5210 (-1905) columns and 15332 (-7210) elements
+Perturbing problem by 0.001% of 1234.5 - largest nonzero change 0.0012
+Optimal objective 1.234567e+10 - 2811 iterations time 1.42, Presolve 0.03
+Total time (CPU seconds):       1.50   (Wallclock seconds):       1.62
+"""
+
+CBC_MIP_LOG = """Result - Optimal solution found
+
+Objective value:                51234.50000000
+Enumerated nodes:               12
+Total iterations:               3410
+Time (CPU seconds):             2.31
+Time (Wallclock seconds):       2.48
+"""
+
+GLPK_LOG = """Scaling...
+ A: min|aij| =  1.000e+00  max|aij| =  1.000e+00  ratio =  1.000e+00
+Constructing initial basis...
+Size of triangular part is 1200
+      0: obj =   0.000000000e+00 inf =   1.234e+04 (100)
+*   812: obj =   9.876543210e+08 inf =   0.000e+00 (0) 3
+OPTIMAL LP SOLUTION FOUND
+Time used:   0.4 secs
+"""
+
+CPLEX_LOG = """LP Presolve eliminated 2034 rows and 1523 columns.
+Reduced LP has 6012 rows, 7200 columns, and 25010 nonzeros.
+Barrier time = 3.21 sec. (1200.00 ticks)
+Total crossover time = 0.52 sec. (120.00 ticks)
+
+Dual simplex - Optimal:  Objective =    1.2345000000e+10
+Solution time =    3.90 sec.  Iterations = 54 (0)
+"""
+
+GUROBI_LOG = """Presolve removed 3122 rows and 1905 columns
+Presolved: 4129 rows, 5210 columns, 15332 nonzeros
+Barrier solved model in 31 iterations and 1.20 seconds (0.80 work units)
+Crossover log...
+Solved in 2811 iterations and 1.42 seconds (1.10 work units)
+Optimal objective  1.234567000e+10
+"""
+
+
+@pytest.mark.parametrize("solver,text,expected", [
+    ('cbc', CBC_LOG, {'presolved_rows': 4129, 'rows_removed': 3122, 'presolved_nnz': 15332,
+                      'iterations': 2811, 'objective': 1.234567e10, 'simplex_time': 1.42}),
+    ('cbc', CBC_MIP_LOG, {'status': 'Optimal solution found', 'objective': 51234.5,
+                          'iterations': 3410, 'solve_time': 2.48}),
+    ('glpk', GLPK_LOG, {'iterations': 812, 'objective': 9.87654321e8,
+                        'status': 'OPTIMAL LP SOLUTION FOUND', 'solve_time': 0.4}),
+    ('cplex', CPLEX_LOG, {'rows_removed': 2034, 'presolved_cols': 7200, 'barrier_time': 3.21,
+                          'crossover_time': 0.52, 'status': 'Optimal', 'iterations': 54,
+                          'objective': 1.2345e10, 'solve_time': 3.9}),
+    ('gurobi_direct', GUROBI_LOG, {'cols_removed': 1905, 'presolved_nnz': 15332,
+                                   'barrier_iterations': 31, 'barrier_time': 1.2,
+                                   'iterations': 2811, 'solve_time': 1.42,
+                                   'status': 'Optimal', 'objective': 1.234567e10}),
+])
+def test_parse_log(solver, text, expected):
+    stats = parse_log(solver, text)
+    assert stats['solver'] == solver
+    for key, value in expected.items():
+        assert stats[key] == (pytest.approx(value) if isinstance(value, float) else value)
+
+
+@pytest.mark.parametrize("solver,text", [('xpress', CBC_LOG), ('cbc', ''), ('cbc', None)])
+def test_parse_log_no_stats(solver, text):
+    assert parse_log(solver, text) == {'solver': solver}
+
+
+def test_parse_logfile(temp_data_dir):
+    logfile = temp_data_dir.join('solver2020.log')
+    logfile.write(CBC_LOG)
+    assert parse_logfile('cbc', str(logfile))['iterations'] == 2811
+    assert parse_logfile('cbc', str(temp_data_dir.join('missing.log'))) == {'solver': 'cbc'}
@@ -0,0 +1,78 @@
+import threading
+
+import pytest
+
+from pyomo.environ import ConcreteModel, Constraint, Var
+
+from cemo.solveropts import (ThreadBudget, barrier_options, parse_options, runef_options,
+                             solution_accuracy, solver_options)
+
+
+def test_parse_options():
+    assert parse_options(['threads=8', 'ratio = 0.01', 'method=barrier']) == {
+        'threads': 8, 'ratio': 0.01, 'method': 'barrier'}
+    assert parse_options(None) == {}
+
+
+@pytest.mark.parametrize("item", ['threads', '=4'])
+def test_parse_options_bad(item):
+    with pytest.raises(ValueError):
+        parse_options([item])
+
+
+@pytest.mark.parametrize("solver,options,expected", [
+    ('cbc', [], {'threads': 4, 'ratio': 0.0001}),
+    ('cbc', [{'threads': '2'}, {'ratio': 0.01}], {'threads': 2, 'ratio': 0.01}),
+    ('gurobi', [{'Method': '2'}, None], {'Method': 2}),
+])
+def test_solver_options(solver, options, expected):
+    assert solver_options(solver, *options) == expected
+
+
+def test_barrier_options():
+    assert solver_options('gurobi', barrier_options('gurobi'), {'threads': 2}) == {
+        'method': 2, 'crossover': 0, 'threads': 2}
+    with pytest.raises(ValueError):
+        barrier_options('glpk')
+
+
+def test_solution_accuracy():
+    m = ConcreteModel()
+    m.x = Var(bounds=(0, 1))
+    m.y = Var()
+    m.c = Constraint(expr=m.x + m.y <= 2)
+    m.x.set_value(1 + 1e-7, skip_validation=True)
+    m.y.set_value(1 + 2e-7)
+    acc = solution_accuracy(m)
+    assert acc['max_row_violation'] == pytest.approx(3e-7)
+    assert acc['max_bound_violation'] == pytest.approx(1e-7)
+
+
+def test_runef_options():
+    assert runef_options({'threads': 2, 'ratio': 0.01}) == 'threads=2 ratio=0.01'
+
+
+def test_thread_budget_lease():
+    budget = ThreadBudget(6)
+    with budget.lease('cbc', {'threads': 4, 'ratio': 0.01}) as first:
+        with budget.lease('glpk', {}) as second:
+            with budget.lease('cbc', {'threads': 4}) as third:
+                assert budget.free == 0
+        assert budget.free == 2
+    assert first == {'threads': 4, 'ratio': 0.01}
+    assert second == {}
+    assert third == {'threads': 1}
+    assert budget.free == 6
+
+
+def test_thread_budget_waits():
+    budget = ThreadBudget(2)
+    granted = budget.acquire()
+    worker = threading.Thread(target=lambda: budget.release(budget.acquire(1)))
+    worker.start()
+    worker.join(0.1)
+    assert worker.is_alive()  # waiting for a free thread
+    budget.release(granted)
+    worker.join(1)
+    assert not worker.is_alive()
+    assert budget.free == 2
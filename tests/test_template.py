@@ -0,0 +1,45 @@
+import os
+
+import pytest
+
+from cemo.template import (TIMERANGE_LINE, CompiledTemplate, absolute_loads, compile_template,
+                           placeholder_pattern)
+
+
+@pytest.mark.parametrize("text,values,expected", [
+    ("set zones := [zones];\n", {'[zones]': '1 2'}, "set zones := 1 2;\n"),
+    ("[gentech][gentechdb] XXXX", {'[gentech]': 'a', '[gentechdb]': 'b', 'XXXX': '2020'},
+     "ab 2020"),
+    ("no placeholders\n", {}, "no placeholders\n"),
+])
+def test_compiled_template(text, values, expected):
+    template = CompiledTemplate(text, placeholder_pattern(['[zones]', '[gentech]',
+                                                           '[gentechdb]', 'XXXX']))
+    assert template.render(values) == expected
+
+
+def test_timerange_line():
+    text = "load x\nWHERE timestamp BETWEEN 'a' AND 'b'\n: t;\nWHERE timestamp BETWEEN 'a' AND 'b'"
+    template = CompiledTemplate(text, TIMERANGE_LINE)
+    assert len(template.keys) == 2
+    drange = "WHERE timestamp BETWEEN 'c' AND 'd'\n"
+    assert template.render(dict.fromkeys(template.keys, drange)) == \
+        "load x\n" + drange + ": t;\n" + drange
+
+
+def test_compile_template_cache(temp_data_dir):
+    filename = str(temp_data_dir.join('template.dat'))
+    with open(filename, 'w') as f:
+        f.write("XXXX\n")
+    pattern = placeholder_pattern(['XXXX'])
+    assert compile_template(filename, pattern) is compile_template(filename, pattern)
+    with open(filename, 'w') as f:
+        f.write("year XXXX\n")
+    assert compile_template(filename, pattern).render({'XXXX': '2030'}) == "year 2030\n"
+
+
+def test_absolute_loads():
+    host = 'load "opencem.example.com" database=opencem_nem using=mysql query="SELECT 1" : x;'
+    text = "load 'tests/CTV_trans.json' : y;\n" + host
+    assert absolute_loads(text) == \
+        "load '" + os.path.abspath('tests/CTV_trans.json') + "' : y;\n" + host
@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+
+from cemo.traces import TraceStore, drop_loads
+
+
+@pytest.fixture
+def store(temp_data_dir):
+    st = TraceStore(str(temp_data_dir.join('traces')))
+    st.write_timestamps(2020, ['2020-01-01 01:00:00', '2020-01-01 02:00:00'])
+    st.write(2020, 'region_net_demand', 4, [1000.5, 1100.25])
+    st.write(2020, 'gen_cap_factor', (16, 12), [0.25, 0.5])
+    return st
+
+
+def test_trace_store_roundtrip(store):
+    assert store.has_year(2020)
+    assert not store.has_year(2025)
+    assert store.t(2020) == ['2020-01-01 01:00:00', '2020-01-01 02:00:00']
+    assert store.indices(2020, 'gen_cap_factor') == [(16, 12)]
+    assert store.param_data(2020, 'gen_cap_factor') == {
+        (16, 12, '2020-01-01 01:00:00'): 0.25,
+        (16, 12, '2020-01-01 02:00:00'): 0.5}
+
+
+def test_trace_store_read_only(store):
+    trace = store.read(2020, 'region_net_demand', 4)
+    assert isinstance(trace, np.memmap)
+    assert trace.dtype == np.float32
+    with pytest.raises(ValueError):
+        trace[0] = 0
+
+
+def test_trace_store_bad_length(store):
+    with pytest.raises(ValueError):
+        store.write(2020, 'region_net_demand', 5, [1.0, 2.0, 3.0])
+
+
+def test_drop_loads():
+    with open('tests/ISPNeutral.dat') as f:
+        lines = list(f)
+    kept = ''.join(drop_loads(lines, ['t', 'region_net_demand', 'gen_cap_factor',
+                                      'hyb_cap_factor']))
+    assert 'region_net_demand' not in kept
+    assert 'gen_cap_factor' not in kept
+    assert ':t;' not in kept
+    assert 'cost_gen_build' in kept
+    assert len(lines) - len(kept.splitlines()) == 51